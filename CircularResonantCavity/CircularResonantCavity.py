@@ -4,7 +4,7 @@ import traceback
 import adsk.core # type: ignore
 import adsk.fusion # type: ignore
 
-import math
+from . import cavity_geometry
 
 _app = None
 _ui  = None
@@ -57,130 +57,56 @@ def export_to_stl(design):
         if _ui:
             _ui.messageBox('Failed to export STL:\n{}'.format(traceback.format_exc()))
 
-# Geometric helpers
-
-def get_circle_circum(circle):
-
-    """
-    Calculates the circumference of a circle.
-
-    Args:
-        circle: The circle in question.
-
-    Returns:
-        The circumference of the circle.
-    """
-    
-    r = circle.radius
-    
-    return 2.0 * math.pi * r
-
-def get_arc_length_theta(arc_length, radius):
-
-    """
-    Calculates the angle of the arc segment.
-
-    Args:
-        arc_length: The segment's arc length.
-        radius: The circle's radius.
-
-    Returns:
-        The angle of the arc segment.
-    """
-    
-    return arc_length * 360.0 / (2.0 * math.pi * radius)
-
 # Sketch helpers
 
-def reflect_point(points, pt, x=False, y=False, z=False):
+def draw_region(sketch, region):
 
     """
-    Create a reflected copy of a point.
+    Sketch the boundary of a precomputed region.
+
+    Segments sharing an endpoint share its sketch point, so every loop comes out
+    as a closed profile.
 
     Args:
-        points: sketch.sketchPoints.
-        pt: The point to reflect.
-        x: Should we mirror across the YZ-plane.
-        y: Should we mirror across the XZ-plane.
-        z: Should we mirror across the XY-plane.
+        sketch: The sketch to draw in.
+        region: A `cavity_geometry.Region`.
 
     Returns:
-        The newly created SketchPoint.
-    """
-
-    new_pt = adsk.core.Point3D.create((-1) ** x * pt.x, (-1) ** y * pt.y, (-1) ** z * pt.z)
-
-    return points.add(new_pt)
-    
-def rotate_entities(geom_cons, center_sk_pt, entities, quantity):
-
+        A list of the created sketch curves.
     """
-    Create a circular pattern of sketch or profile entities.
 
-    Args:
-        geom_cons: sketch.geometricConstraints.
-        center_sk_pt: Center of rotation.
-        entities: A list of sketch entities to be patterned
-        quantity: Number of pattern instances to create, distributed evenly over 360 deg.
+    lines = sketch.sketchCurves.sketchLines
+    arcs = sketch.sketchCurves.sketchArcs
+    circles = sketch.sketchCurves.sketchCircles
+    points = sketch.sketchPoints
 
-    Returns:
-        A circular pattern object.
-    """
-    
-    circular_pattern = geom_cons.createCircularPatternInput(entities, center_sk_pt)
-    
-    circular_pattern.quantity = adsk.core.ValueInput.createByReal(quantity)
-    circular_pattern.totalAngle = adsk.core.ValueInput.createByString("360 deg")
-    
-    return geom_cons.addCircularPattern(circular_pattern)
+    vertices = {}
 
-def rotate_point(points, pt, ang_deg, center):
+    def vertex(pt):
 
-    """
-    Rotate a 3D point around a center in the XY plane.
+        key = (round(pt[0], 9), round(pt[1], 9))
 
-    The Z coordinate is left unchanged.
+        if key not in vertices:
+            vertices[key] = points.add(adsk.core.Point3D.create(pt[0], pt[1], 0))
 
-    Args:
-        pt: Point to rotate.
-        ang_deg: Rotation angle in degrees, counterclockwise.
-        center: Center of rotation.
+        return vertices[key]
 
-    Returns:
-        A new Point3D representing the rotated point.
-    """
-    
-    theta = math.radians(ang_deg)
-    
-    dx = pt.x - center.x
-    dy = pt.y - center.y
-    
-    x_new = center.x + dx * math.cos(theta) - dy * math.sin(theta)
-    y_new = center.y + dx * math.sin(theta) + dy * math.cos(theta)
-    
-    new_pt = adsk.core.Point3D.create(x_new, y_new, pt.z)
+    curves = []
 
-    return points.add(new_pt)
+    for segment in region.segments:
 
-def draw_circle(circles, center, radius):
+        if isinstance(segment, cavity_geometry.Line):
+            curves.append(lines.addByTwoPoints(vertex(segment.start), vertex(segment.end)))
 
-    """
-    Create a sketch circle and fix its center point.
+        elif segment.is_circle:
+            center = adsk.core.Point3D.create(segment.center[0], segment.center[1], 0)
+            curves.append(circles.addByCenterRadius(center, segment.radius))
 
-    Args:
-        circles: `sketch.sketchCurves.sketchCircles`.
-        center: The circle's center.
-        radius: Circle radius.
+        else:
+            mid = adsk.core.Point3D.create(segment.midpoint[0], segment.midpoint[1], 0)
+            curves.append(arcs.addByThreePoints(vertex(segment.start), mid, vertex(segment.end)))
 
-    Returns:
-        A tuple containing the created circle object and its center.
-    """
-    
-    circle = circles.addByCenterRadius(center, radius)
-    circle_center = circle.centerSketchPoint
-    circle_center.isFixed = True
-    
-    return circle, circle_center
+    return curves
 
 # Extrude helpers
 
@@ -225,171 +151,43 @@ def build(comp, r, R, w, W, h, H, t, n):
         H: Shield height
         t: Gap length
         n: Gap quantity (integer)
+
+    Raises:
+        ValueError: If the parameters don't describe a buildable cavity.
     """
 
-    # Create sketch
-    
-    sketches = comp.sketches
-    xy_plane = comp.xYConstructionPlane
-    sketch = sketches.add(xy_plane)
+    # Layout, computed without Fusion
 
-    lines = sketch.sketchCurves.sketchLines
-    circles = sketch.sketchCurves.sketchCircles
-    
-    points = sketch.sketchPoints
-    dims = sketch.sketchDimensions
-    geom_cons = sketch.geometricConstraints
+    geometry = cavity_geometry.compute(r, R, w, W, h, H, t, n)
 
+    sketches = comp.sketches
+    xy_plane = comp.xYConstructionPlane
     extrudes = comp.features.extrudeFeatures
 
-    center = adsk.core.Point3D.create(0, 0, 0)
-    center_sk = points.add(center)
-
-    # Circles
-
-    c1, c1_center_sk = draw_circle(circles, center_sk, r)
-    
-    c2, _ = draw_circle(circles, center_sk, R)
-    c3, c3_center_sk = draw_circle(circles, center_sk, r + w)
-    draw_circle(circles, center_sk, R + W)
-
-    c3_circum = get_circle_circum(c3)
-
-    # Gap line
-
-    c1_pt = adsk.core.Point3D.create(c1.radius, 0, 0)
-    c1_sk = points.add(c1_pt)
-
-    c3_pt = adsk.core.Point3D.create(c3.radius, 0, 0)
-    c3_sk = points.add(c3_pt)
-
-    geom_cons.addCoincident(c1_sk, c1)
-    geom_cons.addCoincident(c3_sk, c3)
-
-    c1_text_pt = adsk.core.Point3D.create(t, 0, 0)
-    c3_text_pt = adsk.core.Point3D.create(t, 0, 0)
-
-    dims.addDistanceDimension(c1_center_sk, c1_sk, adsk.fusion.DimensionOrientations.VerticalDimensionOrientation, c1_text_pt).parameter.value = t / 2.0
-    dims.addDistanceDimension(c3_center_sk, c3_sk, adsk.fusion.DimensionOrientations.VerticalDimensionOrientation, c3_text_pt).parameter.value = t / 2.0
-
-    l1 = lines.addByTwoPoints(c1_sk, c3_sk)
-    l1_length = l1.length
-
-    # Mirror Gap line
-
-    rc1_sk = reflect_point(points, c1_sk.geometry, y=True)
-    rc3_sk = reflect_point(points, c3_sk.geometry, y=True)
-    l2 = lines.addByTwoPoints(rc1_sk, rc3_sk)
-
-    # Rotate gap lines
-
-    rotate_entities(geom_cons, center_sk, [l1, l2], n)
-
-    # Spruces
-
-    gap_area = t * l1_length
-    
-    approx_gap_arc_lengths = n * l1_length
-    approx_segment_arc_lengths = c3_circum - approx_gap_arc_lengths
-    
-    spruce_half_angle = (get_arc_length_theta(approx_segment_arc_lengths, c3.radius) / n) * 0.25
-
-    for profile in sketch.profiles:
-        
-        props = profile.areaProperties()
-        
-        area = props.area
-        centroid = props.centroid
-
-        x, y   = centroid.x, centroid.y
-        radius = math.sqrt(x * x + y * y)
-
-        # Find electrode profile
-        if (gap_area < area) and (r < radius < r + w):
-
-            # Add spruce
-
-            # Add spruce endpoints
+    # Electrodes + spruces, one closed outline per segment
 
-            pos_rot1_sk = rotate_point(points, centroid, int(spruce_half_angle), center)
-            pos_rot2_sk = rotate_point(points, centroid, int(spruce_half_angle), center)
-
-            geom_cons.addCoincident(pos_rot1_sk, c2)
-            geom_cons.addCoincident(pos_rot2_sk, c3)
-
-            neg_rot1_sk = rotate_point(points, centroid, -int(spruce_half_angle), center)
-            neg_rot2_sk = rotate_point(points, centroid, -int(spruce_half_angle), center)
-
-            geom_cons.addCoincident(neg_rot1_sk, c2)
-            geom_cons.addCoincident(neg_rot2_sk, c3)
-
-            # Draw lines between endpoints to create closed profile for spruce
-
-            l3 = lines.addByTwoPoints(pos_rot1_sk, pos_rot2_sk)
-            l4 = lines.addByTwoPoints(neg_rot1_sk, neg_rot2_sk)
-
-            # Rotate sketch entities to add spruce to all electrode profiles
-
-            rotate_entities(geom_cons, center_sk, [l3, l4], n)
-
-            break
-
-    # Spruce profile condition
-
-    min_area = float("inf")
-    for profile in sketch.profiles:
-        
-        props = profile.areaProperties()
-        
-        area = props.area
-        centroid = props.centroid
-
-        x, y = centroid.x, centroid.y
-        radius = math.sqrt(x * x + y * y)
+    sketch = sketches.add(xy_plane)
 
-        if (r + w < radius < R):
-            min_area = min(min_area, area)
+    for outline in geometry.outlines:
+        draw_region(sketch, outline)
 
-    # Extrude spruces + electrode
-    
     profile_collection = adsk.core.ObjectCollection.create()
     for profile in sketch.profiles:
-        
-        props = profile.areaProperties()
-        
-        area = props.area
-        centroid = props.centroid
-
-        x, y = centroid.x, centroid.y
-        radius = math.sqrt(x * x + y * y)
-
-        # electode profile
-        if (gap_area < area) and (r < radius < r + w):
-            profile_collection.add(profile)
-
-        # spruce profile
-        if abs(area - (1 + 1e-5) * min_area) <= 1e-5 and (r + w < radius < R):
-            profile_collection.add(profile)
+        profile_collection.add(profile)
 
     extrude_profiles(extrudes, profile_collection, h)
 
     # Shield
 
-    shield_profile = None
-    max_diag_len = 0.0
+    sketch = sketches.add(xy_plane)
+    draw_region(sketch, geometry.shield)
 
+    # The annulus is the profile bounded by both circles, the other is the disc inside
+    profile_collection = adsk.core.ObjectCollection.create()
     for profile in sketch.profiles:
-        
-        bb = profile.boundingBox
-        diag_vec = bb.minPoint.vectorTo(bb.maxPoint)
-        diag_len = diag_vec.length
-
-        if max_diag_len < diag_len:
-            shield_profile = profile
-            max_diag_len = diag_len
+        if profile.profileLoops.count == 2:
+            profile_collection.add(profile)
 
-    profile_collection = adsk.core.ObjectCollection.create()
-    profile_collection.add(shield_profile)
     extrude_profiles(extrudes, profile_collection, H, operation=adsk.fusion.FeatureOperations.JoinFeatureOperation)
 
 def _read_params_from_inputs(inputs):
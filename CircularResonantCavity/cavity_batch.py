@@ -0,0 +1,353 @@
+# Circular resonant cavity – batch generation over a parameter sweep
+#
+# Builds every parameter set of a CSV or JSON file without Fusion: geometry
+# summary, STL from cavity_mesh and the ordered G-code from cavity_cam and
+# cavity_toolpath, in a pool of worker processes.
+#
+# Every variant is written to <out>/<key>/ where key hashes its parameters and
+# CAM settings, so sets already built by an earlier run, or repeated within one
+# file, are skipped. <out>/index.csv lists every set of the last run.
+#
+# Parameter files name the dialog's parameters (r, R, w, W, h, H, t in cm, n)
+# and optionally CamSettings fields (tool_diameter, stepdown, ... in mm). Missing
+# values take the dialog's defaults.
+#
+#   CSV   one set per row, blank cells use the defaults
+#   JSON  a list of sets, or {"base": {...}, "sweep": {"n": [...], ...}} for
+#         every combination of the swept values over base, each swept value a
+#         list or {"start": a, "stop": b, "step": c} with b included
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, fields
+
+import itertools
+import argparse
+import hashlib
+import shutil
+import json
+import time
+import csv
+import os
+
+try:
+    from . import cavity_cam
+    from . import cavity_geometry
+    from . import cavity_mesh
+    from . import cavity_toolpath
+except ImportError:
+    import cavity_cam
+    import cavity_geometry
+    import cavity_mesh
+    import cavity_toolpath
+
+# Bumped whenever the outputs for a given key change
+FORMAT = 1
+
+GEOMETRY = ("r", "R", "w", "W", "h", "H", "t", "n")
+CAM = tuple(f.name for f in fields(cavity_cam.CamSettings) if f.name not in ("origin",))
+
+# Parameter files
+
+def value_range(spec):
+
+    """
+    Expand a {"start", "stop", "step"} range, stop included.
+    """
+
+    start, stop, step = spec["start"], spec["stop"], spec.get("step", 1)
+
+    if step <= 0:
+        raise ValueError(f"range step must be positive: {spec}")
+
+    count = int(round((stop - start) / step)) + 1
+    values = [round(start + i * step, 12) for i in range(count)]
+
+    return [int(v) for v in values] if all(isinstance(x, int) for x in (start, stop, step)) else values
+
+def expand(document):
+
+    """
+    Parameter sets of a parsed JSON document.
+    """
+
+    if isinstance(document, list):
+        return document
+
+    base = document.get("base", {})
+    sweep = {name: value_range(values) if isinstance(values, dict) else list(values) for name, values in document.get("sweep", {}).items()}
+
+    return [{**base, **dict(zip(sweep, combination))} for combination in itertools.product(*sweep.values())]
+
+def read_sets(path):
+
+    """
+    Read parameter sets from a .csv or .json file.
+
+    Returns:
+        A list of dicts.
+    """
+
+    with open(path, "r", encoding="utf-8", newline="") as f:
+
+        if path.lower().endswith(".json"):
+            return expand(json.load(f))
+
+        return [{name: value for name, value in row.items() if name and value not in (None, "")} for row in csv.DictReader(f)]
+
+def defaults():
+
+    parser = cavity_cam.build_parser()
+
+    return {name: parser.get_default(name) for name in GEOMETRY}
+
+def normalize(raw, base):
+
+    """
+    Split a parameter set into geometry parameters and CamSettings.
+
+    Raises:
+        ValueError: On unknown names or values that aren't numbers.
+    """
+
+    unknown = set(raw) - set(GEOMETRY) - set(CAM)
+
+    if unknown:
+        raise ValueError(f"unknown parameters {sorted(unknown)}, expected {list(GEOMETRY + CAM)}")
+
+    params = {}
+
+    for name in GEOMETRY:
+        value = raw.get(name, base[name])
+        params[name] = int(float(value)) if name == "n" else float(value)
+
+    cam = {}
+
+    for f in fields(cavity_cam.CamSettings):
+        if f.name in raw:
+            value = raw[f.name]
+            cam[f.name] = None if value is None else int(float(value)) if isinstance(f.default, int) else float(value)
+
+    return params, cavity_cam.CamSettings(**cam)
+
+def variant_key(params, settings, tolerance):
+
+    """
+    Content address of a variant, stable across runs and machines.
+    """
+
+    content = {"format": FORMAT, "parameters": params, "cam": asdict(settings), "tolerance": tolerance}
+    text = json.dumps(content, sort_keys=True, separators=(",", ":"))
+
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+# Variants
+
+def build_variant(out_dir, key, params, settings, tolerance):
+
+    """
+    Build one variant into out_dir/key, staged in a temporary directory so an
+    interrupted run never leaves a partial variant behind.
+
+    Returns:
+        The variant's summary dict.
+
+    Raises:
+        ValueError: If the parameters don't describe a buildable cavity.
+    """
+
+    start = time.perf_counter()
+
+    geometry = cavity_geometry.compute(*(params[name] for name in GEOMETRY))
+    passes = cavity_toolpath.optimize(list(cavity_cam.CavityCam(geometry, settings).passes()), settings)
+
+    staging = os.path.join(out_dir, f".{key}.{os.getpid()}.tmp")
+    os.makedirs(staging, exist_ok=True)
+
+    try:
+
+        triangles = cavity_mesh.mesh(geometry, tolerance)
+        cavity_mesh.write_stl(triangles, os.path.join(staging, "cavity.stl"), cavity_cam.program_title(geometry))
+
+        with open(os.path.join(staging, "cavity.nc"), "w", encoding="ascii") as f:
+            program = cavity_cam.write_program(passes, f, settings, cavity_cam.program_title(geometry))
+
+        estimate = cavity_toolpath.estimate(passes, settings)
+
+        summary = {
+            "key": key,
+            "parameters": params,
+            "cam": asdict(settings),
+            "geometry": geometry.summary(),
+            "mesh": {"triangles": len(triangles), "volume": cavity_mesh.volume(triangles), "tolerance": tolerance},
+            "program": {**program, "seconds": estimate["seconds"], "retracts": estimate["retracts"]},
+            "build_seconds": time.perf_counter() - start,
+        }
+
+        with open(os.path.join(staging, "summary.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+        target = os.path.join(out_dir, key)
+
+        if os.path.isdir(target):
+            shutil.rmtree(staging)
+        else:
+            os.replace(staging, target)
+
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    return summary
+
+def load_summary(out_dir, key):
+
+    path = os.path.join(out_dir, key, "summary.json")
+
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+# Batch
+
+def run(sets, out_dir, jobs=None, tolerance=0.001):
+
+    """
+    Build every parameter set not already in out_dir.
+
+    Args:
+        sets: Parameter dicts, as from read_sets.
+        out_dir: Content-addressed output directory.
+        jobs: Worker processes, all CPUs by default, 1 builds in this process.
+        tolerance: Mesh chord tolerance in cm.
+
+    Returns:
+        One row per set with its key, status ("built", "cached", "duplicate"
+        or "failed"), parameters, and the error or program estimate.
+    """
+
+    os.makedirs(out_dir, exist_ok=True)
+
+    base = defaults()
+    rows, pending = [], {}
+
+    for index, raw in enumerate(sets):
+
+        row = {"index": index, "key": "", "status": "", "error": ""}
+
+        try:
+            params, settings = normalize(raw, base)
+        except ValueError as e:
+            rows.append({**row, **raw, "status": "failed", "error": str(e)})
+            continue
+
+        key = variant_key(params, settings, tolerance)
+        row.update(params, key=key)
+
+        if key in pending:
+            row["status"] = "duplicate"
+        elif load_summary(out_dir, key) is not None:
+            row["status"] = "cached"
+        else:
+            pending[key] = (params, settings)
+
+        rows.append(row)
+
+    results = {}
+
+    def record(key, result):
+
+        # Anything else a variant raises (a mesher bug, a worker killed by the
+        # OS) fails that set only, the rest of the sweep still gets built
+
+        try:
+            results[key] = ("built", result())
+        except ValueError as e:
+            results[key] = ("failed", str(e))
+        except Exception as e:
+            results[key] = ("failed", f"{type(e).__name__}: {e}")
+
+        print(f"{len(results)}/{len(pending)} {key} {results[key][0]}")
+
+    if jobs == 1 or len(pending) <= 1:
+
+        for key, (params, settings) in pending.items():
+            record(key, lambda: build_variant(out_dir, key, params, settings, tolerance))
+
+    else:
+
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+
+            futures = {key: pool.submit(build_variant, out_dir, key, params, settings, tolerance) for key, (params, settings) in pending.items()}
+
+            for key, future in futures.items():
+                record(key, future.result)
+
+    for row in rows:
+
+        if not row["key"]:
+            continue
+
+        status, outcome = results.get(row["key"], ("cached", None))
+        row["status"] = row["status"] or status
+
+        if status == "failed":
+            row["error"] = outcome
+            continue
+
+        summary = load_summary(out_dir, row["key"])
+
+        row["seconds"] = round(summary["program"]["seconds"], 1)
+        row["volume"] = round(summary["mesh"]["volume"], 6)
+
+    return rows
+
+def write_index(rows, out_dir):
+
+    """
+    Write the run's rows to out_dir/index.csv atomically.
+    """
+
+    columns = ["index", "key", "status", *GEOMETRY, "seconds", "volume", "error"]
+    columns += sorted({name for row in rows for name in row} - set(columns))
+
+    path = os.path.join(out_dir, "index.csv")
+    tmp = path + ".tmp"
+
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    os.replace(tmp, path)
+
+    return path
+
+# Command line
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Build cavity variants (summary, STL, G-code) for every parameter set of a sweep.")
+
+    parser.add_argument("sets", help=".csv or .json parameter sets")
+    parser.add_argument("--out", default="cavities", help="content-addressed output directory")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes, all CPUs by default")
+    parser.add_argument("--tolerance", type=float, default=0.001, help="STL chord tolerance (cm)")
+
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+
+    rows = run(read_sets(args.sets), args.out, args.jobs, args.tolerance)
+    index = write_index(rows, args.out)
+
+    counts = {}
+    for row in rows:
+        counts[row["status"]] = counts.get(row["status"], 0) + 1
+
+    print(f"{len(rows)} sets in {time.perf_counter() - start:.1f} s: " + ", ".join(f"{count} {status}" for status, count in sorted(counts.items())))
+    print(f"Wrote {index}")
+
+if __name__ == "__main__":
+    main()
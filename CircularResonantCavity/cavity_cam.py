@@ -0,0 +1,755 @@
+# Circular resonant cavity – headless G-code generation
+#
+# Mills one side of the cavity from the computed geometry, without Fusion's CAM.
+# The cavity is symmetric about its mid plane, so the same program is run for
+# the top and the bottom setup, like Fusion360Assets/top-pass.nc and
+# bottom-pass.nc.
+#
+# Work coordinates are in mm (G21) with Z0 on the stock top, which is the top of
+# the shield, and X0 Y0 on the cavity axis (offset with --origin). Operations:
+#   face     pocket inside the shield down to the electrode top, if H > h
+#   bore     pocket inside the electrodes
+#   channel  one pocket per channel between neighbouring spruces
+#   slot     the gaps between electrode segments
+#   outside  a ring around the shield
+# followed by finishing contours of every wall. Roughing leaves
+# finish_allowance on the walls, finishing takes it off in climb milling (M3,
+# inside contours counterclockwise, outside contours clockwise).
+
+from dataclasses import dataclass, field, replace
+
+import argparse
+import math
+import time
+
+try:
+    from . import cavity_geometry
+except ImportError:
+    import cavity_geometry
+
+MM_PER_CM = 10.0
+
+@dataclass(frozen=True)
+class CamSettings:
+
+    """
+    Tool, cutting and program settings, lengths in mm and feeds in mm/min.
+
+    Args:
+        tool: Tool number.
+        tool_diameter: Flat end mill diameter.
+        spindle: Spindle speed in rpm.
+        feed: Cutting feed.
+        plunge_feed: Feed for vertical entries.
+        stepdown: Roughing depth of cut.
+        stepover: Roughing distance between neighbouring passes.
+        finish_allowance: Material roughing leaves on the walls.
+        finish_stepdown: Finishing depth of cut.
+        depth: Milling depth below the stock top, half the shield height if None.
+        outside_margin: Width of the ring cleared around the shield.
+        clearance: Z for moves between operations.
+        retract: Z for rapids between passes.
+        feed_height: Height above the material where rapid approaches stop.
+        origin: (x, y) of the cavity axis in work coordinates.
+        program: Program number written to the header.
+    """
+
+    tool: int = 1
+    tool_diameter: float = 1.0
+    spindle: int = 5000
+    feed: float = 1000.0
+    plunge_feed: float = 333.3
+    stepdown: float = 0.25
+    stepover: float = 0.4
+    finish_allowance: float = 0.1
+    finish_stepdown: float = 1.0
+    depth: float | None = None
+    outside_margin: float | None = None
+    clearance: float = 15.0
+    retract: float = 1.0
+    feed_height: float = 0.15
+    origin: tuple = (0.0, 0.0)
+    program: int = 1001
+
+    @property
+    def tool_radius(self):
+        return self.tool_diameter / 2.0
+
+@dataclass(frozen=True)
+class Pass:
+
+    """
+    Contiguous cut, entered and left with the tool down.
+
+    Args:
+        operation: Operation the pass belongs to.
+        region: Index of the pocket, channel or gap within the operation.
+        level: Depth level within the region, levels must be cut in order.
+        top: Z of the material at the entry point before the pass.
+        start: (x, y, z) entry point.
+        moves: Cutting moves from the entry point, ("G1", x, y, z) or
+            ("G2"/"G3", x, y, z, cx, cy) with absolute arc centers.
+    """
+
+    operation: str
+    region: int
+    level: int
+    top: float
+    start: tuple
+    moves: tuple = field(repr=False)
+
+    @property
+    def end(self):
+        return self.moves[-1][1:4] if self.moves else self.start
+
+    def reversed(self):
+
+        """
+        The same cut traversed backwards, arcs flipping direction.
+        """
+
+        points = [self.start] + [move[1:4] for move in self.moves]
+        moves = []
+
+        for i in range(len(self.moves) - 1, -1, -1):
+
+            move, target = self.moves[i], points[i]
+
+            if move[0] == "G1":
+                moves.append(("G1",) + tuple(target))
+            else:
+                moves.append(("G3" if move[0] == "G2" else "G2",) + tuple(target) + tuple(move[4:6]))
+
+        return replace(self, start=self.end, moves=tuple(moves))
+
+# Path helpers
+
+def levels(top, bottom, stepdown):
+
+    """
+    Evenly spaced depths of cut from top down to bottom.
+
+    Args:
+        top: Z of the material top.
+        bottom: Z of the final floor.
+        stepdown: Maximum depth of cut.
+
+    Returns:
+        A list of Z values ending at bottom, empty if bottom isn't below top.
+    """
+
+    if bottom >= top - 1e-9:
+        return []
+
+    count = math.ceil((top - bottom) / stepdown - 1e-9)
+
+    return [top - (top - bottom) * (i + 1) / count for i in range(count)]
+
+def radii(inner, outer, stepover):
+
+    """
+    Evenly spaced pass radii from inner to outer, both included.
+    """
+
+    if outer < inner - 1e-9:
+        return []
+
+    count = max(1, math.ceil((outer - inner) / stepover - 1e-9))
+
+    return [inner + (outer - inner) * i / count for i in range(count + 1)]
+
+def circle(center, radius, z, clockwise=False):
+
+    """
+    Full circle from and back to its +x point, as two half arcs.
+    """
+
+    cx, cy = center
+    g = "G2" if clockwise else "G3"
+
+    return [(g, cx - radius, cy, z, cx, cy), (g, cx + radius, cy, z, cx, cy)]
+
+def arc(center, radius, start, end, z):
+
+    """
+    Arc from angle start to end, counterclockwise if end > start.
+    """
+
+    cx, cy = center
+    x, y = cx + radius * math.cos(end), cy + radius * math.sin(end)
+
+    return ("G3" if end > start else "G2", x, y, z, cx, cy)
+
+def polar(center, radius, angle, z):
+    return (center[0] + radius * math.cos(angle), center[1] + radius * math.sin(angle), z)
+
+def offset_angle(clearance, radius):
+
+    """
+    Angle to turn away from a radial edge to keep clearance from it at radius.
+    """
+
+    return math.asin(min(1.0, clearance / radius))
+
+# Operations
+
+class CavityCam:
+
+    """
+    Toolpaths for one side of a cavity.
+
+    Args:
+        geometry: A `cavity_geometry.CavityGeometry`.
+        settings: CamSettings.
+
+    Raises:
+        ValueError: If the tool doesn't fit the cavity's features.
+    """
+
+    def __init__(self, geometry, settings=CamSettings()):
+
+        self.geometry = geometry
+        self.settings = settings
+
+        g, s = geometry, settings
+
+        # Model dimensions in mm
+        self.r = g.r * MM_PER_CM
+        self.ro = (g.r + g.w) * MM_PER_CM
+        self.R = g.R * MM_PER_CM
+        self.RW = (g.R + g.W) * MM_PER_CM
+        self.t = g.t * MM_PER_CM
+
+        # Z levels, the electrodes stand (H - h) / 2 below the shield top
+        self.face_z = -max(0.0, (g.H - g.h) * MM_PER_CM / 2.0)
+        self.bottom = -(s.depth if s.depth is not None else g.H * MM_PER_CM / 2.0)
+        self.margin = s.outside_margin if s.outside_margin is not None else s.tool_diameter
+
+        self.center = s.origin
+
+        tr = s.tool_radius
+
+        if s.stepover <= 0 or s.stepover > s.tool_diameter:
+            raise ValueError(f"stepover {s.stepover} must be in (0, {s.tool_diameter}]")
+
+        if s.stepdown <= 0 or s.finish_stepdown <= 0:
+            raise ValueError("stepdown and finish_stepdown must be positive")
+
+        if self.bottom > self.face_z:
+            raise ValueError(f"depth {-self.bottom} doesn't reach the electrode top at {-self.face_z}")
+
+        if tr >= self.t / 2.0:
+            raise ValueError(f"a {s.tool_diameter} mm tool doesn't fit the {self.t:.3f} mm gaps")
+
+        if s.tool_diameter + 2.0 * s.finish_allowance >= self.R - self.ro:
+            raise ValueError(f"a {s.tool_diameter} mm tool doesn't fit the {self.R - self.ro:.3f} mm channels")
+
+        if tr + s.finish_allowance >= self.r:
+            raise ValueError(f"a {s.tool_diameter} mm tool doesn't fit the {2.0 * self.r:.3f} mm bore")
+
+    def channel_edges(self, k):
+
+        """
+        Angles of the spruce edges bounding channel k, which holds gap k.
+        """
+
+        g = self.geometry
+        phi = g.gap_angles[k]
+
+        return phi - g.pitch / 2.0 + g.spruce_half_angle, phi + g.pitch / 2.0 - g.spruce_half_angle
+
+    def disc(self, operation, radius, top, bottom):
+
+        """
+        Pocket a disc outwards from its center, one pass per level.
+        """
+
+        s = self.settings
+        cx, cy = self.center
+
+        rings = radii(0.0, radius - s.tool_radius - s.finish_allowance, s.stepover)[1:]
+        previous = top
+
+        for level, z in enumerate(levels(top, bottom, s.stepdown)):
+
+            moves = []
+
+            for rho in rings:
+                moves.append(("G1", cx + rho, cy, z))
+                moves.extend(circle(self.center, rho, z))
+
+            yield Pass(operation, 0, level, previous, (cx, cy, z), tuple(moves))
+
+            previous = z
+
+    def channel(self, k, top, bottom, clearance):
+
+        """
+        Rings of arcs across channel k, alternating direction so the passes
+        link along the spruce edges.
+        """
+
+        s = self.settings
+        sigma1, sigma2 = self.channel_edges(k)
+
+        rings = []
+
+        for rho in radii(self.ro + clearance, self.R - clearance, s.stepover):
+
+            turn = offset_angle(clearance, rho)
+
+            if sigma2 - turn > sigma1 + turn:
+                rings.append((rho, sigma1 + turn, sigma2 - turn))
+
+        if not rings:
+            return
+
+        previous = top
+
+        for level, z in enumerate(levels(top, bottom, s.stepdown)):
+
+            moves = []
+
+            for i, (rho, theta1, theta2) in enumerate(rings):
+
+                start, end = (theta1, theta2) if i % 2 == 0 else (theta2, theta1)
+
+                if i > 0:
+                    moves.append(("G1",) + polar(self.center, rho, start, z))
+
+                moves.append(arc(self.center, rho, start, end, z))
+
+            yield Pass("channel", k, level, previous, polar(self.center, rings[0][0], rings[0][1], z), tuple(moves))
+
+            previous = z
+
+    def slot_lines(self, k, offsets, z):
+
+        """
+        Lines along gap k at the given offsets from its center line, alternating
+        direction, from inside the bore out into the channel.
+        """
+
+        phi = self.geometry.gap_angles[k]
+        tr = self.settings.tool_radius
+
+        ux, uy = math.cos(phi), math.sin(phi)
+        nx, ny = -uy, ux
+
+        # Both ends lie in material the bore and channel operations removed
+        inner, outer = self.r - tr, self.ro + tr
+        cx, cy = self.center
+
+        points = []
+
+        for i, offset in enumerate(offsets):
+
+            ends = [inner, outer] if i % 2 == 0 else [outer, inner]
+
+            for along in ends:
+                points.append((cx + along * ux + offset * nx, cy + along * uy + offset * ny, z))
+
+        return points
+
+    def slot(self, k, top, bottom):
+
+        s = self.settings
+
+        half = max(0.0, self.t / 2.0 - s.tool_radius - s.finish_allowance)
+        offsets = radii(-half, half, s.stepover) if half > 0 else [0.0]
+
+        previous = top
+
+        for level, z in enumerate(levels(top, bottom, s.stepdown)):
+
+            points = self.slot_lines(k, offsets, z)
+
+            yield Pass("slot", k, level, previous, points[0], tuple(("G1",) + point for point in points[1:]))
+
+            previous = z
+
+    def outside(self, top, bottom):
+
+        """
+        Clear a ring around the shield, outermost contour first.
+        """
+
+        s = self.settings
+        cx, cy = self.center
+
+        inner = self.RW + s.tool_radius + s.finish_allowance
+        rings = radii(inner, max(inner, self.RW + self.margin + s.tool_radius), s.stepover)[::-1]
+
+        previous = top
+
+        for level, z in enumerate(levels(top, bottom, s.stepdown)):
+
+            moves = []
+
+            for i, rho in enumerate(rings):
+
+                if i > 0:
+                    moves.append(("G1", cx + rho, cy, z))
+
+                moves.extend(circle(self.center, rho, z, clockwise=True))
+
+            yield Pass("outside", 0, level, previous, (cx + rings[0], cy, z), tuple(moves))
+
+            previous = z
+
+    def contour(self, operation, region, radius, top, bottom, clockwise=False):
+
+        """
+        Full circle finishing pass at every finishing level.
+        """
+
+        cx, cy = self.center
+
+        for level, z in enumerate(levels(top, bottom, self.settings.finish_stepdown)):
+            yield Pass(operation, region, level, top, (cx + radius, cy, z), tuple(circle(self.center, radius, z, clockwise)))
+
+    def channel_contour(self, k, top, bottom):
+
+        """
+        Finish channel k's walls, counterclockwise around the channel: out
+        along one spruce, along the shield, in along the other spruce and back
+        along the electrode.
+        """
+
+        tr = self.settings.tool_radius
+        sigma1, sigma2 = self.channel_edges(k)
+
+        ri, ro = self.ro + tr, self.R - tr
+
+        a1, a2 = sigma1 + offset_angle(tr, ri), sigma2 - offset_angle(tr, ri)
+        b1, b2 = sigma1 + offset_angle(tr, ro), sigma2 - offset_angle(tr, ro)
+
+        for level, z in enumerate(levels(top, bottom, self.settings.finish_stepdown)):
+
+            moves = (
+                ("G1",) + polar(self.center, ro, b1, z),
+                arc(self.center, ro, b1, b2, z),
+                ("G1",) + polar(self.center, ri, a2, z),
+                arc(self.center, ri, a2, a1, z),
+            )
+
+            yield Pass("channel finish", k, level, top, polar(self.center, ri, a1, z), moves)
+
+    def slot_contour(self, k, top, bottom):
+
+        """
+        Finish gap k's walls, out along one and back along the other, closing
+        the loop across the gap's mouth in the bore.
+        """
+
+        half = self.t / 2.0 - self.settings.tool_radius
+
+        for level, z in enumerate(levels(top, bottom, self.settings.finish_stepdown)):
+
+            points = self.slot_lines(k, [-half, half], z)
+
+            yield Pass("slot finish", k, level, top, points[0], tuple(("G1",) + point for point in points[1:] + points[:1]))
+
+    def passes(self):
+
+        """
+        Every pass of the program in cutting order.
+
+        Returns:
+            A generator of Pass.
+        """
+
+        g, s = self.geometry, self.settings
+        tr = s.tool_radius
+
+        yield from self.disc("face", self.R, 0.0, self.face_z)
+        yield from self.disc("bore", self.r, self.face_z, self.bottom)
+
+        for k in range(g.n):
+            yield from self.channel(k, self.face_z, self.bottom, tr + s.finish_allowance)
+
+        for k in range(g.n):
+            yield from self.slot(k, self.face_z, self.bottom)
+
+        yield from self.outside(0.0, self.bottom)
+
+        # Finishing
+
+        yield from self.contour("face finish", 0, self.R - tr, 0.0, self.face_z)
+        yield from self.contour("bore finish", 0, self.r - tr, self.face_z, self.bottom)
+
+        for k in range(g.n):
+            yield from self.channel_contour(k, self.face_z, self.bottom)
+
+        for k in range(g.n):
+            yield from self.slot_contour(k, self.face_z, self.bottom)
+
+        yield from self.contour("outside finish", 0, self.RW + tr, 0.0, self.bottom, clockwise=True)
+
+# Output
+
+def number(value):
+
+    """
+    Format a coordinate like Fusion's post: 3 decimals, no trailing zeros.
+    """
+
+    text = f"{value:.3f}".rstrip("0").rstrip(".")
+
+    return "0" if text in ("-0", "") else text
+
+class GcodeWriter:
+
+    """
+    Streams a program to a text file, dropping modal words that don't change.
+
+    Args:
+        f: File object to write to.
+    """
+
+    def __init__(self, f):
+
+        self.f = f
+        self.lines = 0
+
+        self.motion = None
+        self.feed = None
+        self.position = [None, None, None]
+
+        # Start of the arc being written, its I/J are relative to it
+        self.start = None
+
+    def write(self, line):
+
+        self.f.write(line + "\n")
+        self.lines += 1
+
+    def comment(self, text):
+        self.write(f"({text})")
+
+    def move(self, motion, x=None, y=None, z=None, feed=None, center=None):
+
+        words = [] if motion == self.motion else [motion]
+
+        for i, (axis, value) in enumerate(zip("XYZ", (x, y, z))):
+
+            if value is None:
+                continue
+
+            value = round(value, 3)
+
+            if value != self.position[i]:
+                words.append(f"{axis}{number(value)}")
+                self.position[i] = value
+
+        if center is not None:
+            # Arc centers are relative to the arc's start (G91.1)
+            words.append(f"I{number(center[0] - self.start[0])}")
+            words.append(f"J{number(center[1] - self.start[1])}")
+
+        elif words == [] or words == [motion]:
+            return
+
+        if feed is not None and motion != "G0" and feed != self.feed:
+            words.append(f"F{number(feed)}")
+            self.feed = feed
+
+        self.motion = motion
+        self.write(" ".join(words))
+
+    def rapid(self, x=None, y=None, z=None):
+        self.move("G0", x, y, z)
+
+    def line(self, x=None, y=None, z=None, feed=None):
+        self.move("G1", x, y, z, feed)
+
+    def arc(self, motion, x, y, z, center, feed=None):
+
+        self.start = tuple(self.position)
+        self.move(motion, x, y, z, feed, center)
+
+def link_moves(previous, cut, settings):
+
+    """
+    Moves from the end of the previous pass to the entry of the next.
+
+    A pass entered right below where the previous one ended is reached with a
+    plunge, any other through the retract plane, or through the clearance
+    plane at the start of an operation.
+
+    Args:
+        previous: (x, y, z) where the previous pass ended, None at the start
+            of an operation.
+        cut: The next Pass.
+        settings: CamSettings.
+
+    Returns:
+        A list of (motion, x, y, z, feed) with None for unchanged axes.
+    """
+
+    s = settings
+    x, y, z = cut.start
+
+    if previous is not None and math.isclose(previous[0], x, abs_tol=1e-6) and math.isclose(previous[1], y, abs_tol=1e-6):
+        return [("G1", None, None, z, s.plunge_feed)]
+
+    return [
+        ("G0", None, None, s.clearance if previous is None else s.retract, None),
+        ("G0", x, y, None, None),
+        ("G0", None, None, cut.top + s.feed_height, None),
+        ("G1", None, None, z, s.plunge_feed),
+    ]
+
+def write_program(passes, f, settings, title="Circular resonant cavity"):
+
+    """
+    Write a complete program for a sequence of passes.
+
+    Args:
+        passes: Iterable of Pass, consumed as it is written.
+        f: File object to write to.
+        settings: CamSettings.
+        title: Comment written after the program number.
+
+    Returns:
+        A dict with the number of lines and passes written.
+    """
+
+    s = settings
+    out = GcodeWriter(f)
+
+    out.comment(str(s.program))
+    out.comment(title)
+    out.comment(f"T{s.tool} D={number(s.tool_diameter)} CR=0 - flat end mill")
+
+    for line in ["G90 G94", "G17", "G21", "G28 G91 Z0", "G90"]:
+        out.write(line)
+
+    out.write("")
+    out.write(f"T{s.tool}")
+    out.write(f"S{s.spindle} M3")
+    out.write("G17 G90 G94")
+    out.write("G54")
+    out.write("M8")
+
+    operation = None
+    count = 0
+    last = None
+
+    for cut in passes:
+
+        if cut.operation != operation:
+
+            if operation is not None:
+                out.rapid(z=s.clearance)
+
+            out.comment(cut.operation)
+            operation = cut.operation
+            last = None
+
+        for motion, x, y, z, feed in link_moves(last, cut, s):
+            out.move(motion, x, y, z, feed)
+
+        for move in cut.moves:
+
+            if move[0] == "G1":
+                out.line(*move[1:4], feed=s.feed)
+            else:
+                out.arc(move[0], *move[1:4], center=move[4:6], feed=s.feed)
+
+        last = cut.end
+        count += 1
+
+    out.rapid(z=s.clearance)
+    out.write("")
+
+    for line in ["M9", "G28 G91 Z0", "G90", "G28 G91 X0 Y0", "G90", "M5", "M30"]:
+        out.write(line)
+
+    return {"lines": out.lines, "passes": count}
+
+def program_title(geometry):
+
+    g = geometry
+
+    return f"r={g.r} R={g.R} w={g.w} W={g.W} h={g.h} H={g.H} t={g.t} n={g.n}"
+
+def generate(geometry, path, settings=CamSettings()):
+
+    """
+    Generate the G-code program for one side of a cavity.
+
+    Args:
+        geometry: A `cavity_geometry.CavityGeometry`.
+        path: Output .nc file.
+        settings: CamSettings.
+
+    Returns:
+        A dict with the number of lines and passes written.
+    """
+
+    cam = CavityCam(geometry, settings)
+
+    with open(path, "w", encoding="ascii") as f:
+        return write_program(cam.passes(), f, settings, program_title(geometry))
+
+# Command line
+
+def build_parser(description="Generate G-code for one side of a circular resonant cavity."):
+
+    parser = argparse.ArgumentParser(description=description)
+
+    parser.add_argument("output", help=".nc file to write")
+
+    # Cavity parameters in cm, as in the Fusion dialog
+    parser.add_argument("--r", type=float, default=1.25, help="electrode radius (cm)")
+    parser.add_argument("--R", type=float, default=1.8, help="shield radius (cm)")
+    parser.add_argument("--w", type=float, default=0.38, help="electrode width (cm)")
+    parser.add_argument("--W", type=float, default=0.5, help="shield width (cm)")
+    parser.add_argument("--h", type=float, default=2.0, help="electrode height (cm)")
+    parser.add_argument("--H", type=float, default=2.25, help="shield height (cm)")
+    parser.add_argument("--t", type=float, default=0.2138, help="gap length (cm)")
+    parser.add_argument("--n", type=int, default=6, help="gap quantity")
+
+    # Tool and strategy in mm
+    parser.add_argument("--tool-diameter", type=float, default=CamSettings.tool_diameter)
+    parser.add_argument("--stepdown", type=float, default=CamSettings.stepdown)
+    parser.add_argument("--stepover", type=float, default=CamSettings.stepover)
+    parser.add_argument("--finish-allowance", type=float, default=CamSettings.finish_allowance)
+    parser.add_argument("--finish-stepdown", type=float, default=CamSettings.finish_stepdown)
+    parser.add_argument("--feed", type=float, default=CamSettings.feed)
+    parser.add_argument("--plunge-feed", type=float, default=CamSettings.plunge_feed)
+    parser.add_argument("--spindle", type=int, default=CamSettings.spindle)
+    parser.add_argument("--depth", type=float, default=None, help="milling depth (mm), half the shield height by default")
+    parser.add_argument("--origin", type=float, nargs=2, default=(0.0, 0.0), metavar=("X", "Y"))
+
+    return parser
+
+def settings_from_args(args):
+
+    return CamSettings(
+        tool_diameter=args.tool_diameter,
+        stepdown=args.stepdown,
+        stepover=args.stepover,
+        finish_allowance=args.finish_allowance,
+        finish_stepdown=args.finish_stepdown,
+        feed=args.feed,
+        plunge_feed=args.plunge_feed,
+        spindle=args.spindle,
+        depth=args.depth,
+        origin=tuple(args.origin),
+    )
+
+def main(argv=None):
+
+    args = build_parser().parse_args(argv)
+
+    start = time.perf_counter()
+
+    geometry = cavity_geometry.compute(args.r, args.R, args.w, args.W, args.h, args.H, args.t, args.n)
+    stats = generate(geometry, args.output, settings_from_args(args))
+
+    print(f"Wrote {stats['lines']} lines ({stats['passes']} passes) to {args.output} in {(time.perf_counter() - start) * 1e3:.1f} ms")
+
+if __name__ == "__main__":
+    main()
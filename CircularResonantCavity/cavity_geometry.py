@@ -0,0 +1,462 @@
+# Circular resonant cavity – headless geometry kernel
+#
+# Computes the cavity's 2D layout analytically, without Fusion. Lengths are in
+# cm (Fusion's internal unit) and angles in radians unless a name says deg.
+#
+# Layout, from the center outwards:
+#   r .. r + w   electrode ring, cut by n straight gaps of width t centered on
+#                the angles 360 * k / n deg
+#   r + w .. R   one spruce wedge per electrode segment, bridging it to the shield
+#   R .. R + W   shield annulus
+#
+# Every region is a list of closed loops of Line and Arc segments, outer loops
+# counterclockwise and holes clockwise, so areas and centroids follow from
+# Green's theorem in closed form.
+
+from dataclasses import dataclass, field
+
+import math
+
+# Segments
+
+@dataclass(frozen=True)
+class Line:
+
+    """
+    Straight boundary segment.
+
+    Args:
+        start: (x, y) start point.
+        end: (x, y) end point.
+    """
+
+    start: tuple
+    end: tuple
+
+    @property
+    def length(self):
+        return math.dist(self.start, self.end)
+
+    def moments(self):
+
+        """
+        Green's theorem contributions of the segment.
+
+        Returns:
+            A tuple `(a, mx, my)` of its contributions to the area and to the
+            first moments about the y and x axes.
+        """
+
+        (x1, y1), (x2, y2) = self.start, self.end
+
+        a = (x1 * y2 - x2 * y1) / 2.0
+        mx = (y2 - y1) * (x1 * x1 + x1 * x2 + x2 * x2) / 6.0
+        my = -(x2 - x1) * (y1 * y1 + y1 * y2 + y2 * y2) / 6.0
+
+        return a, mx, my
+
+@dataclass(frozen=True)
+class Arc:
+
+    """
+    Circular boundary segment, counterclockwise if end_angle > start_angle.
+
+    Args:
+        center: (x, y) arc center.
+        radius: Arc radius.
+        start_angle: Start angle in radians.
+        end_angle: End angle in radians.
+    """
+
+    center: tuple
+    radius: float
+    start_angle: float
+    end_angle: float
+
+    @property
+    def sweep(self):
+        return self.end_angle - self.start_angle
+
+    @property
+    def is_circle(self):
+        return math.isclose(abs(self.sweep), 2.0 * math.pi)
+
+    @property
+    def length(self):
+        return abs(self.sweep) * self.radius
+
+    def point_at(self, angle):
+        return polar(self.radius, angle, self.center)
+
+    @property
+    def start(self):
+        return self.point_at(self.start_angle)
+
+    @property
+    def end(self):
+        return self.point_at(self.end_angle)
+
+    @property
+    def midpoint(self):
+        return self.point_at((self.start_angle + self.end_angle) / 2.0)
+
+    def moments(self):
+
+        """
+        Green's theorem contributions of the segment.
+
+        Returns:
+            A tuple `(a, mx, my)` of its contributions to the area and to the
+            first moments about the y and x axes.
+        """
+
+        (cx, cy), rho = self.center, self.radius
+        t1, t2 = self.start_angle, self.end_angle
+
+        s1, s2 = math.sin(t1), math.sin(t2)
+        c1, c2 = math.cos(t1), math.cos(t2)
+
+        # Integrals of sin^k and cos^k over [t1, t2]
+        int_c = s2 - s1
+        int_s = c1 - c2
+        int_c2 = (t2 - t1) / 2.0 + (math.sin(2.0 * t2) - math.sin(2.0 * t1)) / 4.0
+        int_s2 = (t2 - t1) / 2.0 - (math.sin(2.0 * t2) - math.sin(2.0 * t1)) / 4.0
+        int_c3 = int_c - (s2 ** 3 - s1 ** 3) / 3.0
+        int_s3 = int_s + (c2 ** 3 - c1 ** 3) / 3.0
+
+        a = rho * (cx * int_c + cy * int_s + rho * (t2 - t1)) / 2.0
+        mx = rho * (cx * cx * int_c + 2.0 * cx * rho * int_c2 + rho * rho * int_c3) / 2.0
+        my = rho * (cy * cy * int_s + 2.0 * cy * rho * int_s2 + rho * rho * int_s3) / 2.0
+
+        return a, mx, my
+
+# Regions
+
+@dataclass(frozen=True)
+class Region:
+
+    """
+    Closed 2D region.
+
+    Args:
+        kind: "electrode", "gap", "spruce", "outline" or "shield".
+        index: Position of the region in its pattern.
+        loops: Closed loops of Line/Arc segments, holes clockwise.
+        area: Region area.
+        centroid: (x, y) region centroid.
+    """
+
+    kind: str
+    index: int
+    loops: tuple
+    area: float
+    centroid: tuple
+
+    @property
+    def segments(self):
+        return [segment for loop in self.loops for segment in loop]
+
+def make_region(kind, index, loops):
+
+    """
+    Create a region and integrate its area and centroid.
+
+    Args:
+        kind: Region kind.
+        index: Position of the region in its pattern.
+        loops: Closed loops of Line/Arc segments.
+
+    Returns:
+        The Region.
+    """
+
+    area = mx = my = 0.0
+
+    for loop in loops:
+        for segment in loop:
+
+            a, x, y = segment.moments()
+
+            area += a
+            mx += x
+            my += y
+
+    return Region(kind, index, tuple(tuple(loop) for loop in loops), area, (mx / area, my / area))
+
+# Geometric helpers
+
+def polar(radius, angle, center=(0.0, 0.0)):
+
+    """
+    Point at a given radius and angle around a center.
+
+    Args:
+        radius: Distance from the center.
+        angle: Angle in radians, counterclockwise from +x.
+        center: (x, y) center.
+
+    Returns:
+        The (x, y) point.
+    """
+
+    return (center[0] + radius * math.cos(angle), center[1] + radius * math.sin(angle))
+
+def chord_angle(offset, radius):
+
+    """
+    Angle, seen from the center, between a line's normal and the point where
+    the line crosses a circle.
+
+    Args:
+        offset: Distance between the line and the center.
+        radius: Circle radius.
+
+    Returns:
+        The angle in radians.
+    """
+
+    return math.asin(offset / radius)
+
+# Cavity
+
+@dataclass(frozen=True)
+class CavityGeometry:
+
+    """
+    Precomputed layout of a circular resonant cavity.
+
+    Args:
+        r: Electrode radius.
+        R: Shield radius.
+        w: Electrode width.
+        W: Shield width.
+        h: Electrode height.
+        H: Shield height.
+        t: Gap length.
+        n: Gap quantity.
+        gap_angles: Center angle of every gap, in radians.
+        spruce_half_angle_deg: Half the angle spanned by a spruce, in whole degrees.
+        electrodes: Electrode segments, segment k lying between gaps k and k + 1.
+        gaps: Gap slots through the electrode ring.
+        spruces: Spruce wedges, spruce k centered on electrode segment k.
+        outlines: Electrode segments merged with their spruce, one closed loop each.
+        shield: Shield annulus.
+    """
+
+    r: float
+    R: float
+    w: float
+    W: float
+    h: float
+    H: float
+    t: float
+    n: int
+
+    gap_angles: list
+    spruce_half_angle_deg: int
+
+    electrodes: list = field(repr=False)
+    gaps: list = field(repr=False)
+    spruces: list = field(repr=False)
+    outlines: list = field(repr=False)
+    shield: Region = field(repr=False)
+
+    @property
+    def pitch(self):
+        return 2.0 * math.pi / self.n
+
+    @property
+    def spruce_half_angle(self):
+        return math.radians(self.spruce_half_angle_deg)
+
+    def segment_angle(self, k):
+
+        """
+        Center angle of electrode segment k, in radians.
+        """
+
+        return self.gap_angles[k] + self.pitch / 2.0
+
+    def gap_half_angle(self, radius):
+
+        """
+        Half the angle a gap spans at a given radius, in radians.
+        """
+
+        return chord_angle(self.t / 2.0, radius)
+
+    def summary(self):
+
+        """
+        Areas, centroids and volumes of the cavity's regions.
+
+        Returns:
+            A JSON-serializable dict.
+        """
+
+        electrode_area = sum(region.area for region in self.electrodes)
+        spruce_area = sum(region.area for region in self.spruces)
+
+        return {
+            "parameters": {"r": self.r, "R": self.R, "w": self.w, "W": self.W, "h": self.h, "H": self.H, "t": self.t, "n": self.n},
+            "gap_angles_deg": [math.degrees(angle) for angle in self.gap_angles],
+            "spruce_half_angle_deg": self.spruce_half_angle_deg,
+            "electrode_area": electrode_area,
+            "gap_area": sum(region.area for region in self.gaps),
+            "spruce_area": spruce_area,
+            "shield_area": self.shield.area,
+            "electrode_volume": (electrode_area + spruce_area) * self.h,
+            "shield_volume": self.shield.area * self.H,
+            "segments": [{"angle_deg": math.degrees(self.segment_angle(k)), "area": region.area, "centroid": list(region.centroid)} for k, region in enumerate(self.electrodes)],
+        }
+
+def spruce_half_angle_deg(r, w, t, n):
+
+    """
+    Half the angle spanned by a spruce.
+
+    A quarter of the mean segment angle on the electrode's outer circle, taking
+    every gap as wide as its edge is long, truncated to whole degrees.
+
+    Args:
+        r: Electrode radius.
+        w: Electrode width.
+        t: Gap length.
+        n: Gap quantity.
+
+    Returns:
+        The angle in whole degrees.
+    """
+
+    gap_length = math.sqrt((r + w) ** 2 - (t / 2.0) ** 2) - math.sqrt(r ** 2 - (t / 2.0) ** 2)
+    segment_arc_lengths = 2.0 * math.pi * (r + w) - n * gap_length
+
+    return int((segment_arc_lengths * 360.0 / (2.0 * math.pi * (r + w)) / n) * 0.25)
+
+def validate(r, R, w, W, h, H, t, n):
+
+    """
+    Check that the parameters describe a buildable cavity.
+
+    Raises:
+        ValueError: If they don't.
+    """
+
+    if n != int(n) or n < 1:
+        raise ValueError(f"gap quantity must be a positive integer, got {n}")
+
+    for name, value in [("r", r), ("w", w), ("W", W), ("h", h), ("H", H), ("t", t)]:
+        if value <= 0:
+            raise ValueError(f"{name} must be positive, got {value}")
+
+    if R <= r + w:
+        raise ValueError(f"shield radius R={R} must exceed the electrode's outer radius r + w={r + w}")
+
+    if t >= 2.0 * r:
+        raise ValueError(f"gap length t={t} must be below the electrode's diameter {2.0 * r}")
+
+    # Neighbouring gaps must not meet on the inner circle
+    if 2.0 * chord_angle(t / 2.0, r) >= 2.0 * math.pi / n:
+        raise ValueError(f"{n} gaps of length {t} don't fit on an electrode of radius {r}")
+
+    half_angle = spruce_half_angle_deg(r, w, t, n)
+
+    if half_angle < 1:
+        raise ValueError(f"spruces vanish for n={n}, t={t}: half angle {half_angle} deg")
+
+    # The spruce must leave the segment on its outer arc, clear of both gaps
+    if math.radians(half_angle) >= math.pi / n - chord_angle(t / 2.0, r + w):
+        raise ValueError(f"spruces of half angle {half_angle} deg overlap the gaps for n={n}")
+
+def compute(r, R, w, W, h, H, t, n):
+
+    """
+    Compute the cavity layout.
+
+    Args:
+        r: Electrode radius.
+        R: Shield radius.
+        w: Electrode width.
+        W: Shield width.
+        h: Electrode height.
+        H: Shield height.
+        t: Gap length.
+        n: Gap quantity (integer).
+
+    Returns:
+        A CavityGeometry.
+
+    Raises:
+        ValueError: If the parameters don't describe a buildable cavity.
+    """
+
+    validate(r, R, w, W, h, H, t, n)
+
+    n = int(n)
+    pitch = 2.0 * math.pi / n
+
+    ri, ro = r, r + w
+
+    # Gap edges run parallel to the gap's center line, t/2 to either side
+    inner_cut = chord_angle(t / 2.0, ri)
+    outer_cut = chord_angle(t / 2.0, ro)
+
+    half_angle_deg = spruce_half_angle_deg(r, w, t, n)
+    alpha = math.radians(half_angle_deg)
+
+    gap_angles = [k * pitch for k in range(n)]
+
+    electrodes, gaps, spruces, outlines = [], [], [], []
+
+    for k, phi in enumerate(gap_angles):
+
+        # Electrode segment k, from gap k's upper edge to gap k + 1's lower edge
+
+        a_in, a_out = phi + inner_cut, phi + outer_cut
+        b_in, b_out = phi + pitch - inner_cut, phi + pitch - outer_cut
+
+        lower_edge = Line(polar(ri, a_in), polar(ro, a_out))
+        upper_edge = Line(polar(ro, b_out), polar(ri, b_in))
+        inner_arc = Arc((0.0, 0.0), ri, b_in, a_in)
+
+        electrodes.append(make_region("electrode", k, [[lower_edge, Arc((0.0, 0.0), ro, a_out, b_out), upper_edge, inner_arc]]))
+
+        # Gap k
+
+        gaps.append(make_region("gap", k, [[
+            Line(polar(ri, phi - inner_cut), polar(ro, phi - outer_cut)),
+            Arc((0.0, 0.0), ro, phi - outer_cut, phi + outer_cut),
+            Line(polar(ro, phi + outer_cut), polar(ri, phi + inner_cut)),
+            Arc((0.0, 0.0), ri, phi + inner_cut, phi - inner_cut),
+        ]]))
+
+        # Spruce k, a radial wedge centered on the segment
+
+        theta = phi + pitch / 2.0
+        s1, s2 = theta - alpha, theta + alpha
+
+        rise = Line(polar(ro, s1), polar(R, s1))
+        top = Arc((0.0, 0.0), R, s1, s2)
+        fall = Line(polar(R, s2), polar(ro, s2))
+
+        spruces.append(make_region("spruce", k, [[rise, top, fall, Arc((0.0, 0.0), ro, s2, s1)]]))
+
+        # Segment and spruce as the single loop build() sketches
+
+        outlines.append(make_region("outline", k, [[
+            lower_edge,
+            Arc((0.0, 0.0), ro, a_out, s1),
+            rise,
+            top,
+            fall,
+            Arc((0.0, 0.0), ro, s2, b_out),
+            upper_edge,
+            inner_arc,
+        ]]))
+
+    shield = make_region("shield", 0, [
+        [Arc((0.0, 0.0), R + W, 0.0, 2.0 * math.pi)],
+        [Arc((0.0, 0.0), R, 2.0 * math.pi, 0.0)],
+    ])
+
+    return CavityGeometry(r, R, w, W, h, H, t, n, gap_angles, half_angle_deg, electrodes, gaps, spruces, outlines, shield)
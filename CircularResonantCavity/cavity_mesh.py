@@ -0,0 +1,335 @@
+# Circular resonant cavity – headless STL mesher
+#
+# Triangulates the computed geometry the way build() models it in Fusion:
+# electrode outlines extruded by h and the shield annulus by H, both symmetric
+# about the XY plane. When h <= H the spruces are fused into the shield, its
+# inner wall is left open where they join, so the mesh is one closed shell.
+#
+# Arcs are split into chords deviating at most `tolerance` from the true arc,
+# lengths are in cm like the geometry and scaled to mm when written.
+
+import math
+import struct
+
+try:
+    from . import cavity_geometry
+except ImportError:
+    import cavity_geometry
+
+MM_PER_CM = 10.0
+
+# Outlines
+
+def arc_steps(radius, sweep, tolerance):
+
+    """
+    Number of chords keeping an arc within tolerance.
+    """
+
+    if tolerance >= radius:
+        return max(1, math.ceil(abs(sweep) / (math.pi / 2.0)))
+
+    step = 2.0 * math.acos(1.0 - tolerance / radius)
+
+    return max(1, math.ceil(abs(sweep) / step))
+
+def discretize(segment, tolerance):
+
+    """
+    Points along a segment, from its start up to but excluding its end.
+    """
+
+    if isinstance(segment, cavity_geometry.Line):
+        return [segment.start]
+
+    steps = arc_steps(segment.radius, segment.sweep, tolerance)
+
+    return [segment.point_at(segment.start_angle + segment.sweep * i / steps) for i in range(steps)]
+
+def discretize_loop(loop, tolerance):
+
+    """
+    Polygon of a closed loop.
+
+    Returns:
+        The points and, for every point, the segment the edge leaving it
+        belongs to.
+    """
+
+    points, owners = [], []
+
+    for segment in loop:
+
+        chunk = discretize(segment, tolerance)
+
+        points.extend(chunk)
+        owners.extend([segment] * len(chunk))
+
+    return points, owners
+
+# Triangulation
+
+def signed_area(points):
+
+    return sum(p[0] * q[1] - q[0] * p[1] for p, q in zip(points, points[1:] + points[:1])) / 2.0
+
+def cross(o, a, b):
+
+    return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+def triangulate(points):
+
+    """
+    Ear-clip a simple polygon.
+
+    Args:
+        points: Polygon vertices, either orientation.
+
+    Returns:
+        Counterclockwise triangles as index triples into points.
+    """
+
+    order = list(range(len(points)))
+
+    if signed_area(points) < 0:
+        order.reverse()
+
+    triangles = []
+
+    while len(order) > 3:
+
+        for i in range(len(order)):
+
+            a, b, c = order[i - 1], order[i], order[(i + 1) % len(order)]
+            pa, pb, pc = points[a], points[b], points[c]
+
+            if cross(pa, pb, pc) <= 1e-15:
+                continue
+
+            # No other vertex inside or on the candidate ear
+            if any(
+                cross(pa, pb, points[j]) >= 0 and cross(pb, pc, points[j]) >= 0 and cross(pc, pa, points[j]) >= 0
+                for j in order if j not in (a, b, c)
+            ):
+                continue
+
+            triangles.append((a, b, c))
+            del order[i]
+            break
+
+        else:
+            # Only degenerate ears left, fan out the rest
+            triangles.extend((order[0], order[k], order[k + 1]) for k in range(1, len(order) - 1))
+            return triangles
+
+    triangles.append(tuple(order))
+
+    return triangles
+
+def strip(outer, inner):
+
+    """
+    Triangulate the ring between two circles around the origin.
+
+    Args:
+        outer: Points on the outer circle, counterclockwise.
+        inner: Points on the inner circle, counterclockwise.
+
+    Returns:
+        Counterclockwise triangles of 2D points.
+    """
+
+    def by_angle(points):
+
+        angles = [math.atan2(p[1], p[0]) % (2.0 * math.pi) for p in points]
+        first = min(range(len(points)), key=angles.__getitem__)
+        order = list(range(first, len(points))) + list(range(first))
+
+        # Unrolled angles, closing back on the first point a turn later
+        unrolled = [angles[i] for i in order] + [angles[first] + 2.0 * math.pi]
+        for k in range(1, len(unrolled) - 1):
+            if unrolled[k] < unrolled[k - 1]:
+                unrolled[k] += 2.0 * math.pi
+
+        return [points[i] for i in order] + [points[first]], unrolled
+
+    outer, outer_angles = by_angle(outer)
+    inner, inner_angles = by_angle(inner)
+
+    triangles = []
+    i = j = 0
+
+    while i < len(outer) - 1 or j < len(inner) - 1:
+
+        if j == len(inner) - 1 or (i < len(outer) - 1 and outer_angles[i + 1] <= inner_angles[j + 1]):
+            triangles.append((inner[j], outer[i], outer[i + 1]))
+            i += 1
+        else:
+            triangles.append((inner[j], outer[i], inner[j + 1]))
+            j += 1
+
+    return [t if cross(*t) > 0 else (t[0], t[2], t[1]) for t in triangles]
+
+# Solids
+
+def cap(triangles, z, up):
+
+    """
+    Lift counterclockwise 2D triangles to a face at height z.
+    """
+
+    return [tuple((x, y, z) for x, y in (t if up else (t[0], t[2], t[1]))) for t in triangles]
+
+def wall(points, skip, bands):
+
+    """
+    Side faces of a closed polygon, facing to the right of its direction.
+
+    Args:
+        points: Polygon vertices.
+        skip: Predicate on an edge index, true where the band is left open.
+        bands: List of (bottom, top, open) z ranges, open ones honour skip.
+
+    Returns:
+        Triangles.
+    """
+
+    triangles = []
+
+    for i, (x0, y0) in enumerate(points):
+
+        x1, y1 = points[(i + 1) % len(points)]
+
+        for bottom, top, can_open in bands:
+
+            if top <= bottom or (can_open and skip(i)):
+                continue
+
+            triangles.append(((x0, y0, bottom), (x1, y1, bottom), (x1, y1, top)))
+            triangles.append(((x0, y0, bottom), (x1, y1, top), (x0, y0, top)))
+
+    return triangles
+
+def is_joint(segment, geometry):
+
+    """
+    True for the outer arc of a spruce, where it meets the shield.
+    """
+
+    return isinstance(segment, cavity_geometry.Arc) and math.isclose(segment.radius, geometry.R) and not segment.is_circle
+
+def mesh(geometry, tolerance=0.001):
+
+    """
+    Triangulate a cavity.
+
+    Args:
+        geometry: A `cavity_geometry.CavityGeometry`.
+        tolerance: Maximum chord deviation from the arcs, in cm.
+
+    Returns:
+        A list of triangles, each three (x, y, z) points in cm with outward
+        counterclockwise winding.
+    """
+
+    g = geometry
+    fused = g.h <= g.H
+
+    half_h, half_H = g.h / 2.0, g.H / 2.0
+    triangles = []
+
+    # Electrode outlines
+
+    joints = []
+
+    for outline in g.outlines:
+
+        points, owners = discretize_loop(outline.loops[0], tolerance)
+        flat = [(points[a], points[b], points[c]) for a, b, c in triangulate(points)]
+
+        triangles += cap(flat, half_h, True)
+        triangles += cap(flat, -half_h, False)
+        triangles += wall(points, lambda i: fused and is_joint(owners[i], g), [(-half_h, half_h, True)])
+
+        joints += [segment for segment in outline.loops[0] if is_joint(segment, g)]
+
+    # Shield, its inner circle sharing the spruces' vertices
+
+    outer = discretize_loop(g.shield.loops[0], tolerance)[0]
+
+    ring = [cavity_geometry.Arc((0.0, 0.0), g.R, 0.0, 2.0 * math.pi)]
+
+    if fused and joints:
+
+        joints.sort(key=lambda arc: arc.start_angle % (2.0 * math.pi))
+        ring = []
+
+        for k, joint in enumerate(joints):
+            following = joints[(k + 1) % len(joints)]
+            gap_end = joint.end_angle + (following.start_angle - joint.end_angle) % (2.0 * math.pi)
+            ring += [joint, cavity_geometry.Arc((0.0, 0.0), g.R, joint.end_angle, gap_end)]
+
+    inner, owners = discretize_loop(ring, tolerance)
+
+    flat = strip(outer, inner)
+
+    triangles += cap(flat, half_H, True)
+    triangles += cap(flat, -half_H, False)
+    triangles += wall(outer, lambda i: False, [(-half_H, half_H, False)])
+
+    # The inner wall faces the axis, so walk it clockwise
+    inner_cw = inner[::-1]
+    open_edges = [owners[(len(inner) - 2 - i) % len(inner)] in joints for i in range(len(inner))]
+
+    bands = [(-half_H, -half_h, False), (-half_h, half_h, True), (half_h, half_H, False)] if fused else [(-half_H, half_H, False)]
+    triangles += wall(inner_cw, lambda i: open_edges[i], bands)
+
+    return triangles
+
+# STL
+
+def write_stl(triangles, path, name="cavity", scale=MM_PER_CM):
+
+    """
+    Write triangles to a binary STL file.
+
+    Args:
+        triangles: Output of mesh.
+        path: Output .stl file.
+        name: Header text.
+        scale: Factor applied to every coordinate, cm to mm by default.
+
+    Returns:
+        The number of triangles written.
+    """
+
+    pack = struct.Struct("<12fH").pack
+
+    with open(path, "wb") as f:
+
+        f.write(name.encode("ascii", "replace")[:80].ljust(80, b" "))
+        f.write(struct.pack("<I", len(triangles)))
+
+        for a, b, c in triangles:
+
+            u = [b[i] - a[i] for i in range(3)]
+            v = [c[i] - a[i] for i in range(3)]
+            normal = [u[1] * v[2] - u[2] * v[1], u[2] * v[0] - u[0] * v[2], u[0] * v[1] - u[1] * v[0]]
+            length = math.sqrt(sum(x * x for x in normal)) or 1.0
+
+            f.write(pack(*[x / length for x in normal], *[x * scale for x in a], *[x * scale for x in b], *[x * scale for x in c], 0))
+
+    return len(triangles)
+
+def volume(triangles):
+
+    """
+    Enclosed volume of a closed mesh, in cubic units of its coordinates.
+    """
+
+    total = 0.0
+
+    for a, b, c in triangles:
+        total += a[0] * (b[1] * c[2] - b[2] * c[1]) - a[1] * (b[0] * c[2] - b[2] * c[0]) + a[2] * (b[0] * c[1] - b[1] * c[0])
+
+    return total / 6.0
@@ -0,0 +1,627 @@
+# Circular resonant cavity – G-code cycle time and material removal simulator
+#
+# Parses a milling program (cavity_cam's or a Fusion post like
+# Fusion360Assets/top-pass.nc) into arrays of motion blocks and simulates it
+# with numpy, one vector operation over all blocks at a time:
+#
+#   * every block follows a trapezoidal velocity profile limited by the
+#     machine's per-axis rates and accelerations, and arcs by their
+#     centripetal acceleration
+#   * corner speeds between blocks follow the junction deviation model used
+#     by grbl-style planners, the look-ahead's backward and forward passes are
+#     min-plus recurrences solved with cumulative minima
+#   * removed material is stamped into a height map with the flat end mill
+#     named in the program's tool comments
+#
+# Results are split by operation, taken from the comment lines naming them.
+
+from dataclasses import dataclass
+
+import argparse
+import math
+import time
+import re
+
+import numpy as np
+
+WORD = re.compile(r"([A-Z])\s*([-+]?(?:\d+\.?\d*|\.\d+))")
+COMMENT = re.compile(r"\(([^)]*)\)|;(.*)$")
+TOOL = re.compile(r"^T(\d+)\s+D=([-+]?\d*\.?\d+)")
+NOT_OPERATION = re.compile(r"^(T\d+\s+D=|CHANGE TO|\d+$)")
+
+RAPID, LINE, CW, CCW = 0, 1, 2, 3
+
+# (p, q, normal) axes of the G17, G18 and G19 planes
+PLANES = {17: (0, 1, 2), 18: (2, 0, 1), 19: (1, 2, 0)}
+
+@dataclass(frozen=True)
+class Machine:
+
+    """
+    Kinematic limits, per axis (X, Y, Z).
+
+    Args:
+        max_rate: Maximum axis speeds in mm/min, rapids run at these.
+        accel: Axis accelerations in mm/s^2.
+        junction_deviation: Allowed deviation from a corner in mm, larger
+            values take corners faster.
+    """
+
+    max_rate: tuple = (5000.0, 5000.0, 3000.0)
+    accel: tuple = (500.0, 500.0, 250.0)
+    junction_deviation: float = 0.01
+
+@dataclass
+class Program:
+
+    """
+    Motion blocks of a parsed program, as arrays of one row per block.
+
+    Args:
+        kind: RAPID, LINE, CW or CCW.
+        start: (N, 3) start points in mm.
+        end: (N, 3) end points in mm.
+        center: (N, 3) absolute arc centers in mm, unused for lines.
+        plane: (N, 3) axis indices of each arc's plane and normal.
+        feed: Programmed feed in mm/min, unused for rapids.
+        tool: Tool diameter in mm, nan if unknown.
+        operation: Index into operations.
+        stop: True where the machine comes to a stop before the block.
+        operations: Operation names.
+        dwell: Dwell seconds per operation index.
+    """
+
+    kind: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    center: np.ndarray
+    plane: np.ndarray
+    feed: np.ndarray
+    tool: np.ndarray
+    operation: np.ndarray
+    stop: np.ndarray
+    operations: list
+    dwell: dict
+
+    def __len__(self):
+        return len(self.kind)
+
+# Parsing
+
+def arc_center_from_radius(start, end, plane, radius, clockwise):
+
+    """
+    Center of an R-format arc, the shorter arc for positive radii.
+    """
+
+    p, q, _ = plane
+
+    dp, dq = end[p] - start[p], end[q] - start[q]
+    chord = math.hypot(dp, dq)
+
+    if chord == 0 or chord > 2.0 * abs(radius) + 1e-6:
+        raise ValueError(f"arc radius {radius} can't join {start} and {end}")
+
+    h = math.sqrt(max(0.0, radius * radius - chord * chord / 4.0))
+
+    # Left of the chord for counterclockwise short arcs
+    side = (1.0 if not clockwise else -1.0) * (1.0 if radius > 0 else -1.0)
+
+    center = list(start)
+    center[p] = start[p] + dp / 2.0 - side * h * dq / chord
+    center[q] = start[q] + dq / 2.0 + side * h * dp / chord
+
+    return center
+
+def parse(lines):
+
+    """
+    Parse a program.
+
+    G28 homing moves are skipped, as the home position isn't known. Any line
+    with M, S or T words, and dwells, bring the machine to a stop.
+
+    Args:
+        lines: Iterable of program lines.
+
+    Returns:
+        A Program.
+
+    Raises:
+        ValueError: On arcs that can't be resolved.
+    """
+
+    rows = []
+    operations = ["(none)"]
+    dwell = {}
+    tools = {}
+
+    position = [0.0, 0.0, 0.0]
+    motion = None
+    plane = PLANES[17]
+    absolute = True
+    scale = 1.0
+    feed = 0.0
+    tool = math.nan
+    operation = 0
+    stop = True
+
+    for raw in lines:
+
+        comments = [a or b for a, b in COMMENT.findall(raw)]
+        code = COMMENT.sub(" ", raw).upper()
+
+        for comment in comments:
+
+            comment = comment.strip()
+            match = TOOL.match(comment)
+
+            if match:
+                tools[int(match.group(1))] = float(match.group(2))
+
+            elif comment and not NOT_OPERATION.match(comment) and not code.strip():
+                operations.append(comment)
+                operation = len(operations) - 1
+
+        words = WORD.findall(code)
+
+        if not words:
+            continue
+
+        gs = [float(value) for letter, value in words if letter == "G"]
+        values = {letter: float(value) for letter, value in words if letter != "G"}
+
+        if 28 in gs or 53 in gs:
+            continue
+
+        for g in gs:
+
+            if g in (0, 1, 2, 3):
+                motion = int(g)
+            elif g in (17, 18, 19):
+                plane = PLANES[int(g)]
+            elif g == 20:
+                scale = 25.4
+            elif g == 21:
+                scale = 1.0
+            elif g == 90:
+                absolute = True
+            elif g == 91:
+                absolute = False
+            elif g == 4:
+                dwell[operation] = dwell.get(operation, 0.0) + values.get("P", values.get("X", 0.0))
+                stop = True
+
+        if "T" in values:
+            tool = tools.get(int(values["T"]), math.nan)
+
+        if "M" in values or "S" in values or "T" in values:
+            stop = True
+
+        if "F" in values:
+            feed = values["F"] * scale
+
+        if 4 in gs or motion is None or not any(axis in values for axis in "XYZ"):
+            continue
+
+        target = list(position)
+
+        for i, axis in enumerate("XYZ"):
+            if axis in values:
+                target[i] = values[axis] * scale if absolute else position[i] + values[axis] * scale
+
+        center = [math.nan] * 3
+
+        if motion in (2, 3):
+
+            if "R" in values:
+                center = arc_center_from_radius(position, target, plane, values["R"] * scale, motion == 2)
+            else:
+                center = [position[i] + values.get(letter, 0.0) * scale for i, letter in enumerate("IJK")]
+
+        if target != position or motion in (2, 3):
+            rows.append((motion, *position, *target, *center, *plane, feed, tool, operation, stop))
+            stop = False
+
+        position = target
+
+    if not rows:
+        empty = np.zeros((0, 3))
+        return Program(np.zeros(0, int), empty, empty, empty, np.zeros((0, 3), int), np.zeros(0), np.zeros(0), np.zeros(0, int), np.zeros(0, bool), operations, dwell)
+
+    data = np.array(rows, dtype=float)
+
+    return Program(
+        kind=data[:, 0].astype(int),
+        start=data[:, 1:4],
+        end=data[:, 4:7],
+        center=data[:, 7:10],
+        plane=data[:, 10:13].astype(int),
+        feed=data[:, 13],
+        tool=data[:, 14],
+        operation=data[:, 15].astype(int),
+        stop=data[:, 16].astype(bool),
+        operations=operations,
+        dwell=dwell,
+    )
+
+def load(path):
+
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return parse(f)
+
+# Geometry
+
+def arc_frames(program):
+
+    """
+    Per-block arc quantities in each arc's plane.
+
+    Returns:
+        A dict of (N,) arrays: radius, a0, sweep (signed) and dn (travel
+        along the plane normal), zero for lines.
+    """
+
+    rows = np.arange(len(program))
+    p, q, n = program.plane[:, 0], program.plane[:, 1], program.plane[:, 2]
+
+    arcs = program.kind >= CW
+
+    sp, sq = program.start[rows, p], program.start[rows, q]
+    ep, eq = program.end[rows, p], program.end[rows, q]
+    cp, cq = program.center[rows, p], program.center[rows, q]
+
+    with np.errstate(invalid="ignore"):
+
+        radius = np.where(arcs, np.hypot(sp - cp, sq - cq), 0.0)
+        a0 = np.where(arcs, np.arctan2(sq - cq, sp - cp), 0.0)
+        a1 = np.where(arcs, np.arctan2(eq - cq, ep - cp), 0.0)
+
+    ccw = np.mod(a1 - a0, 2.0 * np.pi)
+    cw = np.mod(a0 - a1, 2.0 * np.pi)
+
+    # An arc ending where it starts is a full circle
+    ccw = np.where(ccw < 1e-9, 2.0 * np.pi, ccw)
+    cw = np.where(cw < 1e-9, 2.0 * np.pi, cw)
+
+    sweep = np.where(program.kind == CCW, ccw, np.where(program.kind == CW, -cw, 0.0))
+    dn = program.end[rows, n] - program.start[rows, n]
+
+    return {"radius": radius, "a0": a0, "sweep": sweep, "dn": dn, "arcs": arcs}
+
+def lengths_and_tangents(program, frames):
+
+    """
+    Path length and unit tangents at both ends of every block.
+    """
+
+    rows = np.arange(len(program))
+    p, q, n = program.plane[:, 0], program.plane[:, 1], program.plane[:, 2]
+    arcs = frames["arcs"]
+
+    chord = program.end - program.start
+    line_length = np.linalg.norm(chord, axis=1)
+
+    arc_run = frames["radius"] * np.abs(frames["sweep"])
+    length = np.where(arcs, np.hypot(arc_run, frames["dn"]), line_length)
+
+    safe = np.where(length > 0, length, 1.0)
+
+    start_tangent = chord / safe[:, None]
+    end_tangent = start_tangent.copy()
+
+    if arcs.any():
+
+        a0 = frames["a0"]
+        a1 = a0 + frames["sweep"]
+        sign = np.sign(frames["sweep"])
+
+        for tangent, angle in [(start_tangent, a0), (end_tangent, a1)]:
+
+            arc_tangent = np.zeros_like(tangent)
+            arc_tangent[rows, p] = -np.sin(angle) * sign * arc_run / safe
+            arc_tangent[rows, q] = np.cos(angle) * sign * arc_run / safe
+            arc_tangent[rows, n] = frames["dn"] / safe
+
+            tangent[arcs] = arc_tangent[arcs]
+
+    return length, start_tangent, end_tangent
+
+# Motion
+
+def plan(program, machine, length, start_tangent, end_tangent, frames):
+
+    """
+    Trapezoidal velocity profiles with look-ahead over the whole program.
+
+    Returns:
+        (N,) block durations in seconds.
+    """
+
+    max_rate = np.asarray(machine.max_rate, dtype=float) / 60.0
+    accel_limits = np.asarray(machine.accel, dtype=float)
+
+    # Direction-dependent axis limits, arcs use their plane's worst axis
+    direction = np.abs(start_tangent)
+    arcs = frames["arcs"]
+
+    if arcs.any():
+        rows = np.arange(len(program))[arcs]
+        direction[rows, program.plane[arcs, 0]] = 1.0
+        direction[rows, program.plane[arcs, 1]] = 1.0
+
+    with np.errstate(divide="ignore"):
+        rate_limit = np.min(np.where(direction > 1e-12, max_rate / direction, np.inf), axis=1)
+        accel = np.min(np.where(direction > 1e-12, accel_limits / direction, np.inf), axis=1)
+
+    accel = np.where(np.isfinite(accel), accel, accel_limits.min())
+
+    cruise = np.where(program.kind == RAPID, rate_limit, np.minimum(program.feed / 60.0, rate_limit))
+
+    # Centripetal limit on arcs
+    cruise = np.where(arcs, np.minimum(cruise, np.sqrt(accel * frames["radius"])), cruise)
+    cruise = np.maximum(cruise, 1e-9)
+
+    # Corner speeds, squared, at the entry of every block
+
+    n = len(program)
+    caps = np.zeros(n)
+
+    if n > 1:
+
+        cos_theta = -np.einsum("ij,ij->i", end_tangent[:-1], start_tangent[1:])
+        sin_half = np.sqrt(np.clip((1.0 - cos_theta) / 2.0, 0.0, 1.0))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            junction = np.where(sin_half < 1.0 - 1e-9, np.minimum(accel[:-1], accel[1:]) * machine.junction_deviation * sin_half / (1.0 - sin_half), np.inf)
+
+        caps[1:] = np.minimum(junction, np.minimum(cruise[:-1], cruise[1:]) ** 2)
+
+    caps[program.stop] = 0.0
+
+    # Speed squared can change by at most 2 a L across a block. Backward pass
+    # (room to brake before every block end, ending at rest), then forward
+    # pass (room to accelerate), each e[i] = min(cap[i], e[i -/+ 1] + g)
+
+    gain = 2.0 * accel * length
+
+    def relax(caps, gain):
+        total = np.cumsum(gain)
+        return total + np.minimum.accumulate(caps - total)
+
+    # exit[i] = entry[i + 1], the last block ends at rest
+    backward = relax(np.concatenate((caps, [0.0]))[::-1], np.concatenate(([0.0], gain[::-1])))[::-1]
+    entry = relax(backward[:-1], np.concatenate(([0.0], gain[:-1])))
+    exit = np.concatenate((entry[1:], [0.0]))
+
+    v_in = np.sqrt(np.maximum(entry, 0.0))
+    v_out = np.sqrt(np.maximum(exit, 0.0))
+
+    accelerate = (cruise ** 2 - entry) / (2.0 * accel)
+    decelerate = (cruise ** 2 - exit) / (2.0 * accel)
+
+    trapezoid = accelerate + decelerate <= length
+
+    peak = np.sqrt(np.maximum((2.0 * accel * length + entry + exit) / 2.0, 0.0))
+    peak = np.where(trapezoid, cruise, np.minimum(peak, cruise))
+
+    ramps = (peak - v_in) / accel + (peak - v_out) / accel
+    coast = np.where(trapezoid, (length - accelerate - decelerate) / cruise, 0.0)
+
+    return ramps + coast
+
+# Material removal
+
+def sample_path(program, frames, length, blocks, spacing):
+
+    """
+    Points along the given blocks at most spacing apart.
+
+    Returns:
+        (M, 3) points and the (M,) block index of each.
+    """
+
+    count = np.maximum(2, np.ceil(length[blocks] / spacing).astype(int) + 1)
+
+    owner = np.repeat(blocks, count)
+    first = np.concatenate(([0], np.cumsum(count)[:-1]))
+    t = (np.arange(count.sum()) - np.repeat(first, count)) / np.repeat(count - 1, count)
+
+    start, end = program.start[owner], program.end[owner]
+    points = start + t[:, None] * (end - start)
+
+    arcs = frames["arcs"][owner]
+
+    if arcs.any():
+
+        rows = np.arange(len(owner))[arcs]
+        b = owner[arcs]
+        p, q = program.plane[b, 0], program.plane[b, 1]
+
+        angle = frames["a0"][b] + t[arcs] * frames["sweep"][b]
+        radius = frames["radius"][b]
+
+        points[rows, p] = program.center[b, p] + radius * np.cos(angle)
+        points[rows, q] = program.center[b, q] + radius * np.sin(angle)
+
+    return points, owner
+
+def remove_material(program, frames, length, stock_top, resolution, tool_diameter=None):
+
+    """
+    Stamp the cutting moves into a height map of the stock.
+
+    Args:
+        program: Program.
+        frames: Output of arc_frames.
+        length: Block lengths.
+        stock_top: Z of the stock top.
+        resolution: Height map cell size in mm.
+        tool_diameter: Overrides the program's tool diameters.
+
+    Returns:
+        Removed volume in mm^3 per operation index.
+    """
+
+    diameters = np.full(len(program), tool_diameter, dtype=float) if tool_diameter else program.tool
+
+    cutting = (program.kind != RAPID) & (np.minimum(program.start[:, 2], program.end[:, 2]) < stock_top) & np.isfinite(diameters)
+    blocks = np.flatnonzero(cutting)
+
+    if len(blocks) == 0:
+        return {}
+
+    points, owner = sample_path(program, frames, length, blocks, resolution / 2.0)
+
+    radius_cells = int(math.ceil(np.nanmax(diameters[blocks]) / 2.0 / resolution)) + 1
+    origin = points[:, :2].min(axis=0) - (radius_cells + 1) * resolution
+
+    cells = np.floor((points[:, :2] - origin) / resolution + 0.5).astype(int)
+    nx, ny = cells.max(axis=0) + radius_cells + 2
+
+    height = np.full((ny, nx), stock_top)
+    removed = {}
+
+    # Runs of consecutive blocks with the same operation and tool
+    operation, tool = program.operation[owner], diameters[owner]
+    breaks = np.flatnonzero((np.diff(operation) != 0) | (np.diff(tool) != 0)) + 1
+
+    for run in np.split(np.arange(len(owner)), breaks):
+
+        if len(run) == 0:
+            continue
+
+        before = height.sum()
+
+        # Lowest tool tip per cell, then the tool's footprint around each
+        lowest = np.full((ny, nx), np.inf)
+        np.minimum.at(lowest, (cells[run, 1], cells[run, 0]), points[run, 2])
+
+        r = tool[run[0]] / 2.0 / resolution
+        span = int(math.floor(r))
+
+        for dy in range(-span, span + 1):
+            for dx in range(-span, span + 1):
+
+                if dx * dx + dy * dy > r * r:
+                    continue
+
+                ys = slice(radius_cells + dy, ny - radius_cells + dy)
+                xs = slice(radius_cells + dx, nx - radius_cells + dx)
+
+                np.minimum(height[ys, xs], lowest[radius_cells:ny - radius_cells, radius_cells:nx - radius_cells], out=height[ys, xs])
+
+        op = int(operation[run[0]])
+        removed[op] = removed.get(op, 0.0) + (before - height.sum()) * resolution * resolution
+
+    return removed
+
+# Simulation
+
+def simulate(program, machine=Machine(), stock_top=0.0, resolution=0.1, tool_diameter=None, volume=True):
+
+    """
+    Simulate a parsed program.
+
+    Args:
+        program: Program.
+        machine: Machine limits.
+        stock_top: Z of the stock top, for the removal volume.
+        resolution: Height map cell size in mm.
+        tool_diameter: Overrides the tool diameters from the program's comments.
+        volume: Also compute the removed volume, which dominates the run time.
+
+    Returns:
+        A dict with total, rapid and feed seconds, path lengths, removed
+        volume in mm^3 and the same per operation.
+    """
+
+    frames = arc_frames(program)
+    length, start_tangent, end_tangent = lengths_and_tangents(program, frames)
+
+    seconds = plan(program, machine, length, start_tangent, end_tangent, frames) if len(program) else np.zeros(0)
+
+    rapid = program.kind == RAPID
+    removed = remove_material(program, frames, length, stock_top, resolution, tool_diameter) if volume and len(program) else {}
+
+    names = program.operations
+    count = len(names)
+
+    def per_operation(values, mask):
+        return np.bincount(program.operation[mask], weights=values[mask], minlength=count)
+
+    op_seconds = per_operation(seconds, np.ones(len(program), bool))
+    op_rapid = per_operation(seconds, rapid)
+    op_length = per_operation(length, ~rapid)
+
+    operations = {}
+
+    for i, name in enumerate(names):
+
+        dwell = program.dwell.get(i, 0.0)
+
+        if op_seconds[i] == 0 and not dwell and i not in removed:
+            continue
+
+        operations[name] = {
+            "seconds": float(op_seconds[i] + dwell),
+            "rapid_seconds": float(op_rapid[i]),
+            "feed_length": float(op_length[i]),
+            "volume": removed.get(i) if volume else None,
+        }
+
+    return {
+        "seconds": float(seconds.sum() + sum(program.dwell.values())),
+        "rapid_seconds": float(seconds[rapid].sum()),
+        "feed_seconds": float(seconds[~rapid].sum()),
+        "rapid_length": float(length[rapid].sum()),
+        "feed_length": float(length[~rapid].sum()),
+        "blocks": len(program),
+        "volume": float(sum(removed.values())) if volume else None,
+        "operations": operations,
+    }
+
+# Command line
+
+def format_seconds(seconds):
+    return f"{int(seconds // 60)}:{seconds % 60:04.1f}"
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Estimate cycle time and material removal of a G-code program.")
+
+    parser.add_argument("programs", nargs="+", help=".nc files")
+    parser.add_argument("--max-rate", type=float, nargs=3, default=Machine.max_rate, metavar=("X", "Y", "Z"), help="axis rates (mm/min)")
+    parser.add_argument("--accel", type=float, nargs=3, default=Machine.accel, metavar=("X", "Y", "Z"), help="axis accelerations (mm/s^2)")
+    parser.add_argument("--junction-deviation", type=float, default=Machine.junction_deviation)
+    parser.add_argument("--resolution", type=float, default=0.1, help="height map cell (mm)")
+    parser.add_argument("--tool-diameter", type=float, default=None, help="overrides the program's tool comments (mm)")
+    parser.add_argument("--stock-top", type=float, default=0.0)
+    parser.add_argument("--no-volume", action="store_true")
+
+    args = parser.parse_args(argv)
+
+    machine = Machine(tuple(args.max_rate), tuple(args.accel), args.junction_deviation)
+
+    for path in args.programs:
+
+        start = time.perf_counter()
+        program = load(path)
+        parsed = time.perf_counter()
+
+        result = simulate(program, machine, args.stock_top, args.resolution, args.tool_diameter, not args.no_volume)
+        done = time.perf_counter()
+
+        print(f"{path}: {result['blocks']} blocks, parsed in {(parsed - start) * 1e3:.0f} ms, simulated in {(done - parsed) * 1e3:.0f} ms")
+        print(f"{'operation':<24}{'time':>10}{'rapid':>10}{'feed mm':>10}{'mm^3':>12}")
+
+        for name, op in result["operations"].items():
+            volume = f"{op['volume']:>12.1f}" if op["volume"] is not None else f"{'':>12}"
+            print(f"{name:<24}{format_seconds(op['seconds']):>10}{format_seconds(op['rapid_seconds']):>10}{op['feed_length']:>10.0f}{volume}")
+
+        volume = f"{result['volume']:>12.1f}" if result["volume"] is not None else f"{'':>12}"
+        print(f"{'total':<24}{format_seconds(result['seconds']):>10}{format_seconds(result['rapid_seconds']):>10}{result['feed_length']:>10.0f}{volume}")
+        print()
+
+if __name__ == "__main__":
+    main()
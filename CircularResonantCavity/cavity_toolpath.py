@@ -0,0 +1,524 @@
+# Circular resonant cavity – toolpath ordering
+#
+# The passes from cavity_cam come out region by region and level by level, each
+# level starting at the same entry point, so every level costs a retract, a
+# rapid and an approach. This stage reorders them without changing what is cut:
+#
+#   * levels of a region are chained by running every other level backwards,
+#     so each level starts right below where the previous one ended and the
+#     two are linked by a plunge instead of a retract (roughing only, finishing
+#     passes keep their climb direction)
+#   * the regions of an operation (channels, gaps) are routed as a travelling
+#     salesman path over their entry/exit points, starting from where the
+#     previous operation ended: angular sweeps and nearest neighbour as
+#     starting tours, improved with 2-opt, each region's direction picked by
+#     dynamic programming
+#
+# Operations keep their order, which the pockets depend on (the gaps open into
+# the bore and the channels). Cycle times are estimated from path lengths,
+# feeds and the machine's rapid rate, without acceleration.
+
+import math
+import time
+
+try:
+    from . import cavity_cam
+    from . import cavity_geometry
+except ImportError:
+    import cavity_cam
+    import cavity_geometry
+
+RAPID_FEED = 5000.0     # mm/min
+MAX_ROUNDS = 10
+
+# Cycle time
+
+def move_length(start, move):
+
+    """
+    Length of a cutting move.
+
+    Args:
+        start: (x, y, z) the move starts from.
+        move: A Pass move.
+
+    Returns:
+        The path length, helical for arcs that change Z.
+    """
+
+    x, y, z = move[1:4]
+
+    if move[0] == "G1":
+        return math.dist(start, (x, y, z))
+
+    cx, cy = move[4:6]
+
+    a0 = math.atan2(start[1] - cy, start[0] - cx)
+    a1 = math.atan2(y - cy, x - cx)
+
+    sweep = (a1 - a0) % (2.0 * math.pi) if move[0] == "G3" else (a0 - a1) % (2.0 * math.pi)
+
+    # An arc ending where it starts is a full circle
+    if sweep < 1e-9:
+        sweep = 2.0 * math.pi
+
+    return math.hypot(math.hypot(start[0] - cx, start[1] - cy) * sweep, z - start[2])
+
+class Clock:
+
+    """
+    Accumulates machine time along a program, split into cutting, plunging
+    and rapid moves.
+
+    Args:
+        settings: CamSettings.
+        rapid_feed: Rapid traverse rate in mm/min.
+        position: (x, y, z) to start from, None for anywhere.
+    """
+
+    def __init__(self, settings, rapid_feed=RAPID_FEED, position=None):
+
+        self.settings = settings
+        self.rapid_feed = rapid_feed
+        self.position = position
+
+        self.seconds = {"cut": 0.0, "plunge": 0.0, "rapid": 0.0}
+        self.rapid_length = 0.0
+        self.retracts = 0
+        self.operations = {}
+
+    @property
+    def total(self):
+        return sum(self.seconds.values())
+
+    def go(self, motion, x, y, z, feed):
+
+        target = [x, y, z]
+
+        if self.position is None:
+            self.position = tuple(0.0 if value is None else value for value in target)
+            return
+
+        target = tuple(self.position[i] if value is None else value for i, value in enumerate(target))
+        length = math.dist(self.position, target)
+
+        if motion == "G0":
+
+            self.seconds["rapid"] += length / self.rapid_feed * 60.0
+            self.rapid_length += length
+
+            if target[2] > self.position[2] + 1e-9:
+                self.retracts += 1
+
+        else:
+            self.seconds["plunge"] += length / feed * 60.0
+
+        self.position = target
+
+    def link(self, previous, cut):
+
+        for move in cavity_cam.link_moves(previous, cut, self.settings):
+            self.go(*move)
+
+    def cut(self, cut):
+
+        seconds = 0.0
+        start = cut.start
+
+        for move in cut.moves:
+            seconds += move_length(start, move) / self.settings.feed * 60.0
+            start = move[1:4]
+
+        self.seconds["cut"] += seconds
+        self.operations[cut.operation] = self.operations.get(cut.operation, 0.0) + seconds
+        self.position = start
+
+def estimate(passes, settings, rapid_feed=RAPID_FEED):
+
+    """
+    Estimate the cycle time of a program, following write_program's links.
+
+    Args:
+        passes: Iterable of Pass.
+        settings: CamSettings.
+        rapid_feed: Rapid traverse rate in mm/min.
+
+    Returns:
+        A dict with the total and per-kind seconds, cutting seconds per
+        operation, rapid length and number of retracts.
+    """
+
+    clock = Clock(settings, rapid_feed)
+
+    operation = None
+    last = None
+    count = 0
+
+    for cut in passes:
+
+        if cut.operation != operation:
+
+            if operation is not None:
+                clock.go("G0", None, None, settings.clearance, None)
+
+            operation = cut.operation
+            last = None
+
+        clock.link(last, cut)
+        clock.cut(cut)
+
+        last = cut.end
+        count += 1
+
+    clock.go("G0", None, None, settings.clearance, None)
+
+    return {
+        "seconds": clock.total,
+        "cut_seconds": clock.seconds["cut"],
+        "plunge_seconds": clock.seconds["plunge"],
+        "rapid_seconds": clock.seconds["rapid"],
+        "rapid_length": clock.rapid_length,
+        "retracts": clock.retracts,
+        "passes": count,
+        "operations": clock.operations,
+    }
+
+# Chains
+
+class Variant:
+
+    """
+    One way of cutting a region's levels in order.
+
+    Args:
+        passes: The region's passes, some possibly reversed.
+        settings: CamSettings.
+        rapid_feed: Rapid traverse rate in mm/min.
+    """
+
+    def __init__(self, passes, settings, rapid_feed):
+
+        self.passes = passes
+        self.first = passes[0]
+        self.exit = passes[-1].end
+
+        # Links between levels, cutting time is the same for every variant
+        clock = Clock(settings, rapid_feed, passes[0].start)
+
+        for previous, cut in zip(passes, passes[1:]):
+            clock.link(previous.end, cut)
+
+        self.seconds = clock.total
+
+def region_variants(passes, settings, rapid_feed):
+
+    """
+    The ways of chaining a region's levels: as generated, and for roughing
+    passes that don't end where they start, with the other levels reversed.
+    """
+
+    reversible = not passes[0].operation.endswith("finish") and any(math.dist(cut.start[:2], cut.end[:2]) > 1e-6 for cut in passes)
+
+    variants = [Variant(passes, settings, rapid_feed)]
+
+    if reversible:
+        for parity in (0, 1):
+            variants.append(Variant([cut.reversed() if (level + parity) % 2 else cut for level, cut in enumerate(passes)], settings, rapid_feed))
+
+    return variants
+
+def group(passes):
+
+    """
+    Split passes into operations and the operations into regions.
+
+    Returns:
+        A list of (operation, [[Pass, ...] per region]) in program order.
+    """
+
+    operations = []
+
+    for cut in passes:
+
+        if not operations or operations[-1][0] != cut.operation:
+            operations.append((cut.operation, {}))
+
+        operations[-1][1].setdefault(cut.region, []).append(cut)
+
+    return [(operation, [sorted(region, key=lambda cut: cut.level) for region in regions.values()]) for operation, regions in operations]
+
+# Routing
+
+class Router:
+
+    """
+    Orders the regions of one operation.
+
+    Args:
+        nodes: Per region, the list of its Variants.
+        start: (x, y, z) where the previous operation ended, None at the start
+            of the program.
+        settings: CamSettings.
+        rapid_feed: Rapid traverse rate in mm/min.
+    """
+
+    def __init__(self, nodes, start, settings, rapid_feed):
+
+        self.nodes = nodes
+        self.start = start
+        self.settings = settings
+        self.rapid_feed = rapid_feed
+
+        n = len(nodes)
+
+        # entry[j][b]: from the previous operation into variant b of region j,
+        # link[i][a][j][b]: from variant a of region i into variant b of region j
+
+        entry_from = None if start is None else (start[0], start[1], settings.clearance)
+
+        self.entry = [[self.link_seconds(entry_from, None, variant) + variant.seconds for variant in node] for node in nodes]
+
+        self.link = [[[[self.link_seconds(variant.exit, variant.exit, other) + other.seconds for other in nodes[j]] for j in range(n)] for variant in node] for node in nodes]
+
+    def link_seconds(self, position, previous, variant):
+
+        # Closed form of Clock.link, this runs for every pair of regions
+
+        s = self.settings
+        x, y, z = variant.first.start
+
+        if position is None:
+            position = (x, y, s.clearance)
+
+        if previous is not None and math.isclose(previous[0], x, abs_tol=1e-6) and math.isclose(previous[1], y, abs_tol=1e-6):
+            return abs(position[2] - z) / s.plunge_feed * 60.0
+
+        up = s.clearance if previous is None else s.retract
+        approach = variant.first.top + s.feed_height
+
+        rapid = abs(up - position[2]) + math.hypot(x - position[0], y - position[1]) + abs(up - approach)
+
+        return rapid / self.rapid_feed * 60.0 + abs(approach - z) / s.plunge_feed * 60.0
+
+    def cost(self, order, variants):
+
+        total = self.entry[order[0]][variants[0]]
+
+        for k in range(1, len(order)):
+            total += self.link[order[k - 1]][variants[k - 1]][order[k]][variants[k]]
+
+        return total
+
+    def best_variants(self, order):
+
+        """
+        Cheapest variant of every region for a fixed order (Viterbi).
+        """
+
+        costs = list(self.entry[order[0]])
+        back = []
+
+        for k in range(1, len(order)):
+
+            i, j = order[k - 1], order[k]
+            step = []
+            new_costs = []
+
+            for b in range(len(self.nodes[j])):
+
+                a = min(range(len(costs)), key=lambda a: costs[a] + self.link[i][a][j][b])
+
+                step.append(a)
+                new_costs.append(costs[a] + self.link[i][a][j][b])
+
+            back.append(step)
+            costs = new_costs
+
+        b = min(range(len(costs)), key=costs.__getitem__)
+        variants = [b]
+
+        for step in reversed(back):
+            b = step[b]
+            variants.append(b)
+
+        return variants[::-1], min(costs)
+
+    def span(self, order, variants, lo, hi):
+
+        # Cost of entering positions lo..hi (the first one from the previous
+        # operation), plus the link leaving hi if there is one
+
+        total = 0.0
+
+        for k in range(lo, min(hi + 2, len(order))):
+
+            if k == 0:
+                total += self.entry[order[0]][variants[0]]
+            else:
+                total += self.link[order[k - 1]][variants[k - 1]][order[k]][variants[k]]
+
+        return total
+
+    def two_opt(self, order, variants):
+
+        """
+        Reverse sub-sequences of regions while that shortens the path.
+        """
+
+        n = len(order)
+        improved = True
+
+        while improved:
+
+            improved = False
+
+            for i in range(n - 1):
+                for j in range(i + 1, n):
+
+                    new_order = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+                    new_variants = variants[:i] + variants[i:j + 1][::-1] + variants[j + 1:]
+
+                    if self.span(new_order, new_variants, i, j) < self.span(order, variants, i, j) - 1e-9:
+                        order, variants = new_order, new_variants
+                        improved = True
+
+        return order, variants
+
+    def improve(self, order):
+
+        variants, cost = self.best_variants(order)
+
+        for _ in range(MAX_ROUNDS):
+
+            order, variants = self.two_opt(order, variants)
+            variants, new_cost = self.best_variants(order)
+
+            if new_cost >= cost - 1e-9:
+                break
+
+            cost = new_cost
+
+        return order, variants, cost
+
+    def nearest_neighbour(self):
+
+        remaining = set(range(len(self.nodes)))
+        order = []
+        exit = None
+
+        while remaining:
+
+            if exit is None:
+                j, b = min(((j, b) for j in remaining for b in range(len(self.nodes[j]))), key=lambda jb: self.entry[jb[0]][jb[1]])
+            else:
+                i, a = exit
+                j, b = min(((j, b) for j in remaining for b in range(len(self.nodes[j]))), key=lambda jb: self.link[i][a][jb[0]][jb[1]])
+
+            order.append(j)
+            remaining.remove(j)
+            exit = (j, b)
+
+        return order
+
+    def sweeps(self):
+
+        """
+        Regions by the angle of their entry around the cavity axis, both ways
+        round, starting from the region closest to where the tool is.
+        """
+
+        cx, cy = self.settings.origin
+
+        def angle(j):
+            x, y, _ = self.nodes[j][0].first.start
+            return math.atan2(y - cy, x - cx)
+
+        order = sorted(range(len(self.nodes)), key=angle)
+        first = min(range(len(order)), key=lambda k: self.entry[order[k]][0])
+
+        ccw = order[first:] + order[:first]
+
+        return [ccw, ccw[:1] + ccw[1:][::-1]]
+
+    def route(self):
+
+        """
+        Returns:
+            The regions' variants in cutting order.
+        """
+
+        if len(self.nodes) == 1:
+            variants, _ = self.best_variants([0])
+            return [self.nodes[0][variants[0]]]
+
+        candidates = [list(range(len(self.nodes))), self.nearest_neighbour()] + self.sweeps()
+
+        order, variants, _ = min((self.improve(order) for order in candidates), key=lambda result: result[2])
+
+        return [self.nodes[j][b] for j, b in zip(order, variants)]
+
+def optimize(passes, settings, rapid_feed=RAPID_FEED):
+
+    """
+    Reorder a program's passes to cut down retracts and rapid travel.
+
+    Args:
+        passes: Iterable of Pass in program order.
+        settings: CamSettings.
+        rapid_feed: Rapid traverse rate in mm/min.
+
+    Returns:
+        A list of Pass.
+    """
+
+    ordered = []
+    start = None
+
+    for _, regions in group(passes):
+
+        nodes = [region_variants(region, settings, rapid_feed) for region in regions]
+
+        for variant in Router(nodes, start, settings, rapid_feed).route():
+            ordered.extend(variant.passes)
+
+        start = ordered[-1].end
+
+    return ordered
+
+# Command line
+
+def format_seconds(seconds):
+    return f"{int(seconds // 60)}:{seconds % 60:04.1f}"
+
+def main(argv=None):
+
+    parser = cavity_cam.build_parser("Generate G-code for one side of a circular resonant cavity with optimized pass ordering.")
+    parser.add_argument("--rapid-feed", type=float, default=RAPID_FEED, help="machine rapid rate (mm/min) for the estimates")
+    args = parser.parse_args(argv)
+
+    settings = cavity_cam.settings_from_args(args)
+    geometry = cavity_geometry.compute(args.r, args.R, args.w, args.W, args.h, args.H, args.t, args.n)
+
+    passes = list(cavity_cam.CavityCam(geometry, settings).passes())
+
+    start = time.perf_counter()
+    ordered = optimize(passes, settings, args.rapid_feed)
+    elapsed = time.perf_counter() - start
+
+    before = estimate(passes, settings, args.rapid_feed)
+    after = estimate(ordered, settings, args.rapid_feed)
+
+    with open(args.output, "w", encoding="ascii") as f:
+        stats = cavity_cam.write_program(ordered, f, settings, cavity_cam.program_title(geometry))
+
+    print(f"{'':<14}{'cycle':>10}{'cut':>10}{'plunge':>10}{'rapid':>10}{'rapid mm':>10}{'retracts':>10}")
+
+    for name, report in [("as generated", before), ("optimized", after)]:
+        print(f"{name:<14}{format_seconds(report['seconds']):>10}{format_seconds(report['cut_seconds']):>10}{format_seconds(report['plunge_seconds']):>10}{format_seconds(report['rapid_seconds']):>10}{report['rapid_length']:>10.0f}{report['retracts']:>10}")
+
+    saved = before["seconds"] - after["seconds"]
+    print(f"Saved {format_seconds(saved)} ({saved / before['seconds']:.1%}), ordering took {elapsed * 1e3:.0f} ms")
+    print(f"Wrote {stats['lines']} lines to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+# The cavity modules are loaded by Fusion as a script folder, not installed as
+# a package, so tests import them from the folder itself.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
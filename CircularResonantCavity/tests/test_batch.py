@@ -0,0 +1,108 @@
+import csv
+import os
+
+import pytest
+
+import cavity_batch
+import cavity_mesh
+
+def test_value_range_includes_the_stop():
+
+    assert cavity_batch.value_range({"start": 1.0, "stop": 2.0, "step": 0.25}) == [1.0, 1.25, 1.5, 1.75, 2.0]
+    assert cavity_batch.value_range({"start": 0.1, "stop": 0.3, "step": 0.1}) == [0.1, 0.2, 0.3]
+
+def test_integer_sweeps_stay_integers():
+
+    values = cavity_batch.value_range({"start": 3, "stop": 12, "step": 3})
+
+    assert values == [3, 6, 9, 12]
+    assert all(isinstance(value, int) for value in values)
+
+    assert cavity_batch.value_range({"start": 4, "stop": 6}) == [4, 5, 6]
+    assert cavity_batch.value_range({"start": 4, "stop": 6, "step": 0.5}) == [4.0, 4.5, 5.0, 5.5, 6.0]
+
+@pytest.mark.parametrize("step", [0, -1])
+def test_value_range_needs_a_positive_step(step):
+
+    with pytest.raises(ValueError):
+        cavity_batch.value_range({"start": 1, "stop": 2, "step": step})
+
+def test_expand_sweeps_every_combination():
+
+    sets = cavity_batch.expand({"base": {"h": 2.0, "n": 4}, "sweep": {"n": {"start": 3, "stop": 5}, "t": [0.1, 0.2]}})
+
+    assert sets == [
+        {"h": 2.0, "n": 3, "t": 0.1},
+        {"h": 2.0, "n": 3, "t": 0.2},
+        {"h": 2.0, "n": 4, "t": 0.1},
+        {"h": 2.0, "n": 4, "t": 0.2},
+        {"h": 2.0, "n": 5, "t": 0.1},
+        {"h": 2.0, "n": 5, "t": 0.2},
+    ]
+
+    # A list is taken as the sets themselves, no sweep leaves the base
+    assert cavity_batch.expand([{"n": 3}, {"n": 4}]) == [{"n": 3}, {"n": 4}]
+    assert cavity_batch.expand({"base": {"n": 3}}) == [{"n": 3}]
+
+# Same parameters written two ways, one unbuildable and one unknown name
+SETS = [
+    {"n": 6},
+    {"n": "6.0", "h": "2"},
+    {"n": 3},
+    {"n": 0},
+    {"n": 6, "radius": 1},
+]
+
+def statuses(rows):
+    return [row["status"] for row in rows]
+
+def test_rerun_skips_built_and_repeated_sets(tmp_path):
+
+    out = str(tmp_path / "cavities")
+
+    rows = cavity_batch.run(SETS, out, jobs=1, tolerance=0.01)
+
+    assert statuses(rows) == ["built", "duplicate", "built", "failed", "failed"]
+    assert rows[0]["key"] == rows[1]["key"] != rows[2]["key"]
+    assert "unknown parameters ['radius']" in rows[4]["error"]
+
+    built = sorted(os.listdir(out))
+
+    assert built == sorted([rows[0]["key"], rows[2]["key"]])
+    assert sorted(os.listdir(os.path.join(out, rows[0]["key"]))) == ["cavity.nc", "cavity.stl", "summary.json"]
+
+    # Nothing left to build, repeats of a built set are read back too and
+    # failures are tried again
+    rows = cavity_batch.run(SETS, out, jobs=1, tolerance=0.01)
+
+    assert statuses(rows) == ["cached", "cached", "cached", "failed", "failed"]
+    assert sorted(os.listdir(out)) == built
+    assert rows[0]["seconds"] > 0 and rows[1]["volume"] == rows[0]["volume"]
+
+    # A different tolerance is a different variant
+    assert statuses(cavity_batch.run(SETS[:1], out, jobs=1, tolerance=0.02)) == ["built"]
+
+    with open(cavity_batch.write_index(rows, out), "r", encoding="utf-8", newline="") as f:
+        assert [row["status"] for row in csv.DictReader(f)] == statuses(rows)
+
+def test_unexpected_errors_fail_only_their_set(tmp_path, monkeypatch):
+
+    mesh = cavity_mesh.mesh
+
+    def flaky(geometry, tolerance):
+
+        if geometry.n == 3:
+            raise ZeroDivisionError("float division by zero")
+
+        return mesh(geometry, tolerance)
+
+    monkeypatch.setattr(cavity_mesh, "mesh", flaky)
+
+    out = str(tmp_path / "cavities")
+    rows = cavity_batch.run([{"n": 3}, {"n": 6}], out, jobs=1, tolerance=0.01)
+
+    assert statuses(rows) == ["failed", "built"]
+    assert rows[0]["error"] == "ZeroDivisionError: float division by zero"
+
+    # The failed variant's staging directory is gone
+    assert os.listdir(out) == [rows[1]["key"]]
@@ -0,0 +1,92 @@
+import io
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import cavity_cam
+import cavity_geometry
+import cavity_sim
+import cavity_toolpath
+
+KINDS = {"G1": cavity_sim.LINE, "G2": cavity_sim.CW, "G3": cavity_sim.CCW}
+
+@pytest.fixture(scope="module")
+def geometry():
+    return cavity_geometry.compute(r=1.25, R=1.8, w=0.38, W=0.5, h=2.0, H=2.25, t=0.2138, n=6)
+
+def write(passes, settings):
+
+    f = io.StringIO()
+    written = cavity_cam.write_program(passes, f, settings)
+
+    return f.getvalue(), written
+
+def matches(program, index, move):
+
+    if program.kind[index] != KINDS[move[0]] or not np.allclose(program.end[index], move[1:4], atol=1e-3):
+        return False
+
+    return move[0] == "G1" or np.allclose(program.center[index, :2], move[4:6], atol=2e-3)
+
+@pytest.mark.parametrize("optimized", [False, True])
+def test_program_round_trips(geometry, optimized):
+
+    settings = cavity_cam.CamSettings()
+    passes = list(cavity_cam.CavityCam(geometry, settings).passes())
+
+    if optimized:
+        passes = cavity_toolpath.optimize(passes, settings)
+
+    text, written = write(passes, settings)
+    program = cavity_sim.parse(text.splitlines())
+
+    assert written["passes"] == len(passes)
+    assert written["lines"] == len(text.splitlines())
+
+    # Comments naming operations that own blocks, the header's don't
+    assert [program.operations[i] for i in dict.fromkeys(program.operation.tolist())] == list(dict.fromkeys(cut.operation for cut in passes))
+
+    frames = cavity_sim.arc_frames(program)
+    length = cavity_sim.lengths_and_tangents(program, frames)[0]
+
+    # Every cutting move comes back in order, with its end point, arc center
+    # and length, only interleaved with the links between passes
+    index = 0
+
+    for cut in passes:
+
+        position = cut.start
+
+        for move in cut.moves:
+
+            while not matches(program, index, move):
+                index += 1
+
+            assert program.feed[index] == settings.feed
+            assert program.operation[index] == program.operations.index(cut.operation)
+            assert length[index] == pytest.approx(cavity_toolpath.move_length(position, move), abs=1e-2)
+
+            position = move[1:4]
+            index += 1
+
+def test_arc_centers_are_relative_to_the_arc_start():
+
+    f = io.StringIO()
+    out = cavity_cam.GcodeWriter(f)
+
+    out.rapid(10.0, 0.0, 1.0)
+    out.arc("G3", -10.0, 0.0, 1.0, center=(0.0, 0.0), feed=500.0)
+    out.arc("G3", 10.0, 0.0, 1.0, center=(0.0, 0.0), feed=500.0)
+
+    assert f.getvalue().splitlines() == ["G0 X10 Y0 Z1", "G3 X-10 I-10 J0 F500", "X10 I10 J0"]
+    assert out.start == (-10.0, 0.0, 1.0)
+
+def test_depth_defaults_to_half_the_shield(geometry):
+
+    settings = cavity_cam.CamSettings()
+    passes = list(cavity_cam.CavityCam(geometry, settings).passes())
+
+    bottom = min(z for cut in passes for *_, z in [cut.start] + [move[1:4] for move in cut.moves])
+
+    assert bottom == pytest.approx(-geometry.H * 10.0 / 2.0)
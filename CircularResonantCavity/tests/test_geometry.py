@@ -0,0 +1,77 @@
+import math
+
+import pytest
+
+import cavity_geometry
+
+DEFAULT = dict(r=1.25, R=1.8, w=0.38, W=0.5, h=2.0, H=2.25, t=0.2138, n=6)
+
+@pytest.fixture(params=[DEFAULT, {**DEFAULT, "n": 3}, {**DEFAULT, "n": 12, "t": 0.1}])
+def geometry(request):
+    return cavity_geometry.compute(**request.param)
+
+def test_electrodes_and_gaps_fill_the_ring(geometry):
+
+    g = geometry
+    ring = math.pi * ((g.r + g.w) ** 2 - g.r ** 2)
+
+    assert len(g.electrodes) == len(g.gaps) == g.n
+    assert sum(region.area for region in g.electrodes + g.gaps) == pytest.approx(ring, rel=1e-12)
+    assert all(region.area > 0 for region in g.electrodes + g.gaps)
+
+def test_spruces_are_annular_sectors(geometry):
+
+    g = geometry
+    sector = g.spruce_half_angle * (g.R ** 2 - (g.r + g.w) ** 2)
+
+    for spruce in g.spruces:
+        assert spruce.area == pytest.approx(sector, rel=1e-12)
+
+def test_outline_is_segment_plus_spruce(geometry):
+
+    for outline, electrode, spruce in zip(geometry.outlines, geometry.electrodes, geometry.spruces):
+        assert outline.area == pytest.approx(electrode.area + spruce.area, rel=1e-12)
+
+def test_shield_is_an_annulus(geometry):
+
+    g = geometry
+
+    assert g.shield.area == pytest.approx(math.pi * ((g.R + g.W) ** 2 - g.R ** 2), rel=1e-12)
+    assert g.shield.centroid == pytest.approx((0.0, 0.0), abs=1e-12)
+
+def test_segments_are_symmetric_about_their_center_line(geometry):
+
+    g = geometry
+
+    for k, electrode in enumerate(g.electrodes):
+
+        x, y = electrode.centroid
+        angle = g.segment_angle(k)
+
+        # On the segment's center line, on its side of the axis. Wide segments
+        # bend enough for the centroid to fall inside the inner circle
+        assert x * math.sin(angle) - y * math.cos(angle) == pytest.approx(0.0, abs=1e-12)
+        assert 0.0 < x * math.cos(angle) + y * math.sin(angle) < g.r + g.w
+
+        assert electrode.area == pytest.approx(g.electrodes[0].area, rel=1e-12)
+
+def test_summary_volumes(geometry):
+
+    g = geometry
+    summary = g.summary()
+
+    assert summary["electrode_volume"] == pytest.approx((summary["electrode_area"] + summary["spruce_area"]) * g.h)
+    assert summary["shield_volume"] == pytest.approx(g.shield.area * g.H)
+    assert [segment["angle_deg"] for segment in summary["segments"]] == pytest.approx([math.degrees(g.segment_angle(k)) for k in range(g.n)])
+
+@pytest.mark.parametrize("changes", [
+    {"n": 0},
+    {"w": -0.1},
+    {"R": 1.5},
+    {"t": 2.6},
+    {"n": 40},
+])
+def test_unbuildable_parameters(changes):
+
+    with pytest.raises(ValueError):
+        cavity_geometry.compute(**{**DEFAULT, **changes})
@@ -0,0 +1,58 @@
+import struct
+from collections import Counter
+
+import pytest
+
+import cavity_geometry
+import cavity_mesh
+
+DEFAULT = dict(r=1.25, R=1.8, w=0.38, W=0.5, h=2.0, H=2.25, t=0.2138, n=6)
+
+# Spruces fused into the shield, and electrodes standing out of it
+@pytest.fixture(params=[DEFAULT, {**DEFAULT, "n": 3, "h": 2.5}])
+def geometry(request):
+    return cavity_geometry.compute(**request.param)
+
+def expected_volume(geometry):
+
+    summary = geometry.summary()
+
+    return summary["electrode_volume"] + summary["shield_volume"]
+
+def test_shell_is_closed(geometry):
+
+    # Every edge is walked once each way by the two triangles sharing it
+    def vertex(point):
+        return tuple(round(x, 9) for x in point)
+
+    edges = Counter((vertex(a), vertex(b)) for triangle in cavity_mesh.mesh(geometry, 1e-3) for a, b in zip(triangle, triangle[1:] + triangle[:1]))
+
+    assert all(count == 1 and edges[(b, a)] == 1 for (a, b), count in edges.items())
+
+def test_volume_matches_the_geometry(geometry):
+
+    exact = expected_volume(geometry)
+    errors = []
+
+    for tolerance in [1e-2, 1e-3, 1e-4]:
+        errors.append((exact - cavity_mesh.volume(cavity_mesh.mesh(geometry, tolerance))) / exact)
+
+    # Chords cut inside the arcs, closer as the tolerance shrinks
+    assert 0 < errors[2] < errors[1] < errors[0] < 1e-2
+    assert errors[1] < 1e-3
+
+def test_stl_is_scaled_to_mm(geometry, tmp_path):
+
+    triangles = cavity_mesh.mesh(geometry, 1e-2)
+    path = tmp_path / "cavity.stl"
+
+    assert cavity_mesh.write_stl(triangles, str(path), "cavity") == len(triangles)
+
+    data = path.read_bytes()
+
+    assert len(data) == 84 + 50 * len(triangles)
+    assert struct.unpack_from("<I", data, 80)[0] == len(triangles)
+
+    first = struct.unpack_from("<12f", data, 84)
+
+    assert first[3:12] == pytest.approx([x * 10.0 for point in triangles[0] for x in point], rel=1e-6)
@@ -0,0 +1,64 @@
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import cavity_sim
+
+# 100 mm/s cruise and 100 mm/s^2 on every axis, so a straight block of L mm
+# from rest to rest takes L / 100 + 1 seconds
+MACHINE = cavity_sim.Machine((6000.0,) * 3, (100.0,) * 3)
+
+def straight(count, length=100.0):
+
+    return cavity_sim.parse([f"G1 X{length * (i + 1)} F6000" for i in range(count)])
+
+@pytest.mark.parametrize("count, seconds", [(1, 2.0), (2, 3.0), (3, 4.0)])
+def test_collinear_blocks_dont_stop_between(count, seconds):
+
+    result = cavity_sim.simulate(straight(count), MACHINE, volume=False)
+
+    assert result["seconds"] == pytest.approx(seconds)
+
+def test_reversal_stops():
+
+    program = cavity_sim.parse(["G1 X100 F6000", "X0"])
+
+    assert cavity_sim.simulate(program, MACHINE, volume=False)["seconds"] == pytest.approx(4.0)
+
+def test_machine_codes_stop():
+
+    program = cavity_sim.parse(["G1 X100 F6000", "M8", "X200"])
+
+    assert cavity_sim.simulate(program, MACHINE, volume=False)["seconds"] == pytest.approx(4.0)
+
+def test_short_blocks_never_reach_cruise():
+
+    # 1 mm from rest to rest peaks at sqrt(a L) = 10 mm/s after 0.1 s
+    program = cavity_sim.parse(["G1 X1 F6000"])
+
+    assert cavity_sim.simulate(program, MACHINE, volume=False)["seconds"] == pytest.approx(0.2)
+
+def test_full_circle_length():
+
+    program = cavity_sim.parse(["G0 X0 Y0", "G3 X0 Y0 I10 J0 F600"])
+    result = cavity_sim.simulate(program, volume=False)
+
+    assert result["feed_length"] == pytest.approx(20.0 * math.pi)
+
+def test_radius_arc_center():
+
+    program = cavity_sim.parse(["G0 X0 Y0", "G2 X10 Y10 R10 F600"])
+
+    assert program.center[0, :2] == pytest.approx([10.0, 0.0])
+
+def test_operations_and_volume():
+
+    program = cavity_sim.parse(["(T1 D=2 CR=0 - flat end mill)", "T1", "(slot)", "G0 X0 Y0 Z1", "G1 Z-1 F100", "X10"])
+    result = cavity_sim.simulate(program, resolution=0.05)
+
+    assert list(result["operations"]) == ["slot"]
+
+    # 10 mm x 2 mm slot with round ends, 1 mm deep
+    assert result["volume"] == pytest.approx(20.0 + math.pi, rel=0.05)
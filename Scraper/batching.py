@@ -0,0 +1,47 @@
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# OpenAI embedding request limits (text-embedding-3-*)
+
+MAX_REQUEST_TOKENS = 300_000
+MAX_REQUEST_INPUTS = 2048
+
+_encodings = {}
+
+def count_tokens(text, model="text-embedding-3-small"):
+
+    # Exact with tiktoken, otherwise a deliberately pessimistic ~3 chars/token
+
+    if tiktoken is None:
+        return len(text) // 3 + 1
+
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding("cl100k_base")
+
+    return len(_encodings[model].encode(text, disallowed_special=()))
+
+def token_batches(items, weigh, max_tokens=MAX_REQUEST_TOKENS, max_items=MAX_REQUEST_INPUTS):
+
+    # Greedily packs items in order until the next one would cross either limit.
+    # An item heavier than max_tokens still gets a batch of its own.
+
+    batch, tokens = [], 0
+
+    for item in items:
+
+        weight = weigh(item)
+
+        if batch and (tokens + weight > max_tokens or len(batch) >= max_items):
+            yield batch
+            batch, tokens = [], 0
+
+        batch.append(item)
+        tokens += weight
+
+    if batch:
+        yield batch
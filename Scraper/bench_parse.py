@@ -0,0 +1,154 @@
+from extract import extract_chunk, extract_object, extract_object_attr, extract_sample
+from parsing import BODY, available_backends, make_soup
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import time
+import os
+
+# Micro-benchmark of the HTML parsing step over a recorded corpus (by default
+# the crawl's page cache). Each page is parsed and then searched for the same
+# elements the extractors in scraper.py look up. With --extract, the section
+# extraction alone is timed on pre-built trees. With --scaling, the full
+# extractor is instead run through process pools of increasing size.
+
+EXTRACTORS = {
+    "samples": extract_sample,
+    "objects": extract_object,
+    "object_attrs": extract_object_attr,
+}
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "pages", "blobs")
+
+def load_corpus(root, limit=None):
+
+    pages = []
+
+    for dirpath, _, filenames in sorted(os.walk(root)):
+        for filename in sorted(filenames):
+
+            if filename.endswith((".tmp", ".json", ".sqlite")):
+                continue
+
+            with open(os.path.join(dirpath, filename), "rb") as f:
+                pages.append(f.read())
+
+            if limit and len(pages) >= limit:
+                return pages
+
+    return pages
+
+def lookup(soup):
+
+    soup.find("h1", class_="api")
+    soup.find_all("h2", class_="api")
+    soup.find("pre", id="Python_code")
+    soup.find("div", id="Python")
+
+    for table in soup.find_all("table"):
+        table.find_all("tr")
+
+def run(pages, backend, strainer, repeat):
+
+    best = float("inf")
+
+    for _ in range(repeat):
+
+        start = time.perf_counter()
+
+        for page in pages:
+            lookup(make_soup(page, backend=backend, strainer=strainer))
+
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+def extraction(pages, repeat):
+
+    # Trees are built outside the timed region and handed to the extractors
+
+    print(f"{'extractor':<14}{'ms/page':>10}")
+
+    for kind, fn in EXTRACTORS.items():
+
+        best = float("inf")
+
+        for _ in range(repeat):
+
+            soups = [make_soup(page) for page in pages]
+
+            start = time.perf_counter()
+
+            for page, soup in zip(pages, soups):
+                fn(page, soup)
+
+            best = min(best, time.perf_counter() - start)
+
+        print(f"{kind:<14}{best / len(pages) * 1e3:>10.3f}")
+
+def run_pool(pages, extractor, processes, chunk_size):
+
+    chunks = [pages[i:i+chunk_size] for i in range(0, len(pages), chunk_size)]
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+
+        # Warm the workers up so process start-up isn't timed
+        list(pool.map(extract_chunk, [extractor] * processes, [chunks[0][:1]] * processes))
+
+        start = time.perf_counter()
+        list(pool.map(extract_chunk, [extractor] * len(chunks), chunks))
+
+        return time.perf_counter() - start
+
+def scaling(pages, extractor, chunk_size, max_processes):
+
+    print(f"{'processes':<12}{'pages/sec':>12}{'speedup':>10}{'efficiency':>12}")
+
+    processes, base = 1, None
+
+    while processes <= max_processes:
+
+        elapsed = run_pool(pages, extractor, processes, chunk_size)
+        base = base or elapsed
+
+        print(f"{processes:<12}{len(pages) / elapsed:>12.1f}{base / elapsed:>10.2f}{base / elapsed / processes:>12.0%}")
+
+        processes *= 2
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark HTML parser backends over recorded pages.")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="directory of recorded HTML pages")
+    parser.add_argument("--limit", type=int, default=None, help="only use the first N pages")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per backend, the best one is reported")
+    parser.add_argument("--extract", action="store_true", help="time section extraction alone, per extractor")
+    parser.add_argument("--scaling", action="store_true", help="measure process-pool scaling of the full extractor instead")
+    parser.add_argument("--kind", choices=EXTRACTORS, default="object_attrs", help="extractor used with --scaling")
+    parser.add_argument("--chunk-size", type=int, default=8, help="pages per dispatched chunk with --scaling")
+    parser.add_argument("--max-processes", type=int, default=os.cpu_count() or 1, help="largest pool tried with --scaling")
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus, args.limit)
+
+    if not pages:
+        raise SystemExit(f"No pages found under {args.corpus}")
+
+    total_bytes = sum(len(page) for page in pages)
+
+    print(f"{len(pages)} pages, {total_bytes / 1e6:.1f} MB")
+
+    if args.extract:
+        extraction(pages, args.repeat)
+        raise SystemExit
+
+    if args.scaling:
+        scaling(pages, EXTRACTORS[args.kind], args.chunk_size, args.max_processes)
+        raise SystemExit
+
+    print(f"{'backend':<14}{'strainer':<10}{'pages/sec':>12}{'MB/sec':>10}")
+
+    for backend in available_backends():
+        for name, strainer in [("none", None), ("body", BODY)]:
+
+            elapsed = run(pages, backend, strainer, args.repeat)
+
+            print(f"{backend:<14}{name:<10}{len(pages) / elapsed:>12.1f}{total_bytes / 1e6 / elapsed:>10.2f}")
@@ -0,0 +1,220 @@
+from embedding_cache import EmbeddingCache
+from retrieval import CACHE_DIR, EMBEDDING_MODEL, INDEX_DIR, NAMESPACES, embed_query, hybrid_search, search
+from lexical_index import LexicalIndex
+from vector_index import open_index
+from page_cache import CacheMiss
+import numpy as np
+import argparse
+import json
+import time
+import os
+
+# Retrieval benchmark over a fixed set of Fusion API questions with the ids a
+# good answer must retrieve (benchmarks/questions.json). Reports recall@k, MRR
+# (overall and per namespace) and query latency for each index configuration
+# and saves the results as JSON, so runs can be compared with --baseline.
+# Question embeddings come from the embedding cache, --online embeds (and
+# caches) the missing ones.
+
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+
+DEFAULT_QUESTIONS = os.path.join(BENCHMARK_DIR, "questions.json")
+DEFAULT_RESULTS = os.path.join(BENCHMARK_DIR, "results")
+
+def load_questions(path):
+
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def embed_questions(questions, cache, model, online):
+
+    # Questions without an embedding are skipped rather than failing the run
+
+    embedded, skipped = [], []
+
+    for question in questions:
+
+        try:
+            vector = embed_query(question["question"], cache, model=model, offline=not online)
+        except CacheMiss:
+            skipped.append(question["question"])
+            continue
+
+        embedded.append((question, vector))
+
+    return embedded, skipped
+
+def quality(hits, reciprocal_ranks, ks):
+    return {**{f"recall@{k}": float(np.mean([hit[k] for hit in hits])) for k in ks}, "mrr": float(np.mean(reciprocal_ranks))}
+
+def evaluate(index, embedded, ks, repeat, lexical=None):
+
+    # Ranks come from the first run, latencies from all of them. With a lexical
+    # index the hybrid search is timed, question embeddings still come from the
+    # cache so only the index work is measured. Recall and MRR are also broken
+    # down by the namespace the questions target
+
+    top_k = max(ks)
+
+    scores = {}
+    latencies = []
+
+    for question, vector in embedded:
+
+        namespaces = [question["namespace"]] if question.get("namespace") else NAMESPACES
+
+        for i in range(repeat):
+
+            start = time.perf_counter()
+            if lexical is None:
+                matches = search(index, vector, namespaces, top_k)
+            else:
+                matches = hybrid_search(index, lexical, question["question"], lambda text: vector, namespaces, top_k)
+
+            latencies.append(time.perf_counter() - start)
+
+            if i == 0:
+                ranked = [match["id"] for match in matches]
+
+        expected = set(question["expected"])
+        rank = next((i + 1 for i, id in enumerate(ranked) if id in expected), None)
+
+        hits, reciprocal_ranks = scores.setdefault(question.get("namespace") or "all", ([], []))
+        hits.append({k: len(expected & set(ranked[:k])) / len(expected) for k in ks})
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+
+    latencies = np.array(latencies) * 1e3
+
+    result = quality([hit for hits, _ in scores.values() for hit in hits], [rr for _, rrs in scores.values() for rr in rrs], ks)
+    result["p50_ms"] = float(np.percentile(latencies, 50))
+    result["p99_ms"] = float(np.percentile(latencies, 99))
+    result["namespaces"] = {namespace: {"questions": len(hits), **quality(hits, reciprocal_ranks, ks)} for namespace, (hits, reciprocal_ranks) in sorted(scores.items())}
+
+    return result
+
+def configurations(backends, modes, nprobes, hybrid=False):
+
+    for backend in backends:
+
+        if backend != "local":
+            yield {"backend": backend}
+            continue
+
+        for mode in modes:
+            for nprobe in ([None] if mode == "flat" else nprobes):
+
+                config = {"backend": backend, "mode": mode}
+
+                if nprobe is not None:
+                    config["nprobe"] = nprobe
+
+                yield config
+
+                if hybrid:
+                    yield {**config, "retrieval": "hybrid"}
+
+def label(config):
+    return "/".join(str(value) for value in config.values())
+
+def deltas(figures, previous):
+    return [f"{metric} {figures[metric] - previous[metric]:+.3f}" for metric in figures if metric not in ("config", "namespaces", "questions") and metric in previous]
+
+def compare(results, baseline):
+
+    # Metric deltas against a previous run, matched by configuration, then
+    # for each namespace both runs have figures for
+
+    previous = {label(run["config"]): run for run in baseline["runs"]}
+
+    for run in results["runs"]:
+
+        name = label(run["config"])
+
+        if name not in previous:
+            continue
+
+        print(f"[BASELINE] {name}: {', '.join(deltas(run, previous[name]))}")
+
+        for namespace, figures in run.get("namespaces", {}).items():
+            if namespace in previous[name].get("namespaces", {}):
+                print(f"[BASELINE] {name} {namespace}: {', '.join(deltas(figures, previous[name]['namespaces'][namespace]))}")
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark retrieval quality and latency over the API index.")
+    parser.add_argument("--questions", default=DEFAULT_QUESTIONS, help="JSON list of {question, namespace, expected}")
+    parser.add_argument("--backend", action="append", choices=["local", "pinecone"], help="index backend (repeatable, default local)")
+    parser.add_argument("--mode", action="append", choices=["flat", "ivf"], help="local index mode (repeatable, default both)")
+    parser.add_argument("--nprobe", type=int, action="append", help="IVF lists probed (repeatable, default 1, 4 and 8)")
+    parser.add_argument("--model", default=EMBEDDING_MODEL, help="embedding model the index was built with")
+    parser.add_argument("--index-dir", default=INDEX_DIR, help="root of the local index")
+    parser.add_argument("-k", type=int, action="append", help="recall cut-off (repeatable, default 1, 5 and 10)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per question")
+    parser.add_argument("--hybrid", action="store_true", help="also run each local configuration with the lexical index")
+    parser.add_argument("--online", action="store_true", help="embed questions missing from the cache")
+    parser.add_argument("--output", default=None, help="results file (default benchmarks/results/retrieval-<time>.json)")
+    parser.add_argument("--baseline", default=None, help="previous results file to compare against")
+    args = parser.parse_args()
+
+    ks = sorted(set(args.k or [1, 5, 10]))
+
+    cache = EmbeddingCache(os.path.join(CACHE_DIR, "embeddings"))
+
+    try:
+        questions = load_questions(args.questions)
+        embedded, skipped = embed_questions(questions, cache, args.model, args.online)
+    finally:
+        cache.close()
+
+    print(f"{len(embedded)} questions, {len(skipped)} skipped (no cached embedding)")
+
+    if not embedded:
+        raise SystemExit("Nothing to benchmark, run once with --online to cache the question embeddings")
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "model": args.model,
+        "questions": len(embedded),
+        "skipped": skipped,
+        "runs": [],
+    }
+
+    print(f"{'configuration':<22}" + "".join(f"{f'R@{k}':>8}" for k in ks) + f"{'MRR':>8}{'p50 ms':>10}{'p99 ms':>10}")
+
+    lexical = LexicalIndex(os.path.join(CACHE_DIR, "lexical.sqlite")) if args.hybrid else None
+
+    for config in configurations(args.backend or ["local"], args.mode or ["flat", "ivf"], args.nprobe or [1, 4, 8], args.hybrid):
+
+        index = open_index(config["backend"], root=args.index_dir, mode=config.get("mode", "ivf"))
+
+        if "nprobe" in config:
+            index.nprobe = config["nprobe"]
+
+        try:
+            result = evaluate(index, embedded, ks, args.repeat, lexical if "retrieval" in config else None)
+        finally:
+            if config["backend"] == "local":
+                index.close()
+
+        results["runs"].append({"config": config, **result})
+
+        print(f"{label(config):<22}" + "".join(f"{result[f'recall@{k}']:>8.3f}" for k in ks) + f"{result['mrr']:>8.3f}{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}")
+
+        for namespace, figures in result["namespaces"].items():
+            print(f"{f'  {namespace} ({figures['questions']})':<22}" + "".join(f"{figures[f'recall@{k}']:>8.3f}" for k in ks) + f"{figures['mrr']:>8.3f}")
+
+    output = args.output or os.path.join(DEFAULT_RESULTS, f"retrieval-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4)
+
+    print(f"[RESULTS] {output}")
+
+    if lexical is not None:
+        lexical.close()
+
+    if args.baseline:
+
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            compare(results, json.load(f))
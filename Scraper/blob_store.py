@@ -0,0 +1,47 @@
+import threading
+import hashlib
+import json
+import zlib
+import os
+
+class BlobStore:
+
+    # Content-addressed store for JSON payloads kept out of the vector metadata.
+    # Each payload is zlib-compressed under blobs/<sha256 of its JSON>, so equal
+    # payloads are stored once and a digest always names the same content.
+
+    def __init__(self, root, level=6):
+
+        self.root = root
+        self.level = level
+
+        os.makedirs(root, exist_ok=True)
+
+    def blob_path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def put(self, payload):
+
+        data = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+
+        if not os.path.exists(path):
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            # Write then rename so concurrent readers never see a partial blob
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(zlib.compress(data, self.level))
+            os.replace(tmp, path)
+
+        return digest
+
+    def get(self, digest):
+
+        try:
+            with open(self.blob_path(digest), "rb") as f:
+                return json.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            return None
@@ -0,0 +1,79 @@
+import threading
+import json
+import os
+
+class Checkpoint:
+
+    # Append-only journal of completed page links and the vector ids upserted for
+    # them. Every record is flushed and fsynced as one line, so a crash loses at
+    # most the line being written, which is ignored when the journal is reloaded.
+
+    def __init__(self, path, resume=False):
+
+        self.path = path
+        self.lock = threading.Lock()
+
+        self.completed = set()
+        self.ids = set()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        if resume and os.path.exists(path):
+
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+
+                    self.completed.update(record["links"])
+                    self.ids.update(record["ids"])
+
+            self.file = open(path, "a", encoding="utf-8")
+
+            # Terminate a torn last line so the next record starts cleanly
+            if self.file.tell() > 0:
+                with open(path, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    torn = f.read(1) != b"\n"
+
+                if torn:
+                    self.file.write("\n")
+
+        else:
+            self.file = open(path, "w", encoding="utf-8")
+
+    def done(self, ln):
+
+        with self.lock:
+            return ln in self.completed
+
+    def complete(self, links, ids=()):
+
+        record = json.dumps({"links": list(links), "ids": list(ids)}, ensure_ascii=False)
+
+        with self.lock:
+
+            self.file.write(record + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+            self.completed.update(links)
+            self.ids.update(ids)
+
+    def clear(self):
+
+        with self.lock:
+
+            self.file.seek(0)
+            self.file.truncate()
+
+            self.completed.clear()
+            self.ids.clear()
+
+    def close(self):
+
+        with self.lock:
+            self.file.close()
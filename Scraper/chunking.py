@@ -0,0 +1,114 @@
+import ast
+
+# Splits sample code into embedding units. Top-level def/class blocks (with
+# their decorators) are kept whole where they fit, the statements between them
+# are grouped, and neighbouring units are merged up to max_lines. Units
+# longer than max_lines, and code that doesn't parse, fall back to line
+# windows. Every chunk after the first repeats up to `overlap` lines of the
+# code before it, so a chunk boundary never strips a statement of its context.
+# No chunk holds more than max_lines lines, overlap included.
+
+CHUNK_SEPARATOR = "#chunk-"
+
+# Part of the samples' manifest entries, bumped whenever the same code and
+# settings would be split differently
+CHUNKING_VERSION = 2
+
+def chunk_id(parent, i):
+    return f"{parent}{CHUNK_SEPARATOR}{i}"
+
+def parent_id(id):
+    return id.split(CHUNK_SEPARATOR, 1)[0]
+
+def windows(start, end, max_lines, overlap):
+
+    # [start, end) as line ranges of at most max_lines, advancing by max_lines - overlap.
+    # The last window is pulled back to end exactly at end, so a short tail
+    # shares more lines with the window before it instead of forming a chunk
+    # of its own or stretching that window past max_lines
+
+    step = max(1, max_lines - overlap)
+    ranges = []
+
+    while True:
+
+        if end - start <= max_lines:
+            ranges.append((start, end, False))
+            return ranges
+
+        ranges.append((start, start + max_lines, False))
+
+        start = min(start + step, end - max_lines)
+
+def units(tree, num_lines):
+
+    # Line ranges [start, end) of top-level def/class blocks and the code
+    # between them, 0-based, covering every line
+
+    spans = []
+    cursor = 0
+
+    for node in tree.body:
+
+        start = min([node.lineno] + [decorator.lineno for decorator in getattr(node, "decorator_list", [])]) - 1
+        end = node.end_lineno
+
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+
+            if start > cursor:
+                spans.append((cursor, start))
+
+            spans.append((start, end))
+            cursor = end
+
+    if cursor < num_lines:
+        spans.append((cursor, num_lines))
+
+    return spans
+
+def chunk_code(code, max_lines=60, overlap=5):
+
+    # [(start_line, end_line, text)], 1-based inclusive line numbers
+
+    lines = code.splitlines()
+
+    if not lines:
+        return []
+
+    try:
+        spans = units(ast.parse(code), len(lines))
+    except (SyntaxError, ValueError):
+        spans = [(0, len(lines))]
+
+    # (start, end, mergeable), pieces of a split unit are never merged again
+
+    ranges = []
+
+    for start, end in spans:
+
+        # Blank separators between blocks aren't worth a chunk of their own
+        if not any(line.strip() for line in lines[start:end]):
+            continue
+
+        if end - start > max_lines:
+            ranges.extend(windows(start, end, max_lines, overlap))
+        elif ranges and ranges[-1][2] and end - ranges[-1][0] <= max_lines:
+            ranges[-1] = (ranges[-1][0], end, True)
+        else:
+            ranges.append((start, end, True))
+
+    chunks = []
+
+    for i, (start, end, _) in enumerate(ranges):
+
+        # Windows already overlap each other, adjacent units get the overlap
+        # here, as much of it as max_lines leaves room for
+        if i > 0 and start >= ranges[i - 1][1]:
+            start = max(0, start - min(overlap, max_lines - (end - start)))
+
+        text = "\n".join(lines[start:end])
+
+        if text.strip():
+            chunks.append((start + 1, end, text))
+
+    return chunks
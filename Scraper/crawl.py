@@ -0,0 +1,59 @@
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import threading
+import time
+
+# Rate limiting
+
+class RateLimiter:
+
+    # Spaces requests to the same host at least 1 / rate seconds apart.
+    # A rate <= 0 disables limiting.
+
+    def __init__(self, rate):
+
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.next_slot = {}
+
+    def wait(self, url):
+
+        if self.rate <= 0:
+            return
+
+        host = urlsplit(url).netloc
+
+        with self.lock:
+
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+
+            self.next_slot[host] = slot + 1.0 / self.rate
+
+        delay = slot - time.monotonic()
+
+        if delay > 0:
+            time.sleep(delay)
+
+# Crawl
+
+def crawl(tasks, worker, concurrency=8):
+
+    # Runs worker(*task) for every task with at most `concurrency` in flight.
+    # Results are yielded lazily in task order, so the output is deterministic
+    # and an exception surfaces at the task that raised it.
+
+    if concurrency <= 1:
+
+        for task in tasks:
+            yield worker(*task)
+
+        return
+
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    try:
+        yield from executor.map(lambda task: worker(*task), tasks)
+    finally:
+        # Drop queued tasks if the consumer bails out early
+        executor.shutdown(cancel_futures=True)
@@ -0,0 +1,212 @@
+import numpy as np
+import threading
+import sqlite3
+import hashlib
+import re
+
+# Near-duplicate detection for extracted records. A record is reduced to its
+# normalised text, which is first matched exactly (sha256) and then through
+# MinHash signatures bucketed by LSH bands. Candidates sharing a band are only
+# accepted if their estimated Jaccard similarity reaches the threshold.
+# Signatures are persisted, so records indexed by earlier runs are still
+# matched when a run only revisits new or changed pages.
+
+MERSENNE = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+WORD = re.compile(r"\w+")
+
+def normalize(text, names=()):
+
+    # Lowercased words, with the given names (e.g. the owning class) replaced
+    # so sibling classes' members compare equal
+
+    for name in names:
+        text = re.sub(rf"\b{re.escape(name)}\b", "NAME", text)
+
+    return " ".join(WORD.findall(text.lower()))
+
+def shingles(text, k=5):
+
+    # Character k-grams, which keep short API descriptions with a changed word
+    # or two close, where word shingles would mostly differ
+
+    if len(text) <= k:
+        return {text}
+
+    return {text[i:i+k] for i in range(len(text) - k + 1)}
+
+class MinHash:
+
+    def __init__(self, num_perm=128, seed=1):
+
+        rng = np.random.default_rng(seed)
+
+        self.a = rng.integers(1, int(MERSENNE), num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, int(MERSENNE), num_perm, dtype=np.uint64)
+
+    def signature(self, tokens):
+
+        hashes = np.array([int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest(), "little") for token in tokens], dtype=np.uint64)
+
+        # Universal hashing of every token under every permutation, min per permutation
+        with np.errstate(over="ignore"):
+            permuted = np.bitwise_and((np.outer(hashes, self.a) + self.b) % MERSENNE, MAX_HASH)
+
+        return permuted.min(axis=0).astype(np.uint32)
+
+class Deduper:
+
+    # canonical(namespace, id, text) returns the id of an earlier record that
+    # text duplicates, or None after registering id as a canonical record, and
+    # whether id was registered before with different text
+
+    def __init__(self, path, threshold=0.85, num_perm=128, bands=32):
+
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+
+        self.minhash = MinHash(num_perm)
+        self.lock = threading.Lock()
+
+        self.db = sqlite3.connect(path, check_same_thread=False)
+
+        # Signatures can be recomputed, losing the last few to a crash only
+        # costs some missed duplicates, so commits don't wait for the disk
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS signatures (
+                namespace TEXT NOT NULL,
+                id TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                PRIMARY KEY (namespace, id)
+            )
+        """)
+        self.db.commit()
+
+        self.signatures = {}
+        self.buckets = {}
+        self.hashes = {}
+
+        for namespace, id, digest, signature in self.db.execute("SELECT namespace, id, hash, signature FROM signatures ORDER BY id"):
+            self.index(namespace, id, digest, np.frombuffer(signature, dtype=np.uint32))
+
+        self.exact = 0
+        self.near = 0
+
+    def band_keys(self, signature):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def index(self, namespace, id, digest, signature):
+
+        self.signatures.setdefault(namespace, {})[id] = (digest, signature)
+        self.hashes.setdefault(namespace, {}).setdefault(digest, id)
+
+        buckets = self.buckets.setdefault(namespace, {})
+
+        for key in self.band_keys(signature):
+            buckets.setdefault(key, set()).add(id)
+
+    def unindex(self, namespace, id):
+
+        # Returns the digest id was indexed with, or None
+
+        entry = self.signatures.get(namespace, {}).pop(id, None)
+
+        if entry is None:
+            return None
+
+        digest, signature = entry
+
+        hashes = self.hashes[namespace]
+
+        if hashes.get(digest) == id:
+            del hashes[digest]
+
+            # Another record with the same content takes over the hash
+            for other, (other_digest, _) in sorted(self.signatures[namespace].items()):
+                if other_digest == digest:
+                    hashes[digest] = other
+                    break
+
+        buckets = self.buckets[namespace]
+
+        for key in self.band_keys(signature):
+            buckets.get(key, set()).discard(id)
+
+        return digest
+
+    def canonical(self, namespace, id, text):
+
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        signature = self.minhash.signature(shingles(text))
+
+        with self.lock:
+
+            # A record never duplicates its own previous version
+            previous = self.unindex(namespace, id)
+
+            if previous is not None:
+                self.db.execute("DELETE FROM signatures WHERE namespace = ? AND id = ?", (namespace, id))
+                self.db.commit()
+
+            changed = previous is not None and previous != digest
+
+            if digest in self.hashes.get(namespace, {}):
+                self.exact += 1
+                return self.hashes[namespace][digest], changed
+
+            candidates = set()
+            buckets = self.buckets.get(namespace, {})
+
+            for key in self.band_keys(signature):
+                candidates.update(buckets.get(key, ()))
+
+            if candidates:
+
+                candidates = sorted(candidates)
+                signatures = self.signatures[namespace]
+
+                # Estimated Jaccard similarity to every candidate at once
+                similarity = (np.stack([signatures[candidate][1] for candidate in candidates]) == signature).mean(axis=1)
+                i = int(np.argmax(similarity))
+
+                best = candidates[i] if similarity[i] >= self.threshold else None
+
+            else:
+                best = None
+
+            if best is not None:
+                self.near += 1
+                return best, changed
+
+            self.db.execute("INSERT INTO signatures (namespace, id, hash, signature) VALUES (?, ?, ?, ?)", (namespace, id, digest, signature.tobytes()))
+            self.db.commit()
+
+            self.index(namespace, id, digest, signature)
+
+            return None, changed
+
+    def remove(self, namespace, ids):
+
+        with self.lock:
+
+            for id in ids:
+                self.unindex(namespace, id)
+
+            self.db.executemany("DELETE FROM signatures WHERE namespace = ? AND id = ?", [(namespace, id) for id in ids])
+            self.db.commit()
+
+    def stats(self):
+
+        with self.lock:
+            return {"exact": self.exact, "near": self.near, "canonical": sum(len(signatures) for signatures in self.signatures.values())}
+
+    def close(self):
+
+        with self.lock:
+            self.db.close()
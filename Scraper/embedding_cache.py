@@ -0,0 +1,154 @@
+import numpy as np
+import threading
+import sqlite3
+import hashlib
+import os
+import re
+
+class EmbeddingCache:
+
+    # Local store of embeddings keyed by (model, sha256(text)). Vectors for each
+    # model are appended to a flat float32 file read back through a memmap, the
+    # SQLite index maps keys to row numbers.
+
+    def __init__(self, root):
+
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.maps = {}
+
+        self.hits = 0
+        self.misses = 0
+
+        self.db = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                PRIMARY KEY (model, hash)
+            )
+        """)
+        self.db.execute("CREATE TABLE IF NOT EXISTS models (model TEXT PRIMARY KEY, dim INTEGER NOT NULL)")
+        self.db.commit()
+
+    @staticmethod
+    def key(text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def vectors_path(self, model):
+        return os.path.join(self.root, re.sub(r"[^\w.-]", "_", model) + ".f32")
+
+    def get_dim(self, model):
+
+        row = self.db.execute("SELECT dim FROM models WHERE model = ?", (model,)).fetchone()
+
+        return None if row is None else row[0]
+
+    def get_map(self, model, dim):
+
+        # Reopen the memmap only when rows were appended since it was mapped
+
+        path = self.vectors_path(model)
+        rows = os.path.getsize(path) // (dim * 4) if os.path.exists(path) else 0
+
+        cached = self.maps.get(model)
+
+        if cached is None or cached.shape[0] != rows:
+            cached = np.memmap(path, dtype=np.float32, mode="r", shape=(rows, dim)) if rows else np.zeros((0, dim), dtype=np.float32)
+            self.maps[model] = cached
+
+        return cached
+
+    def get_many(self, model, texts):
+
+        keys = [self.key(text) for text in texts]
+
+        with self.lock:
+
+            dim = self.get_dim(model)
+
+            if dim is None:
+                self.misses += len(texts)
+                return [None] * len(texts)
+
+            rows = {}
+
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i+500]
+                placeholders = ",".join("?" * len(chunk))
+                query = f"SELECT hash, row FROM embeddings WHERE model = ? AND hash IN ({placeholders})"
+                rows.update(self.db.execute(query, (model, *chunk)).fetchall())
+
+            vectors = self.get_map(model, dim)
+
+            found = []
+
+            for key in keys:
+
+                row = rows.get(key)
+
+                if row is None or row >= vectors.shape[0]:
+                    found.append(None)
+                else:
+                    found.append(np.array(vectors[row]))
+
+            hits = sum(1 for vector in found if vector is not None)
+            self.hits += hits
+            self.misses += len(found) - hits
+
+        return found
+
+    def put_many(self, model, texts, embeddings):
+
+        if not texts:
+            return
+
+        values = np.asarray(embeddings, dtype=np.float32)
+        dim = values.shape[1]
+
+        with self.lock:
+
+            known_dim = self.get_dim(model)
+
+            if known_dim is None:
+                self.db.execute("INSERT INTO models (model, dim) VALUES (?, ?)", (model, dim))
+            elif known_dim != dim:
+                raise ValueError(f"{model} embeddings have {known_dim} dims, got {dim}")
+
+            path = self.vectors_path(model)
+            row_bytes = dim * 4
+
+            # The file size is the source of truth for the next row, a torn
+            # write from an interrupted run is cut back to the last full row
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+
+            with open(path, "ab") as f:
+                f.truncate(size - size % row_bytes)
+                start = (size - size % row_bytes) // row_bytes
+                f.write(values.tobytes())
+
+            self.db.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, row) VALUES (?, ?, ?)",
+                [(model, self.key(text), start + i) for i, text in enumerate(texts)],
+            )
+            self.db.commit()
+
+    def stats(self):
+
+        with self.lock:
+            entries = self.db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+        }
+
+    def close(self):
+
+        with self.lock:
+            self.maps.clear()
+            self.db.close()
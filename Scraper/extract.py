@@ -0,0 +1,233 @@
+from dataclasses import dataclass
+from bs4 import NavigableString, Tag
+from parsing import make_soup
+import traceback
+
+# Page extractors. These only turn HTML into plain records and have no side
+# effects, so they can run in worker processes (see extract_chunk).
+
+@dataclass
+class SampleRecord:
+    description: str
+    code: str | None
+
+@dataclass
+class ObjectRecord:
+    description: str
+    methods_table: list
+    properties_table: list
+    samples_table: list
+
+@dataclass
+class ObjectAttrRecord:
+    name: str
+    description: str
+    property_type: str
+    method_parameters: list
+    method_return_values: list
+    example_usage: str
+
+# Sections
+
+@dataclass
+class Section:
+    heading: Tag
+    elements: list
+
+    def text(self):
+
+        parts = []
+
+        for el in self.elements:
+
+            if isinstance(el, NavigableString):
+                text = el.strip()
+            else:
+                text = el.get_text(strip=True)
+
+            if text:
+                parts.append(text)
+
+        return " ".join(parts).strip()
+
+    def table(self):
+
+        for el in self.elements:
+
+            if isinstance(el, Tag):
+
+                table = el if el.name == "table" else el.find("table")
+
+                if table:
+                    return table
+
+        # A section without a table of its own falls through to the next table
+        # in the document, as h2.find_next("table") always has
+        return self.heading.find_next("table")
+
+def extract_sections(soup):
+
+    # One scan for the h2.api headings, then one walk over each heading's
+    # siblings up to the next h2.api, bucketing them under that heading. Text and
+    # tables are only built for the sections an extractor actually reads.
+
+    sections = {}
+
+    for h2 in soup.find_all("h2", class_="api"):
+
+        title = h2.string.strip() if h2.string else None
+
+        # Only the first heading with a given title counts, like soup.find did
+        if title is None or title in sections:
+            continue
+
+        elements = []
+
+        for el in h2.next_siblings:
+
+            if isinstance(el, Tag) and el.name == "h2" and "api" in (el.get("class") or []):
+                break
+
+            if isinstance(el, (NavigableString, Tag)):
+                elements.append(el)
+
+        sections[title] = Section(h2, elements)
+
+    return sections
+
+def find_section(sections, titles):
+    return next((sections[title] for title in titles if title in sections), None)
+
+def section_text(sections, *titles, default=""):
+
+    section = find_section(sections, titles)
+
+    return default if section is None else section.text()
+
+def section_table(sections, num_headers, *titles):
+
+    section = find_section(sections, titles)
+
+    if section is None:
+        return []
+
+    table = section.table()
+
+    if not table:
+        return []
+
+    rows = table.find_all("tr")
+
+    extracted = []
+    for row in rows[1:]:
+
+        values = row.find_all(["td"])
+
+        if values[0].get_text(strip=True) in ["classType", "isValid", "objectType"]:
+            continue
+
+        vals = [values[i].get_text(strip=True) for i in range(num_headers)]
+        extracted.append(",".join(vals))
+
+    return extracted
+
+# Samples
+
+def get_code(soup):
+
+    code = soup.find("pre", id="Python_code")
+
+    if code is None:
+        return None
+
+    for tag in code.find_all(["span"]):
+        tag.unwrap()
+
+    formatted_code = code.get_text("")
+
+    return formatted_code
+
+def extract_sample(html, soup=None):
+
+    soup = make_soup(html) if soup is None else soup
+    sections = extract_sections(soup)
+
+    return SampleRecord(section_text(sections, "Description"), get_code(soup))
+
+# Objects
+
+def extract_object(html, soup=None):
+
+    soup = make_soup(html) if soup is None else soup
+    sections = extract_sections(soup)
+
+    return ObjectRecord(
+        section_text(sections, "Description"),
+        section_table(sections, 2, "Methods"),
+        section_table(sections, 2, "Properties"),
+        section_table(sections, 1, "Samples"),
+    )
+
+# Object attributes
+
+def get_name(soup):
+
+    h1_tag = soup.find("h1", class_="api")
+    if not h1_tag:
+        return ""
+
+    name = h1_tag.get_text(strip=True).split(" ")[0]
+    return name
+
+def get_syntax(soup):
+
+    div = soup.find("div", id="Python")
+
+    if not div:
+        return ""
+
+    code = div.find_next("pre")
+
+    if not code:
+        return ""
+
+    for tag in code.find_all(["span", "b", "em"]):
+        tag.unwrap()
+
+    for br in code.find_all("br"):
+        br.replace_with("\n")
+
+    formatted_code = code.get_text("")
+
+    return formatted_code
+
+def extract_object_attr(html, soup=None):
+
+    soup = make_soup(html) if soup is None else soup
+    sections = extract_sections(soup)
+
+    return ObjectAttrRecord(
+        get_name(soup),
+        section_text(sections, "Description"),
+        section_text(sections, "Property Value", default="N/A"),
+        section_table(sections, 3, "Parameters"),
+        section_table(sections, 2, "Return Value", "Return Values"),
+        get_syntax(soup),
+    )
+
+# Chunked dispatch
+
+def extract_chunk(extract, pages):
+
+    # One inter-process round trip per chunk of pages instead of per page. A page
+    # that fails comes back as (None, traceback) so it doesn't sink its chunk.
+
+    results = []
+
+    for page in pages:
+        try:
+            results.append((extract(page), None))
+        except Exception:
+            results.append((None, traceback.format_exc(limit=3)))
+
+    return results
@@ -0,0 +1,157 @@
+from requests.adapters import HTTPAdapter
+from page_cache import CacheMiss
+import threading
+import requests
+import random
+import time
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class Fetcher:
+
+    # Shared HTTP layer for the crawl: one pooled keep-alive session, per-request
+    # timeouts, jittered exponential backoff on 429/5xx and connection errors,
+    # plus per-URL retry and latency bookkeeping. With a PageCache, cached pages
+    # are revalidated with conditional GETs, or served as-is when offline.
+
+    def __init__(self, pool_size=8, timeout=(5, 30), max_retries=5, backoff=0.5, max_backoff=30.0, rate_limiter=None, cache=None, offline=False):
+
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.offline = offline
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.lock = threading.Lock()
+        self.stats = {}
+
+    def get_delay(self, attempt, rsp=None):
+
+        # Honour Retry-After when the server sends seconds, else full jitter
+
+        if rsp is not None:
+
+            retry_after = rsp.headers.get("Retry-After", "")
+
+            if retry_after.isdigit():
+                return min(float(retry_after), self.max_backoff)
+
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def record(self, url, retries, latency, status, cache="miss"):
+
+        with self.lock:
+            self.stats[url] = {
+                "retries": retries,
+                "latency": latency,
+                "status": status,
+                "cache": cache,
+            }
+
+    def from_cache(self, url, entry):
+
+        rsp = requests.Response()
+        rsp.url = url
+        rsp.status_code = 200
+        rsp._content = entry["body"]
+        rsp.encoding = entry["encoding"]
+
+        return rsp
+
+    def get(self, url, **kwargs):
+
+        kwargs.setdefault("timeout", self.timeout)
+
+        start = time.perf_counter()
+        attempt = 0
+
+        entry = self.cache.get(url) if self.cache is not None else None
+
+        if self.offline:
+
+            if entry is None:
+                raise CacheMiss(url)
+
+            self.record(url, 0, time.perf_counter() - start, 200, cache="hit")
+
+            return self.from_cache(url, entry)
+
+        if entry is not None:
+
+            headers = dict(kwargs.pop("headers", None) or {})
+
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+            kwargs["headers"] = headers
+
+        while True:
+
+            if self.rate_limiter is not None:
+                self.rate_limiter.wait(url)
+
+            try:
+                rsp = self.session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+
+                if attempt >= self.max_retries:
+                    self.record(url, attempt, time.perf_counter() - start, None)
+                    raise
+
+                time.sleep(self.get_delay(attempt))
+                attempt += 1
+                continue
+
+            if rsp.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                time.sleep(self.get_delay(attempt, rsp))
+                attempt += 1
+                continue
+
+            if rsp.status_code == 304 and entry is not None:
+
+                self.cache.touch(url)
+                self.record(url, attempt, time.perf_counter() - start, 304, cache="revalidated")
+
+                return self.from_cache(url, entry)
+
+            self.record(url, attempt, time.perf_counter() - start, rsp.status_code)
+
+            rsp.raise_for_status()
+
+            if self.cache is not None:
+                self.cache.put(url, rsp.content, rsp.headers.get("ETag"), rsp.headers.get("Last-Modified"), rsp.encoding)
+
+            return rsp
+
+    def summary(self):
+
+        with self.lock:
+            stats = list(self.stats.values())
+
+        if not stats:
+            return {"pages": 0, "retries": 0, "retried_pages": 0, "cache_hits": 0, "mean_latency": 0.0, "p95_latency": 0.0}
+
+        latencies = sorted(s["latency"] for s in stats)
+
+        return {
+            "pages": len(stats),
+            "retries": sum(s["retries"] for s in stats),
+            "retried_pages": sum(1 for s in stats if s["retries"]),
+            "cache_hits": sum(1 for s in stats if s["cache"] != "miss"),
+            "mean_latency": sum(latencies) / len(latencies),
+            "p95_latency": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))],
+        }
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,225 @@
+from collections import Counter, defaultdict
+import threading
+import sqlite3
+import math
+import re
+
+# Metadata fields indexed for keyword search, identifiers and code rather than
+# the generated prose the embeddings are built from
+
+LEXICAL_FIELDS = ["sampleId", "className", "attributeName", "methodParams", "codeSample"]
+
+IDENTIFIER = re.compile(r"[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*")
+WORD = re.compile(r"[A-Za-z0-9]+")
+CAMEL = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+
+def tokenize(text):
+
+    # Each word plus its camelCase parts: addByCenterRadius -> addbycenterradius,
+    # add, by, center, radius
+
+    tokens = []
+
+    for word in WORD.findall(text):
+
+        tokens.append(word.lower())
+        parts = CAMEL.findall(word)
+
+        if len(parts) > 1:
+            tokens.extend(part.lower() for part in parts)
+
+    return tokens
+
+def is_identifier(name):
+
+    # Dotted names and CamelCase words, so an ordinary "sketch" in a question
+    # isn't taken for the Sketch class
+    return "." in name or any(c.isupper() for c in name[1:])
+
+def identifiers(text):
+
+    # Candidate API names in a query, adsk.fusion.ExtrudeFeatures.createInput
+    # is also tried as ExtrudeFeatures.createInput and createInput
+
+    names = []
+
+    for match in IDENTIFIER.findall(text):
+
+        parts = match.split(".")
+
+        for i in range(len(parts)):
+
+            name = ".".join(parts[i:])
+
+            if is_identifier(name) and name not in names:
+                names.append(name)
+
+    return names
+
+class Postings:
+
+    # BM25 over the documents of one namespace, built in memory from the store
+
+    def __init__(self, documents, k1=1.2, b=0.75):
+
+        self.k1 = k1
+        self.b = b
+
+        self.ids = []
+        self.lengths = []
+        self.postings = defaultdict(list)
+
+        for id, text in documents:
+
+            counts = Counter(tokenize(text))
+
+            for term, count in counts.items():
+                self.postings[term].append((len(self.ids), count))
+
+            self.ids.append(id)
+            self.lengths.append(sum(counts.values()))
+
+        self.average = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+
+    def search(self, text, top_k=10):
+
+        scores = defaultdict(float)
+        n = len(self.ids)
+
+        for term in set(tokenize(text)):
+
+            postings = self.postings.get(term)
+
+            if not postings:
+                continue
+
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+
+            for doc, count in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc] / self.average)
+                scores[doc] += idf * count * (self.k1 + 1) / (count + norm)
+
+        best = sorted(scores.items(), key=lambda item: -item[1])[:top_k]
+
+        return [(self.ids[doc], score) for doc, score in best]
+
+class LexicalIndex:
+
+    # Keyword side of retrieval. Documents are kept in SQLite and written as
+    # vectors are upserted, the BM25 postings and the exact-name dictionary are
+    # rebuilt in memory on first use after a change.
+
+    def __init__(self, path):
+
+        self.lock = threading.Lock()
+
+        self.postings = {}
+        self.names = None
+
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                namespace TEXT NOT NULL,
+                id TEXT NOT NULL,
+                text TEXT NOT NULL,
+                PRIMARY KEY (namespace, id)
+            )
+        """)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS aliases (
+                namespace TEXT NOT NULL,
+                alias TEXT NOT NULL,
+                id TEXT NOT NULL,
+                PRIMARY KEY (namespace, alias)
+            )
+        """)
+        self.db.commit()
+
+    @staticmethod
+    def document(id, metadata):
+        return "\n".join([id] + [str(metadata[field]) for field in LEXICAL_FIELDS if metadata.get(field)])
+
+    def add(self, vectors, namespace):
+
+        # Takes the vectors as upserted ({id, values, metadata})
+
+        with self.lock:
+
+            self.db.executemany(
+                "INSERT OR REPLACE INTO documents (namespace, id, text) VALUES (?, ?, ?)",
+                [(namespace, vector["id"], self.document(vector["id"], vector.get("metadata") or {})) for vector in vectors],
+            )
+            self.db.executemany("DELETE FROM aliases WHERE namespace = ? AND alias = ?", [(namespace, vector["id"]) for vector in vectors])
+            self.db.commit()
+
+            self.postings.pop(namespace, None)
+            self.names = None
+
+    def add_alias(self, alias, id, namespace):
+
+        # alias is answered with id's vector, e.g. an inherited member that is a
+        # duplicate of its sibling's
+
+        with self.lock:
+
+            self.db.execute("DELETE FROM documents WHERE namespace = ? AND id = ?", (namespace, alias))
+            self.db.execute("INSERT OR REPLACE INTO aliases (namespace, alias, id) VALUES (?, ?, ?)", (namespace, alias, id))
+            self.db.commit()
+
+            self.postings.pop(namespace, None)
+            self.names = None
+
+    def remove(self, ids, namespace):
+
+        with self.lock:
+
+            self.db.executemany("DELETE FROM documents WHERE namespace = ? AND id = ?", [(namespace, id) for id in ids])
+            self.db.executemany("DELETE FROM aliases WHERE namespace = ? AND (alias = ? OR id = ?)", [(namespace, id, id) for id in ids])
+            self.db.commit()
+
+            self.postings.pop(namespace, None)
+            self.names = None
+
+    def lookup(self, text, namespaces=None):
+
+        # Exact API names in the query -> [(namespace, id)], a dictionary probe
+        # per candidate name
+
+        with self.lock:
+
+            if self.names is None:
+
+                self.names = defaultdict(list)
+
+                for namespace, id in self.db.execute("SELECT namespace, id FROM documents"):
+                    self.names[id].append((namespace, id))
+
+                for namespace, alias, id in self.db.execute("SELECT namespace, alias, id FROM aliases"):
+                    self.names[alias].append((namespace, id))
+
+            names = self.names
+
+        hits = []
+
+        for name in identifiers(text):
+            for namespace, id in names.get(name, []):
+                if (namespaces is None or namespace in namespaces) and (namespace, id) not in hits:
+                    hits.append((namespace, id))
+
+        return hits
+
+    def search(self, text, namespace, top_k=10):
+
+        with self.lock:
+
+            if namespace not in self.postings:
+                self.postings[namespace] = Postings(self.db.execute("SELECT id, text FROM documents WHERE namespace = ?", (namespace,)).fetchall())
+
+            postings = self.postings[namespace]
+
+        return postings.search(text, top_k)
+
+    def close(self):
+
+        with self.lock:
+            self.db.close()
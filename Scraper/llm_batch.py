@@ -0,0 +1,149 @@
+from openai import AsyncOpenAI
+import asyncio
+import json
+import time
+import os
+
+# Bulk chat completions outside the per-item pipeline. Requests are
+# (custom_id, body) pairs, body being the keyword arguments of
+# chat.completions.create, and both runners return {custom_id: content}.
+#
+# run_batch goes through the provider's Batch API: one JSONL upload, one batch
+# job, polled until it ends. Its state is saved next to the JSONL file, so an
+# interrupted run picks the same job up again instead of paying twice.
+# run_async sends the requests directly, at most `concurrency` at a time.
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_DONE = {"completed", "failed", "expired", "cancelled"}
+
+def write_batch_file(path, requests):
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    with open(path, "w", encoding="utf-8") as f:
+        for custom_id, body in requests:
+            f.write(json.dumps({"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body}, ensure_ascii=False) + "\n")
+
+def load_state(path):
+
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_state(path, state):
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp, path)
+
+def parse_results(text):
+
+    results, errors = {}, {}
+
+    for line in text.splitlines():
+
+        if not line.strip():
+            continue
+
+        record = json.loads(line)
+        response = record.get("response") or {}
+
+        if record.get("error") or response.get("status_code", 200) != 200:
+            errors[record["custom_id"]] = record.get("error") or response.get("body")
+            continue
+
+        results[record["custom_id"]] = response["body"]["choices"][0]["message"]["content"].strip()
+
+    return results, errors
+
+def run_batch(client, requests, path, poll_interval=30, timeout=None):
+
+    state_path = f"{path}.state.json"
+    state = load_state(state_path)
+
+    ids = sorted(custom_id for custom_id, _ in requests)
+
+    # A saved job is only reused for exactly the same requests
+    if state is None or state["ids"] != ids:
+
+        write_batch_file(path, requests)
+
+        with open(path, "rb") as f:
+            upload = client.files.create(file=f, purpose="batch")
+
+        batch = client.batches.create(input_file_id=upload.id, endpoint=BATCH_ENDPOINT, completion_window="24h")
+
+        state = {"batch_id": batch.id, "input_file_id": upload.id, "ids": ids}
+        save_state(state_path, state)
+
+        print(f"[BATCH] submitted {len(requests)} requests as {batch.id}")
+
+    else:
+        print(f"[BATCH] resuming {state['batch_id']}")
+
+    start = time.monotonic()
+
+    while True:
+
+        batch = client.batches.retrieve(state["batch_id"])
+
+        if batch.status in BATCH_DONE:
+            break
+
+        if timeout is not None and time.monotonic() - start > timeout:
+            raise TimeoutError(f"batch {batch.id} still {batch.status} after {timeout}s")
+
+        counts = batch.request_counts
+        print(f"[BATCH] {batch.id} {batch.status}" + (f" {counts.completed}/{counts.total}" if counts else ""))
+
+        time.sleep(poll_interval)
+
+    results, errors = {}, {}
+
+    if batch.output_file_id:
+        results, errors = parse_results(client.files.content(batch.output_file_id).text)
+
+    if batch.error_file_id:
+        errors.update(parse_results(client.files.content(batch.error_file_id).text)[1])
+
+    print(f"[BATCH] {batch.id} {batch.status}: {len(results)} results, {len(errors)} errors")
+
+    # Finished either way, the next run submits whatever is still missing
+    os.remove(state_path)
+
+    return results
+
+async def complete_all(client, requests, concurrency):
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def complete(custom_id, body):
+
+        async with semaphore:
+
+            try:
+                response = await client.chat.completions.create(**body)
+            except Exception as e:
+                print(f"[ASYNC] {custom_id} failed: {e}")
+                return custom_id, None
+
+        return custom_id, response.choices[0].message.content.strip()
+
+    results = await asyncio.gather(*(complete(custom_id, body) for custom_id, body in requests))
+
+    return {custom_id: content for custom_id, content in results if content is not None}
+
+def run_async(requests, concurrency=16, client=None):
+
+    async def main():
+
+        if client is not None:
+            return await complete_all(client, requests, concurrency)
+
+        async with AsyncOpenAI() as async_client:
+            return await complete_all(async_client, requests, concurrency)
+
+    return asyncio.run(main())
@@ -0,0 +1,100 @@
+import threading
+import sqlite3
+import hashlib
+import time
+import json
+import os
+
+class LLMCache:
+
+    # Persistent memo of LLM outputs keyed by a hash of every input that affects
+    # them. Total stored bytes are bounded, least recently used entries go first.
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024):
+
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS completions_last_used ON completions (last_used)")
+        self.db.commit()
+
+    @staticmethod
+    def key(*parts):
+        return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+
+        with self.lock:
+
+            row = self.db.execute("SELECT value FROM completions WHERE key = ?", (key,)).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+
+            self.db.execute("UPDATE completions SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.db.commit()
+
+            return row[0]
+
+    def put(self, key, value):
+
+        size = len(value.encode("utf-8"))
+
+        with self.lock:
+
+            self.db.execute(
+                "INSERT OR REPLACE INTO completions (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time()),
+            )
+
+            total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+
+            while total > self.max_bytes:
+
+                oldest = self.db.execute("SELECT key, size FROM completions ORDER BY last_used LIMIT 1").fetchone()
+
+                if oldest is None or oldest[0] == key:
+                    break
+
+                self.db.execute("DELETE FROM completions WHERE key = ?", (oldest[0],))
+
+                total -= oldest[1]
+                self.evictions += 1
+
+            self.db.commit()
+
+    def stats(self):
+
+        with self.lock:
+            entries, size = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions").fetchone()
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def close(self):
+
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,136 @@
+import threading
+import hashlib
+import json
+import os
+
+def content_hash(pairs):
+    return hashlib.sha256(json.dumps(pairs, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+class Manifest:
+
+    # Records, per namespace and vector id, the hash of the extracted content and
+    # the model(s) its vector was built with. Entries only become current once the
+    # vector is upserted (stage -> commit), and ids not seen during a full crawl
+    # are reported as stale so they can be deleted from the index.
+
+    def __init__(self, path):
+
+        self.path = path
+        self.lock = threading.Lock()
+
+        self.entries = {}
+        self.pending = {}
+        self.seen = {}
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def check(self, namespace, id, digest, model):
+
+        # Marks id as seen and returns True if it must be (re)generated
+
+        with self.lock:
+
+            self.seen.setdefault(namespace, set()).add(id)
+
+            entry = self.entries.get(namespace, {}).get(id)
+
+            if entry is not None and entry["hash"] == digest and entry["model"] == model:
+                return False
+
+            self.pending.setdefault(namespace, {})[id] = {"hash": digest, "model": model}
+
+            return True
+
+    def commit(self, namespace, ids):
+
+        with self.lock:
+
+            pending = self.pending.get(namespace, {})
+            entries = self.entries.setdefault(namespace, {})
+
+            ids = set(ids)
+
+            # Aliases become current together with the vector they point at
+            for id, entry in list(pending.items()):
+                if id in ids or entry.get("alias_of") in ids:
+                    entries[id] = pending.pop(id)
+
+        self.save()
+
+    def alias(self, namespace, id, canonical):
+
+        # Records a staged entry as a duplicate served by canonical's vector.
+        # Returns True if id had a vector of its own before, which is now redundant
+
+        with self.lock:
+
+            previous = self.entries.get(namespace, {}).get(id)
+            pending = self.pending[namespace]
+
+            pending[id]["alias_of"] = canonical
+
+            # canonical is already indexed and unchanged, nothing to wait for
+            if canonical not in pending and canonical in self.entries.get(namespace, {}):
+                self.entries[namespace][id] = pending.pop(id)
+                commit = True
+            else:
+                commit = False
+
+        if commit:
+            self.save()
+
+        return previous is not None and "alias_of" not in previous
+
+    def aliases_of(self, namespace, ids):
+
+        with self.lock:
+            ids = set(ids)
+            return sorted(id for id, entry in self.entries.get(namespace, {}).items() if entry.get("alias_of") in ids)
+
+    def set_children(self, namespace, id, children):
+
+        # Records the child vector ids (e.g. code chunks) of a staged entry and
+        # returns the children it had before that are no longer produced
+
+        with self.lock:
+
+            previous = self.entries.get(namespace, {}).get(id, {}).get("children", [])
+            self.pending[namespace][id]["children"] = list(children)
+
+            return sorted(set(previous) - set(children))
+
+    def children_of(self, namespace, ids):
+
+        with self.lock:
+            entries = self.entries.get(namespace, {})
+            return [child for id in ids for child in entries.get(id, {}).get("children", [])]
+
+    def stale_ids(self, namespace):
+
+        with self.lock:
+            seen = self.seen.get(namespace, set())
+            return sorted(id for id in self.entries.get(namespace, {}) if id not in seen)
+
+    def remove(self, namespace, ids):
+
+        with self.lock:
+
+            entries = self.entries.get(namespace, {})
+
+            for id in ids:
+                entries.pop(id, None)
+
+        self.save()
+
+    def save(self):
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        with self.lock:
+
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, indent=1, sort_keys=True, ensure_ascii=False)
+            os.replace(tmp, self.path)
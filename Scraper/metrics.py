@@ -0,0 +1,135 @@
+from contextlib import contextmanager
+import threading
+import json
+import time
+import os
+
+class Metrics:
+
+    # Run-wide instrumentation shared by all pipeline threads. Timers accumulate
+    # busy time per stage (summed over threads, so a stage with 8 workers can
+    # exceed the wall time), counters accumulate named totals with optional
+    # labels. Both are exported as Prometheus text or JSON at the end of a run.
+
+    def __init__(self, prefix="scraper"):
+
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.start = time.time()
+
+        self.timers = {}
+        self.counters = {}
+
+    @contextmanager
+    def timer(self, stage):
+
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def observe(self, stage, seconds):
+
+        with self.lock:
+
+            timer = self.timers.setdefault(stage, {"calls": 0, "seconds": 0.0, "max": 0.0})
+
+            timer["calls"] += 1
+            timer["seconds"] += seconds
+            timer["max"] = max(timer["max"], seconds)
+
+    def count(self, name, value=1, **labels):
+
+        key = (name, tuple(sorted(labels.items())))
+
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def snapshot(self):
+
+        with self.lock:
+
+            return {
+                "started": self.start,
+                "elapsed": time.time() - self.start,
+                "stages": {stage: dict(timer) for stage, timer in self.timers.items()},
+                "counters": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in sorted(self.counters.items())],
+            }
+
+    def prometheus(self):
+
+        snapshot = self.snapshot()
+        lines = []
+
+        def labels(pairs):
+            return "{" + ",".join(f'{key}="{value}"' for key, value in pairs.items()) + "}" if pairs else ""
+
+        lines.append(f"# TYPE {self.prefix}_run_seconds gauge")
+        lines.append(f"{self.prefix}_run_seconds {snapshot['elapsed']:.6f}")
+
+        for metric, field, kind in [("stage_seconds_total", "seconds", "counter"), ("stage_calls_total", "calls", "counter"), ("stage_max_seconds", "max", "gauge")]:
+
+            lines.append(f"# TYPE {self.prefix}_{metric} {kind}")
+
+            for stage, timer in sorted(snapshot["stages"].items()):
+                lines.append(f"{self.prefix}_{metric}{labels({'stage': stage})} {timer[field]}")
+
+        names = []
+
+        for counter in snapshot["counters"]:
+
+            if counter["name"] not in names:
+                names.append(counter["name"])
+                lines.append(f"# TYPE {self.prefix}_{counter['name']}_total counter")
+
+            lines.append(f"{self.prefix}_{counter['name']}_total{labels(counter['labels'])} {counter['value']}")
+
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+
+        # Prometheus text format for .prom/.txt files (node_exporter's textfile
+        # collector picks these up), JSON otherwise
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        if path.endswith((".prom", ".txt")):
+            data = self.prometheus()
+        else:
+            data = json.dumps(self.snapshot(), indent=1)
+
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def summary(self):
+
+        snapshot = self.snapshot()
+        elapsed = snapshot["elapsed"]
+
+        # busy/run over 100% means the stage kept several workers busy at once
+        lines = [f"{'stage':<12}{'calls':>8}{'busy s':>10}{'mean ms':>10}{'max ms':>10}{'busy/run':>10}"]
+
+        for stage, timer in sorted(snapshot["stages"].items(), key=lambda item: -item[1]["seconds"]):
+
+            mean = timer["seconds"] / timer["calls"] if timer["calls"] else 0.0
+
+            lines.append(f"{stage:<12}{timer['calls']:>8}{timer['seconds']:>10.2f}{mean * 1e3:>10.1f}{timer['max'] * 1e3:>10.1f}{timer['seconds'] / elapsed:>10.0%}")
+
+        lines.append("")
+
+        for counter in snapshot["counters"]:
+
+            if not counter["value"]:
+                continue
+
+            name = counter["name"] + "".join(f" {key}={value}" for key, value in counter["labels"].items())
+
+            lines.append(f"{name:<64}{counter['value']:>14,}")
+
+        lines.append(f"{'run seconds':<64}{elapsed:>14.1f}")
+
+        return "\n".join(lines)
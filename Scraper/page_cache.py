@@ -0,0 +1,96 @@
+import threading
+import sqlite3
+import hashlib
+import time
+import os
+
+class CacheMiss(LookupError):
+    pass
+
+class PageCache:
+
+    # Persistent page cache keyed by URL. Bodies are stored once per sha256 under
+    # blobs/, the SQLite index keeps the validators needed for conditional GETs.
+
+    def __init__(self, root):
+
+        self.root = root
+        self.blob_dir = os.path.join(root, "blobs")
+        os.makedirs(self.blob_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+
+        self.db = sqlite3.connect(os.path.join(root, "pages.sqlite"), check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                hash TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                encoding TEXT,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self.db.commit()
+
+    def blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def get(self, url):
+
+        with self.lock:
+            row = self.db.execute("SELECT hash, etag, last_modified, encoding FROM pages WHERE url = ?", (url,)).fetchone()
+
+        if row is None:
+            return None
+
+        digest, etag, last_modified, encoding = row
+
+        try:
+            with open(self.blob_path(digest), "rb") as f:
+                body = f.read()
+        except FileNotFoundError:
+            return None
+
+        return {
+            "hash": digest,
+            "etag": etag,
+            "last_modified": last_modified,
+            "encoding": encoding,
+            "body": body,
+        }
+
+    def put(self, url, body, etag=None, last_modified=None, encoding=None):
+
+        digest = hashlib.sha256(body).hexdigest()
+        path = self.blob_path(digest)
+
+        if not os.path.exists(path):
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            # Write then rename so concurrent readers never see a partial blob
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, path)
+
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO pages (url, hash, etag, last_modified, encoding, fetched_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (url, digest, etag, last_modified, encoding, time.time()),
+            )
+            self.db.commit()
+
+        return digest
+
+    def touch(self, url):
+
+        with self.lock:
+            self.db.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self.db.commit()
+
+    def close(self):
+
+        with self.lock:
+            self.db.close()
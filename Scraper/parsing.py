@@ -0,0 +1,26 @@
+from bs4 import BeautifulSoup, FeatureNotFound, SoupStrainer
+import os
+
+# Extractors only navigate the page body (h1.api, h2.api sections, tables,
+# pre#Python_code, div#Python). Restricting the tree to it is opt-in, since
+# BeautifulSoup tests the strainer on every tag and that usually costs more
+# than skipping <head> saves (see bench_parse.py)
+
+BODY = SoupStrainer("body")
+
+def available_backends():
+
+    backends = ["html.parser"]
+
+    try:
+        BeautifulSoup("", "lxml")
+        backends.append("lxml")
+    except FeatureNotFound:
+        pass
+
+    return backends
+
+PARSER_BACKEND = os.getenv("SCRAPER_PARSER", available_backends()[-1])
+
+def make_soup(html, backend=None, strainer=None):
+    return BeautifulSoup(html, backend or PARSER_BACKEND, parse_only=strainer)
@@ -0,0 +1,194 @@
+import traceback
+import threading
+import queue
+
+DONE = object()
+
+class Stage:
+
+    # One step of the pipeline. fn takes one item (or a list of up to batch_size
+    # items when batch_size is set) and returns the item for the next stage, or
+    # None to drop it. With weigh, a batch is also closed before its summed
+    # weight would exceed max_weight. With flatten, fn returns a list whose
+    # elements are passed on one by one.
+    #
+    # Counts are per item, batches included: processed counts the items taken
+    # in, dropped the ones not passed on (for flatten, items in minus items
+    # out), errors the items lost to an exception plus every fail() call.
+
+    def __init__(self, name, fn, workers=1, batch_size=None, weigh=None, max_weight=None, flatten=False):
+
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.batch_size = batch_size
+        self.weigh = weigh
+        self.max_weight = max_weight
+        self.flatten = flatten
+
+        self.lock = threading.Lock()
+        self.running = workers
+
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def fail(self, message):
+
+        with self.lock:
+            self.errors += 1
+
+        print(f"[ERROR] {self.name}: {message}")
+
+    def apply(self, item, out_queue):
+
+        size = len(item) if self.batch_size is not None else 1
+
+        try:
+            res = self.fn(item)
+        except Exception:
+            self.fail(traceback.format_exc(limit=3))
+
+            with self.lock:
+                self.errors += size - 1
+
+            return
+
+        with self.lock:
+
+            self.processed += size
+
+            if res is None:
+                self.dropped += size
+            elif self.flatten:
+                self.dropped += size - len(res)
+
+        if res is None:
+            return
+
+        for out in (res if self.flatten else [res]):
+            out_queue.put(out)
+
+    def work(self, in_queue, out_queue):
+
+        batch, weight = [], 0
+
+        while True:
+
+            item = in_queue.get()
+
+            if item is DONE:
+
+                # Let sibling workers see the end of the stream too
+                in_queue.put(DONE)
+                break
+
+            if self.batch_size is None:
+                self.apply(item, out_queue)
+                continue
+
+            item_weight = self.weigh(item) if self.weigh is not None else 0
+
+            if batch and self.max_weight is not None and weight + item_weight > self.max_weight:
+                self.apply(batch, out_queue)
+                batch, weight = [], 0
+
+            batch.append(item)
+            weight += item_weight
+
+            if len(batch) >= self.batch_size:
+                self.apply(batch, out_queue)
+                batch, weight = [], 0
+
+        if batch:
+            self.apply(batch, out_queue)
+
+        with self.lock:
+            self.running -= 1
+            last = self.running == 0
+
+        if last:
+            out_queue.put(DONE)
+
+class InOrder:
+
+    # Applies fn to items in index order while they arrive out of order, e.g. a
+    # step that must see pages in toctree order behind a concurrent stage.
+    # put(index, item) and skip(index) (for an index that will never arrive)
+    # return fn's non-None results for every item that became next in line.
+    # fn runs under the lock, so it should be quick.
+
+    SKIPPED = object()
+
+    def __init__(self, fn, start=0):
+
+        self.fn = fn
+        self.lock = threading.Lock()
+
+        self.next = start
+        self.held = {}
+
+    def put(self, index, item):
+
+        with self.lock:
+
+            self.held[index] = item
+            results = []
+
+            while self.next in self.held:
+
+                item = self.held.pop(self.next)
+                self.next += 1
+
+                if item is not self.SKIPPED:
+
+                    res = self.fn(item)
+
+                    if res is not None:
+                        results.append(res)
+
+            return results
+
+    def skip(self, index):
+        return self.put(index, self.SKIPPED)
+
+def run_pipeline(items, stages, queue_size=64):
+
+    # Streams items through the stages, each stage running its own worker threads.
+    # Bounded queues between stages give backpressure, so memory stays flat and a
+    # slow stage throttles the ones before it. Item order is not preserved.
+
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+
+    def feed():
+
+        try:
+            for item in items:
+                queues[0].put(item)
+        finally:
+            queues[0].put(DONE)
+
+    threads = [threading.Thread(target=feed, daemon=True)]
+
+    for i, stage in enumerate(stages):
+        for _ in range(stage.workers):
+            threads.append(threading.Thread(target=stage.work, args=(queues[i], queues[i + 1]), daemon=True))
+
+    for thread in threads:
+        thread.start()
+
+    # Drain the last queue so the final stage never blocks
+    while queues[-1].get() is not DONE:
+        pass
+
+    for thread in threads:
+        thread.join()
+
+    return {
+        stage.name: {
+            "processed": stage.processed,
+            "dropped": stage.dropped,
+            "errors": stage.errors,
+        }
+        for stage in stages
+    }
@@ -0,0 +1,219 @@
+from dotenv import load_dotenv
+from openai import OpenAI
+from embedding_cache import EmbeddingCache
+from page_cache import CacheMiss
+from lexical_index import LexicalIndex
+from blob_store import BlobStore
+from chunking import parent_id
+from vector_index import open_index
+import argparse
+import time
+import os
+
+# Query side of the index: embed a question with the model used for the
+# documents and return the closest vectors. Runs against the local index
+# without any outside service once the query embedding is cached. With the
+# lexical index, exact API names are answered without an embedding at all and
+# other questions fuse BM25 and vector rankings.
+
+load_dotenv()
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+CACHE_DIR = os.getenv("SCRAPER_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+INDEX_DIR = os.getenv("SCRAPER_INDEX_DIR", os.path.join(CACHE_DIR, "index"))
+
+NAMESPACES = ["samples", "objects", "object_attrs"]
+
+# Reciprocal rank fusion constant, dampens the weight of the top few ranks
+RRF_K = 60
+
+# Samples are indexed as a sample vector plus code chunks, searches fetch this
+# many times top_k from the namespace so enough samples survive collapsing
+CHUNK_FANOUT = 4
+
+def embed_query(text, cache, client=None, model=EMBEDDING_MODEL, offline=False):
+
+    [embedding] = cache.get_many(model, [text])
+
+    if embedding is None:
+
+        if offline:
+            raise CacheMiss(f"no cached {model} embedding for {text!r}")
+
+        client = client or OpenAI()
+        rsp = client.embeddings.create(model=model, input=[text])
+
+        embedding = rsp.data[0].embedding
+        cache.put_many(model, [text], [embedding])
+
+    return embedding
+
+def collapse(matches):
+
+    # One match per parent, the best scoring one, reported under the parent id
+    # with the chunk that matched
+
+    best = {}
+
+    for match in sorted(matches, key=lambda match: -match["score"]):
+
+        key = (match["namespace"], parent_id(match["id"]))
+
+        if key not in best:
+            best[key] = {**match, "id": key[1], "chunk": match["id"]} if key[1] != match["id"] else match
+
+    return list(best.values())
+
+def search(index, vector, namespaces=NAMESPACES, top_k=5, include_metadata=True):
+
+    # Best top_k over all namespaces, each match tagged with its namespace
+
+    matches = []
+
+    for namespace in namespaces:
+
+        k = top_k * CHUNK_FANOUT if namespace == "samples" else top_k
+
+        for match in index.query(vector=vector, top_k=k, namespace=namespace, include_metadata=include_metadata)["matches"]:
+            matches.append({**match, "namespace": namespace})
+
+    return collapse(matches)[:top_k]
+
+def fuse(rankings, top_k=5):
+
+    # Reciprocal rank fusion of several ranked match lists, keyed by (namespace, id)
+
+    fused = {}
+
+    for ranking in rankings:
+        for rank, match in enumerate(ranking):
+
+            key = (match["namespace"], match["id"])
+            entry = fused.setdefault(key, {"id": match["id"], "namespace": match["namespace"], "score": 0.0, "sources": []})
+
+            entry["score"] += 1 / (RRF_K + rank + 1)
+            entry["sources"].append(match["source"])
+
+            if "metadata" in match:
+                entry["metadata"] = match["metadata"]
+
+            if "chunk" in match:
+                entry.setdefault("chunk", match["chunk"])
+
+    return sorted(fused.values(), key=lambda match: -match["score"])[:top_k]
+
+def hybrid_search(index, lexical, text, embed, namespaces=NAMESPACES, top_k=5, include_metadata=True):
+
+    # embed(text) is only called when the question names no known API object
+
+    exact = lexical.lookup(text, namespaces)
+
+    if exact:
+
+        matches = [{"id": id, "namespace": namespace, "score": 1.0, "sources": ["exact"]} for namespace, id in exact]
+        seen = set(exact)
+
+        # Topped up with keyword matches for the other parts of the question
+        for match in fuse([keyword_search(lexical, text, namespaces, top_k)], top_k):
+            if (match["namespace"], match["id"]) not in seen:
+                matches.append(match)
+
+        return matches[:top_k]
+
+    vector = [{**match, "source": "vector"} for match in search(index, embed(text), namespaces, top_k, include_metadata)]
+
+    return fuse([keyword_search(lexical, text, namespaces, top_k), vector], top_k)
+
+def keyword_search(lexical, text, namespaces=NAMESPACES, top_k=5):
+
+    matches = [
+        {"id": id, "namespace": namespace, "score": score, "source": "bm25"}
+        for namespace in namespaces
+        for id, score in lexical.search(text, namespace, top_k * CHUNK_FANOUT if namespace == "samples" else top_k)
+    ]
+
+    return collapse(matches)[:top_k]
+
+def expand(metadata, store):
+
+    # Metadata with its payload (code, tables) merged back in, read on demand
+
+    if "payload" not in metadata:
+        return metadata
+
+    return {**metadata, **(store.get(metadata["payload"]) or {})}
+
+def metadata_of(index, match):
+
+    # Lexical matches carry no metadata, it is fetched from the index by id
+
+    if "metadata" in match:
+        return match["metadata"]
+
+    vector = index.fetch(ids=[match["id"]], namespace=match["namespace"])["vectors"].get(match["id"])
+
+    return vector["metadata"] if vector else {}
+
+def reindex(index, lexical, store, namespaces=NAMESPACES):
+
+    # Fills the lexical index from the metadata already in a local vector index
+
+    for namespace in namespaces:
+
+        vectors = [{"id": id, "metadata": expand(metadata, store)} for id, metadata in index.items(namespace)]
+        lexical.add(vectors, namespace)
+
+        print(f"[REINDEX] {namespace} {len(vectors)} documents")
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Query the Fusion 360 API index.")
+    parser.add_argument("query", help="question to retrieve context for")
+    parser.add_argument("--namespace", action="append", choices=NAMESPACES, help="namespace to search (repeatable, default all)")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--index", choices=["local", "pinecone"], default=os.getenv("SCRAPER_INDEX", "local"))
+    parser.add_argument("--mode", choices=["flat", "ivf"], default=os.getenv("SCRAPER_INDEX_MODE", "ivf"))
+    parser.add_argument("--vector-only", action="store_true", help="skip the lexical index")
+    parser.add_argument("--payload", action="store_true", help="print each match's code and tables from the payload store")
+    parser.add_argument("--reindex", action="store_true", help="rebuild the lexical index from the local vector index first")
+    args = parser.parse_args()
+
+    cache = EmbeddingCache(os.path.join(CACHE_DIR, "embeddings"))
+    index = open_index(args.index, root=INDEX_DIR, mode=args.mode)
+    lexical = LexicalIndex(os.path.join(CACHE_DIR, "lexical.sqlite"))
+    store = BlobStore(os.path.join(CACHE_DIR, "payloads"))
+
+    namespaces = args.namespace or NAMESPACES
+
+    try:
+
+        if args.reindex:
+            reindex(index, lexical, store, namespaces)
+
+        start = time.perf_counter()
+
+        if args.vector_only:
+            matches = search(index, embed_query(args.query, cache), namespaces, args.top_k)
+        else:
+            matches = hybrid_search(index, lexical, args.query, lambda text: embed_query(text, cache), namespaces, args.top_k)
+
+        elapsed = time.perf_counter() - start
+
+        for match in matches:
+            chunk = f" ({match['chunk']})" if "chunk" in match else ""
+            print(f"[{match['namespace']}] {match['score']:.4f} {match['id']}{chunk} {'+'.join(match.get('sources', ['vector']))}")
+
+            if args.payload:
+                for field, value in expand(metadata_of(index, match), store).items():
+                    print(f"    {field}: {value}")
+
+        print(f"[SEARCH] {len(matches)} matches in {elapsed * 1000:.2f} ms")
+
+    finally:
+
+        cache.close()
+        lexical.close()
+
+        if args.index == "local":
+            index.close()
@@ -1,26 +1,136 @@
-from bs4 import BeautifulSoup, NavigableString, Tag
+from extract import extract_chunk, extract_object, extract_object_attr, extract_sample
 from dotenv import load_dotenv
-from pinecone import Pinecone
 from openai import OpenAI
-import requests
-import math
-import json
+from batching import count_tokens, token_batches
+from pipeline import InOrder, Stage, run_pipeline
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from crawl import RateLimiter, crawl
+from manifest import Manifest, content_hash
+from checkpoint import Checkpoint
+from embedding_cache import EmbeddingCache
+from page_cache import CacheMiss, PageCache
+from llm_cache import LLMCache
+from fetch import Fetcher
+from vector_index import open_index
+from lexical_index import LexicalIndex
+from blob_store import BlobStore
+from chunking import CHUNKING_VERSION, chunk_code, chunk_id
+from llm_batch import run_async, run_batch
+from dedupe import Deduper, normalize
+from metrics import Metrics
+import traceback
+import argparse
 import os
-import re
 
 load_dotenv()
 
 openai = OpenAI()
 
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index = pc.Index("ie421-group10")
+DESCRIPTION_MODEL = "gpt-4o-mini"
+EMBEDDING_MODEL = "text-embedding-3-small"  # 1536 dims
+
+# Embedding requests are packed up to this many tokens (the API allows 300k)
+EMBEDDING_BATCH_TOKENS = int(os.getenv("SCRAPER_EMBEDDING_BATCH_TOKENS", "250000"))
+
+# Crawl settings (point BASE_URL at a local server to replay recorded pages)
+
+BASE_URL = os.getenv("AUTODESK_HELP_URL", "https://help.autodesk.com")
+CONCURRENCY = int(os.getenv("SCRAPER_CONCURRENCY", "8"))
+RATE_LIMIT = float(os.getenv("SCRAPER_RATE_LIMIT", "10"))
+
+# Page cache (SCRAPER_OFFLINE=1 serves only from the cache, no network)
+
+CACHE_DIR = os.getenv("SCRAPER_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+OFFLINE = os.getenv("SCRAPER_OFFLINE", "0") == "1"
+
+page_cache = PageCache(os.path.join(CACHE_DIR, "pages"))
+
+fetcher = Fetcher(pool_size=CONCURRENCY, rate_limiter=RateLimiter(RATE_LIMIT), cache=page_cache, offline=OFFLINE)
+
+# Per-stage timers and run counters, exported with --metrics (.prom or .json)
+
+metrics = Metrics()
+
+METRICS_PATH = os.getenv("SCRAPER_METRICS")
+
+# Vector index: the hosted Pinecone index, or SCRAPER_INDEX=local for the
+# on-disk index in vector_index.py (SCRAPER_INDEX_MODE=flat|ivf)
+
+INDEX_BACKEND = os.getenv("SCRAPER_INDEX", "pinecone")
+INDEX_DIR = os.getenv("SCRAPER_INDEX_DIR", os.path.join(CACHE_DIR, "index"))
+INDEX_MODE = os.getenv("SCRAPER_INDEX_MODE", "ivf")
+
+index = open_index(INDEX_BACKEND, root=INDEX_DIR, mode=INDEX_MODE)
+
+# Keyword/exact-name side of retrieval, kept in step with the vector index
+
+lexical = LexicalIndex(os.path.join(CACHE_DIR, "lexical.sqlite"))
+
+# Streaming pipeline stage concurrency (fetch uses CONCURRENCY). Parsing runs
+# in PARSE_PROCESSES processes, fed PARSE_CHUNK pages at a time by PARSE_WORKERS threads
+
+PARSE_PROCESSES = int(os.getenv("SCRAPER_PARSE_PROCESSES", str(os.cpu_count() or 1)))
+PARSE_WORKERS = int(os.getenv("SCRAPER_PARSE_WORKERS", str(PARSE_PROCESSES)))
+PARSE_CHUNK = int(os.getenv("SCRAPER_PARSE_CHUNK", "8"))
+DESCRIBE_WORKERS = int(os.getenv("SCRAPER_DESCRIBE_WORKERS", "4"))
+EMBED_WORKERS = int(os.getenv("SCRAPER_EMBED_WORKERS", "2"))
+UPSERT_WORKERS = int(os.getenv("SCRAPER_UPSERT_WORKERS", "1"))
+QUEUE_SIZE = int(os.getenv("SCRAPER_QUEUE_SIZE", "64"))
+
+# Manifest of what is already indexed, so unchanged pages skip the LLM and embedding calls.
+# METADATA_SCHEMA is part of each entry, bumping it re-upserts (from cache) every vector
+
+manifest = Manifest(os.path.join(CACHE_DIR, "manifest.json"))
+
+METADATA_SCHEMA = "payload-v1"
+
+# Bulky metadata fields (code, tables) are moved into the payload store and the
+# vector only keeps the payload digest, so query responses stay small
+
+PAYLOAD_FIELDS = ["codeSample", "sampleIds", "methods", "properties", "methodParams", "methodReturnVals", "exampleUsage"]
+
+payload_store = BlobStore(os.path.join(CACHE_DIR, "payloads"))
+
+# Objects and attributes that duplicate an indexed record (e.g. members every
+# class inherits) are served by that record's vector and only recorded as aliases
+
+DEDUPE_THRESHOLD = float(os.getenv("SCRAPER_DEDUPE_THRESHOLD", "0.85"))
+
+deduper = Deduper(os.path.join(CACHE_DIR, "dedupe.sqlite"), threshold=DEDUPE_THRESHOLD)
+
+# Sample code is also embedded, in chunks of at most SAMPLE_CHUNK_LINES lines
+# (split at def/class boundaries where possible) linked to their sample
+
+SAMPLE_CHUNK_LINES = int(os.getenv("SCRAPER_SAMPLE_CHUNK_LINES", "60"))
+SAMPLE_CHUNK_OVERLAP = int(os.getenv("SCRAPER_SAMPLE_CHUNK_OVERLAP", "5"))
+
+# Memoized gen_description outputs
+
+LLM_CACHE_MAX_BYTES = int(os.getenv("SCRAPER_LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+llm_cache = LLMCache(os.path.join(CACHE_DIR, "llm.sqlite"), max_bytes=LLM_CACHE_MAX_BYTES)
+
+# Embeddings already computed, keyed by (model, text hash)
+
+embedding_cache = EmbeddingCache(os.path.join(CACHE_DIR, "embeddings"))
+
+def fetch_page(ln):
+
+    # Raw bytes, BeautifulSoup picks the encoding from the page itself
+
+    with metrics.timer("fetch"):
+        rsp = fetcher.get(f"{BASE_URL}{ln}")
+
+    metrics.count("pages")
+    metrics.count("bytes", len(rsp.content))
+
+    return rsp.content
 
 # Get Description
 
-def gen_description(description, code):
+DESCRIPTION_SYSTEM_PROMPT = "You are a Fusion 360 expert that generates clear, technical descriptions for RAG applications."
 
-    prompt = f"""
+DESCRIPTION_PROMPT = """
     You are a Fusion 360 expert. Your task is to generate a concise, high-quality description (one paragraph) of the provided Fusion 360 demo code for use in a RAG system.
 
     Use the official Fusion 360 documentation description below to understand the code's purpose:
@@ -34,58 +144,274 @@ def gen_description(description, code):
     - Output only the enhanced description of the code.
     - Do not exceed one paragraphs.
     - Do not include any additional commentary or formatting.
-    """.strip()
+    """
+
+DESCRIPTION_MAX_TOKENS = 300
+DESCRIPTION_TEMPERATURE = 0.4
+
+def description_request(description, code):
+
+    # (cache key, chat.completions.create arguments) of a sample description.
+    # The output only depends on these inputs, so re-runs never pay twice for the same sample
+
+    key = llm_cache.key(DESCRIPTION_MODEL, DESCRIPTION_SYSTEM_PROMPT, DESCRIPTION_PROMPT, description, code, DESCRIPTION_TEMPERATURE, DESCRIPTION_MAX_TOKENS)
+
+    prompt = DESCRIPTION_PROMPT.format(description=description, code=code).strip()
 
-    response = openai.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
+    body = {
+        "model": DESCRIPTION_MODEL,
+        "messages": [
             {
                 "role": "system",
-                "content": "You are a Fusion 360 expert that generates clear, technical descriptions for RAG applications."
+                "content": DESCRIPTION_SYSTEM_PROMPT
             },
             {
                 "role": "user",
                 "content": prompt
             }
         ],
-        max_tokens=300,
-        temperature=0.4,
-        n=1,
-    )
+        "max_tokens": DESCRIPTION_MAX_TOKENS,
+        "temperature": DESCRIPTION_TEMPERATURE,
+        "n": 1,
+    }
+
+    return key, body
+
+def record_usage(kind, model, usage):
+
+    if usage is None:
+        return
+
+    metrics.count("requests", kind=kind, model=model)
+    metrics.count("tokens", usage.prompt_tokens, kind=kind, model=model, type="prompt")
+
+    if getattr(usage, "completion_tokens", None):
+        metrics.count("tokens", usage.completion_tokens, kind=kind, model=model, type="completion")
+
+def gen_description(description, code, client=None):
+
+    client = client or openai
 
-    return response.choices[0].message.content.strip()
+    key, body = description_request(description, code)
+
+    cached = llm_cache.get(key)
+
+    if cached is not None:
+        return cached
+
+    with metrics.timer("llm"):
+        response = client.chat.completions.create(**body)
+
+    record_usage("llm", DESCRIPTION_MODEL, response.usage)
+
+    enhanced_description = response.choices[0].message.content.strip()
+
+    llm_cache.put(key, enhanced_description)
+
+    return enhanced_description
+
+# Bulk descriptions. In batch or async mode the descriptions a samples crawl
+# will need are generated up front into the LLM cache, so the pipeline's
+# describe stage only reads them back
+
+DESCRIBE_MODE = os.getenv("SCRAPER_DESCRIBE_MODE", "sync")
+DESCRIBE_CONCURRENCY = int(os.getenv("SCRAPER_DESCRIBE_CONCURRENCY", "16"))
+BATCH_POLL_INTERVAL = float(os.getenv("SCRAPER_BATCH_POLL_INTERVAL", "30"))
+
+def pending_description(ttl, ln):
+
+    # (cache key, request body) for a sample whose description isn't cached
+
+    pairs = parse_sample(ttl, fetch_page(ln))
+
+    if pairs is None:
+        return
+
+    key, body = description_request(pairs["description"], pairs["code"])
+
+    if llm_cache.get(key) is not None:
+        return
+
+    return key, body
+
+def prefetch_descriptions(tasks, mode=DESCRIBE_MODE):
+
+    pending = []
+    collect(tasks, pending_description, pending)
+
+    # Requests go out under their cache key, which is unique per body where
+    # sample titles aren't, so identical samples share one request
+    requests = list(dict(pending).items())
+
+    if not requests:
+        return
+
+    print(f"[DESCRIBING] {len(requests)} sample descriptions in {mode} mode")
+
+    if mode == "batch":
+        results = run_batch(openai, requests, os.path.join(CACHE_DIR, "batches", "descriptions.jsonl"), BATCH_POLL_INTERVAL)
+    else:
+        results = run_async(requests, DESCRIBE_CONCURRENCY)
+
+    # Anything missing falls back to a direct call in the pipeline
+    for key, content in results.items():
+        llm_cache.put(key, content)
+
+    print(f"[DESCRIBING] {len(results)}/{len(requests)} descriptions cached")
 
 # Embeddings
 
 def get_embeddings(texts):
 
-    response = openai.embeddings.create(
-        model="text-embedding-3-small",  # 1536 dims
-        input=texts
-    )
+    cached = embedding_cache.get_many(EMBEDDING_MODEL, texts)
+    missing = [i for i, embedding in enumerate(cached) if embedding is None]
+
+    embeddings = [None if embedding is None else embedding.tolist() for embedding in cached]
+
+    if not missing:
+        return embeddings
+
+    # Offline runs rebuild namespaces purely from the cache
+    if OFFLINE:
+        raise CacheMiss(f"{len(missing)} embeddings not cached for {EMBEDDING_MODEL}")
+
+    with metrics.timer("embed"):
+        response = openai.embeddings.create(
+            model=EMBEDDING_MODEL,
+            input=[texts[i] for i in missing]
+        )
+
+    record_usage("embed", EMBEDDING_MODEL, response.usage)
+
+    fresh = [d.embedding for d in response.data]
+    embedding_cache.put_many(EMBEDDING_MODEL, [texts[i] for i in missing], fresh)
+
+    for i, embedding in zip(missing, fresh):
+        embeddings[i] = embedding
 
-    embeddings = [d.embedding for d in response.data]
     return embeddings
 
-def add_embeddings(arr, namespace, batch_size=50):
+def embed_batch(batch):
 
-    num_batches = math.ceil(len(arr) / batch_size)
-    for i in range(0, len(arr), batch_size):
+    texts = [text for (_, _, text) in batch]
 
-        print(f"[Processing] {namespace} batch {(i // batch_size) + 1}/{num_batches}")
-        
-        batch = arr[i:i+batch_size]
-        texts = [text for (_, _, text) in batch]
+    embeddings = get_embeddings(texts)
+
+    return [{ "id": id, "values": embedding, "metadata": metadata } for (id, metadata, _), embedding in zip(batch, embeddings)]
+
+def slim_vector(vector):
+
+    metadata = vector["metadata"]
+    payload = {field: metadata[field] for field in PAYLOAD_FIELDS if field in metadata}
 
-        embeddings = get_embeddings(texts)
+    if not payload:
+        return vector
 
-        vectors = [{ "id": id, "values": embedding, "metadata": metadata } for (id, metadata, _), embedding in zip(batch, embeddings)]
+    slim = {key: value for key, value in metadata.items() if key not in payload}
+    slim["payload"] = payload_store.put(payload)
 
+    return {**vector, "metadata": slim}
+
+def upsert_vectors(vectors, namespace):
+
+    with metrics.timer("upsert"):
         index.upsert(
-            vectors=vectors,
+            vectors=[slim_vector(vector) for vector in vectors],
             namespace=namespace
         )
 
+    metrics.count("vectors", len(vectors), namespace=namespace)
+
+    lexical.add(vectors, namespace)
+
+    ids = [vector["id"] for vector in vectors]
+    manifest.commit(namespace, ids)
+
+    return ids
+
+def item_tokens(item):
+
+    _, _, text = item
+
+    return count_tokens(text, EMBEDDING_MODEL)
+
+def add_embeddings(arr, namespace, max_tokens=EMBEDDING_BATCH_TOKENS, concurrency=None):
+
+    # Several embedding requests run at once, and each finished batch is upserted
+    # on its own thread while the next embeddings are still in flight
+
+    batches = list(token_batches(arr, item_tokens, max_tokens=max_tokens))
+    num_batches = len(batches)
+
+    upserts = []
+
+    with ThreadPoolExecutor(max_workers=1) as upserter:
+
+        for i, vectors in enumerate(crawl([(batch,) for batch in batches], embed_batch, concurrency or EMBED_WORKERS)):
+
+            print(f"[Processing] {namespace} batch {i + 1}/{num_batches}")
+
+            upserts.append(upserter.submit(upsert_vectors, vectors, namespace))
+
+    for upsert in upserts:
+        upsert.result()
+
+def prune_embeddings(namespace, batch_size=1000):
+
+    # Only call after a complete crawl of the namespace, otherwise every id that
+    # was not visited this run would be treated as removed from the docs
+
+    stale = manifest.stale_ids(namespace)
+    ids = stale + manifest.children_of(namespace, stale)
+
+    # Aliases of a vanished record lose their vector, they are rebuilt next run
+    orphans = manifest.aliases_of(namespace, stale)
+
+    delete_vectors(ids, namespace, batch_size)
+    deduper.remove(namespace, stale)
+    manifest.remove(namespace, stale + orphans)
+
+def delete_vectors(ids, namespace, batch_size=1000):
+
+    for i in range(0, len(ids), batch_size):
+
+        print(f"[DELETING] {namespace} {len(ids[i:i+batch_size])} vanished ids")
+
+        index.delete(ids=ids[i:i+batch_size], namespace=namespace)
+
+    lexical.remove(ids, namespace)
+
+def deduplicate(namespace, id, text, names=()):
+
+    # True if id duplicates an indexed record and was made an alias of it
+
+    canonical, changed = deduper.canonical(namespace, id, normalize(text, names))
+
+    # Aliases of id share the text it had before, which no vector holds any more
+    # once id changes or becomes an alias itself. Like the aliases of vanished
+    # records in prune_embeddings, they are dropped and rebuilt next run
+    if changed or canonical is not None:
+
+        orphans = manifest.aliases_of(namespace, [id])
+
+        if orphans:
+            print(f"[DUPLICATE] dropping {len(orphans)} aliases of {id}")
+            manifest.remove(namespace, orphans)
+            lexical.remove(orphans, namespace)
+
+    if canonical is None:
+        return False
+
+    print(f"[DUPLICATE] {id} -> {canonical}")
+
+    # id used to have a vector of its own
+    if manifest.alias(namespace, id, canonical):
+        delete_vectors([id], namespace)
+
+    lexical.add_alias(id, canonical, namespace)
+
+    return True
+
 def format_sample_embedding(pairs):
 
     ttl, description, code = pairs.values()
@@ -98,9 +424,6 @@ def format_sample_embedding(pairs):
     description: {enhanced_description}
     """
 
-    if len(text) + len(code) > 5 * 8192:
-        return None
-
     metadata = {
         "text": text,
         "sampleId": ttl,
@@ -109,111 +432,83 @@ def format_sample_embedding(pairs):
 
     id = ttl
 
-    return id, metadata, text
-
-# Get Samples
-
-def get_sample(ttl, ln):
-
-    global samples_arr
+    items = [(id, metadata, text)]
 
-    def get_description(soup):
+    for start, end, chunk in chunk_code(code, SAMPLE_CHUNK_LINES, SAMPLE_CHUNK_OVERLAP):
 
-        h2 = soup.find("h2", class_="api", string=re.compile(r"^\s*Description\s*$"))
-        
-        if not h2:
-            return ""
-        
-        parts = []
-
-        for el in h2.next_siblings:
-            
-            if isinstance(el, Tag) and el.name == "h2" and "api" in (el.get("class") or []):
-                break
-
-            if isinstance(el, NavigableString):
-                
-                text = el.strip()
-                
-                if text:
-                    parts.append(text)
+        chunk_text = f"""
+    title: {ttl} (lines {start}-{end})
+    code:
+{chunk}
+    """
 
-            elif isinstance(el, Tag):
-                
-                text = el.get_text(strip=True)
-                
-                if text:
-                
-                    parts.append(text)
+        chunk_metadata = {
+            "text": f"{ttl} (lines {start}-{end})",
+            "sampleId": ttl,
+            "parentId": id,
+            "lines": f"{start}-{end}",
+            "codeSample": chunk,
+        }
 
-        description = " ".join(parts).strip()
-        return description
+        items.append((chunk_id(id, len(items) - 1), chunk_metadata, chunk_text))
 
-    def get_code(soup):
+    # Chunks the previous version of the sample had beyond the current ones
+    vanished = manifest.set_children("samples", id, [chunk for (chunk, _, _) in items[1:]])
 
-        code = soup.find("pre", id=f"Python_code")
+    if vanished:
+        delete_vectors(vanished, "samples")
 
-        if code is None:
-            return None
+    return items
 
-        for tag in code.find_all(["span"]):
-            tag.unwrap()
+# Get Samples
 
-        formatted_code = code.get_text("")
+def sample_pairs(ttl, record):
 
-        return formatted_code
+    if record.code is None:
+        return
 
-    url = f"https://help.autodesk.com{ln}"
+    pairs = {
+        "ttl": ttl, 
+        "description": record.description, 
+        "code": record.code
+    }
 
-    rsp = requests.get(url)
-    rsp.raise_for_status()
+    if not manifest.check("samples", ttl, content_hash(pairs), f"{DESCRIPTION_MODEL}+{EMBEDDING_MODEL}+{METADATA_SCHEMA}+chunks{CHUNKING_VERSION}:{SAMPLE_CHUNK_LINES}/{SAMPLE_CHUNK_OVERLAP}"):
+        return
 
-    soup = BeautifulSoup(rsp.text, "html.parser")
+    return pairs
 
-    print(f"[EXTRACTING] {ttl} @ {ln}")
+def parse_sample(ttl, html):
 
-    description = get_description(soup)
-    code = get_code(soup)
+    print(f"[EXTRACTING] {ttl}")
 
-    if code is None:
-        return
+    return sample_pairs(ttl, extract_sample(html))
 
-    pairs = {
-        "ttl": ttl, 
-        "description": description, 
-        "code": code
-    }
+def get_sample(ttl, ln):
 
-    res = format_sample_embedding(pairs)
+    pairs = parse_sample(ttl, fetch_page(ln))
 
-    if res is None:
+    if pairs is None:
         return
 
-    samples_arr.append(res)
-
-start_sample = "Avoid Machine Surface Settings API Sample"
-start_sample_found = False
-
-def get_samples(content):
+    return format_sample_embedding(pairs)
 
-    global start_sample, start_sample_found
+def get_samples(content, tasks):
 
     if "children" in content:
 
         ttl = content["ttl"]
                 
         for child in content["children"]:
-            get_samples(child)
+            get_samples(child, tasks)
 
     else:
 
         ln = content["ln"]
         ttl = content["ttl"]
 
-        start_sample_found = start_sample_found or start_sample == ttl
-
-        if start_sample_found and ln != "":
-            get_sample(ttl, ln)
+        if ln != "":
+            tasks.append((ttl, ln))
 
 # Get Objects
 
@@ -240,110 +535,40 @@ def format_object_embedding(pairs):
 
     return id, metadata, text
 
-def get_object(ttl, ln):
-
-    global objects_arr
-
-    def get_description(soup):
+def object_pairs(ttl, record):
 
-        h2 = soup.find("h2", class_="api", string=re.compile(r"^\s*Description\s*$"))
-        
-        if not h2:
-            return ""
-        
-        parts = []
-
-        for el in h2.next_siblings:
-            
-            if isinstance(el, Tag) and el.name == "h2" and "api" in (el.get("class") or []):
-                break
-
-            if isinstance(el, NavigableString):
-                
-                text = el.strip()
-                
-                if text:
-                    parts.append(text)
-
-            elif isinstance(el, Tag):
-                
-                text = el.get_text(strip=True)
-                
-                if text:
-                
-                    parts.append(text)
-
-        description = " ".join(parts).strip()
-        return description
-
-    def get_table(h2, num_headers):
-
-        table = h2.find_next("table")
-
-        if not table:
-            return []
-
-        rows = table.find_all("tr")
-        
-        extracted = []
-        for row in rows[1:]:
-            
-            values = row.find_all(["td"])
-            
-            if values[0].get_text(strip=True) in ["classType", "isValid", "objectType"]:
-                continue
-
-            vals = [values[i].get_text(strip=True) for i in range(num_headers)]
-            extracted.append(",".join(vals))
-
-        return extracted
-
-    url = f"https://help.autodesk.com{ln}"
-
-    rsp = requests.get(url)
-    rsp.raise_for_status()
-
-    soup = BeautifulSoup(rsp.text, "html.parser")
-
-    print(f"[EXTRACTING] {ttl} @ {ln}")
+    pairs = {
+        "ttl": ttl,
+        "description": record.description,
+        "methods_table": record.methods_table,
+        "properties_table": record.properties_table,
+        "samples_table": record.samples_table,
+    }
 
-    description = get_description(soup)
+    if not manifest.check("objects", ttl, content_hash(pairs), f"{EMBEDDING_MODEL}+{METADATA_SCHEMA}+dedupe{DEDUPE_THRESHOLD}"):
+        return
 
-    methods_h2 = soup.find("h2", class_="api", string=re.compile(r"^\s*Methods\s*$"))
+    text = "\n".join([record.description, *record.methods_table, *record.properties_table])
 
-    methods_table = []
-    if methods_h2:
-        methods_table = get_table(methods_h2, 2)
-        # print(methods_table)
+    if deduplicate("objects", ttl, text, names=(ttl,)):
+        return
 
-    properties_h2 = soup.find("h2", class_="api", string=re.compile(r"^\s*Properties\s*$"))
+    return pairs
 
-    properties_table = []
-    if properties_h2:
-        properties_table = get_table(properties_h2, 2)
-        # print(properties_table)
+def parse_object(ttl, html):
 
-    samples_h2 = soup.find("h2", class_="api", string=re.compile(r"^\s*Samples\s*$"))
+    print(f"[EXTRACTING] {ttl}")
 
-    samples_table = []
-    if samples_h2:
-        samples_table = get_table(samples_h2, num_headers=1)
-        # print(samples_table)
+    return object_pairs(ttl, extract_object(html))
 
-    pairs = {
-        "ttl": ttl,
-        "description": description,
-        "methods_table": methods_table,
-        "properties_table": properties_table,
-        "samples_table": samples_table,
-    }
+def get_object(ttl, ln):
 
-    res = format_object_embedding(pairs)
+    pairs = parse_object(ttl, fetch_page(ln))
 
-    if res is None:
+    if pairs is None:
         return
 
-    objects_arr.append(res)
+    return format_object_embedding(pairs)
 
 def format_object_attr_embedding(pairs):
     
@@ -375,212 +600,311 @@ def format_object_attr_embedding(pairs):
 
     return id, metadata, text
 
+def object_attr_pairs(record):
+
+    print(f"[EXTRACTING] {record.name}")
+
+    pairs = {
+        "name": record.name,
+        "description": record.description,
+        "property_type": record.property_type,
+        "method_parameters": record.method_parameters,
+        "method_return_values": record.method_return_values,
+        "example_usage": record.example_usage
+    }
+
+    if not manifest.check("object_attrs", record.name, content_hash(pairs), f"{EMBEDDING_MODEL}+{METADATA_SCHEMA}+dedupe{DEDUPE_THRESHOLD}"):
+        return
+
+    # Same-named members whose description and signature match up to the class name
+    class_name, attr_name = record.name.split(".")
+    text = "\n".join([attr_name, record.description, record.property_type, *record.method_parameters, *record.method_return_values])
+
+    if deduplicate("object_attrs", record.name, text, names=(class_name,)):
+        return
+
+    return pairs
+
+def parse_object_attr(html):
+    return object_attr_pairs(extract_object_attr(html))
+
 def get_object_attr(ln):
 
-    global object_attrs_arr
+    pairs = parse_object_attr(fetch_page(ln))
 
-    def get_name(soup):
-        
-        h1_tag = soup.find("h1", class_="api")
-        if not h1_tag:
-            return ""
-        
-        name = h1_tag.get_text(strip=True).split(" ")[0]
-        return name
+    if pairs is None:
+        return
 
-    def get_content(h2):
-        
-        parts = []
-        for el in h2.next_siblings:
-            
-            if isinstance(el, Tag) and el.name == "h2" and "api" in (el.get("class") or []):
-                break
+    return format_object_attr_embedding(pairs)
 
-            if isinstance(el, NavigableString):
-                
-                text = el.strip()
-                
-                if text:
-                    parts.append(text)
+def get_objects(content, object_tasks, attr_tasks):
 
-            elif isinstance(el, Tag):
-                
-                text = el.get_text(strip=True)
-                
-                if text:
-                
-                    parts.append(text)
+    if "children" in content:
 
-        description = " ".join(parts).strip()
-        return description
+        ttl = content["ttl"]
+        ln = content["ln"]
 
-    def get_syntax(soup):
+        if ttl != "Objects" and "🧪" not in ttl:
+            object_tasks.append((ttl, ln))
 
-        div = soup.find("div", id="Python")
+        for child in content["children"]:
+            get_objects(child, object_tasks, attr_tasks)
 
-        if not div:
-            return ""
+    else:
 
-        code = div.find_next("pre")
+        ln = content["ln"]
+        ttl = content["ttl"]
 
-        if not code:
-            return ""
+        if ln != "" and ttl not in ["classType", "isValid", "objectType"]:
+            attr_tasks.append((ln,))
 
-        for tag in code.find_all(["span", "b", "em"]):
-            tag.unwrap()
+def collect(tasks, worker, arr):
 
-        for br in code.find_all("br"):
-            br.replace_with("\n")
+    # Results arrive in toctree order regardless of which fetch finishes first
 
-        formatted_code = code.get_text("")
+    for res in crawl(tasks, worker, CONCURRENCY):
 
-        return formatted_code
+        # Samples come back as the sample vector followed by its code chunks
+        if isinstance(res, list):
+            arr.extend(res)
+        elif res is not None:
+            arr.append(res)
 
-    def get_table(h2, num_headers):
+# Streaming
 
-        table = h2.find_next("table")
+STREAM_KINDS = {
+    "samples": (extract_sample, sample_pairs, format_sample_embedding),
+    "objects": (extract_object, object_pairs, format_object_embedding),
+    "object_attrs": (extract_object_attr, object_attr_pairs, format_object_attr_embedding),
+}
 
-        if not table:
-            return []
+def stream(tasks, namespace, resume=False, batch_size=50):
 
-        rows = table.find_all("tr")
-        
-        extracted = []
-        for row in rows[1:]:
-            
-            values = row.find_all(["td"])
-            
-            if values[0].get_text(strip=True) in ["classType", "isValid", "objectType"]:
-                continue
+    # fetch -> parse -> describe -> embed -> upsert, vectors reach the index as
+    # soon as a batch fills instead of after the whole crawl. Tasks are the same
+    # tuples collect() takes, the last element being the page link, which is
+    # carried along so the checkpoint can mark it done once nothing is left to do.
 
-            vals = [values[i].get_text(strip=True) for i in range(num_headers)]
-            extracted.append(",".join(vals))
+    extract, to_pairs, format_embedding = STREAM_KINDS[namespace]
 
-        return extracted
+    checkpoint = Checkpoint(os.path.join(CACHE_DIR, "checkpoints", f"{namespace}.jsonl"), resume=resume)
 
-    url = f"https://help.autodesk.com{ln}"
+    pending = [task for task in tasks if not checkpoint.done(task[-1])]
 
-    rsp = requests.get(url)
-    rsp.raise_for_status()
+    if resume:
+        print(f"[RESUMING] {namespace} {len(tasks) - len(pending)}/{len(tasks)} pages already done")
 
-    soup = BeautifulSoup(rsp.text, "html.parser")
+    def fetch(item):
 
-    name = get_name(soup)
+        # A page that can't be fetched still gives up its turn in `ordered`
 
-    print(f"[EXTRACTING] {name} @ {ln}")
+        index, task = item
 
-    description_h2 = soup.find("h2", class_="api", string=re.compile(r"^\s*Description\s*$"))
-    description = get_content(description_h2)
+        try:
+            return index, task[:-1], task[-1], fetch_page(task[-1])
+        except Exception:
+            fetch_stage.fail(f"{task[-1]}\n{traceback.format_exc(limit=3)}")
+            return index, task[:-1], task[-1], None
 
-    syntax = get_syntax(soup)
+    def pairs(page):
 
-    property_h2 = soup.find("h2", class_="api", string=re.compile(r"^\s*Property Value\s*$"))
-    
-    property = "N/A"
-    if property_h2:
-        property = get_content(property_h2)
+        args, ln, record = page
 
-    parameters_h2 = soup.find("h2", class_="api", string=re.compile(r"^\s*Parameters\s*$"))
+        try:
+            pairs = to_pairs(*args, record)
+        except Exception:
+            parse_stage.fail(f"{ln}\n{traceback.format_exc(limit=3)}")
+            return
 
-    parameters = []
-    if parameters_h2:
-        parameters = get_table(parameters_h2, 3)
+        if pairs is None:
+            checkpoint.complete([ln])
+            return
 
-    return_vals_h2 = soup.find("h2", class_="api", string=re.compile(r"^\s*Return Value(s?)\s*$"))
+        return ln, pairs
 
-    return_vals = []
-    if return_vals_h2:
-        return_vals = get_table(return_vals_h2, 2)
+    # Extraction runs in parallel, but the manifest check and deduplication see
+    # pages in toctree order, so the same page of a group of duplicates becomes
+    # canonical whichever fetch finishes first
+    ordered = InOrder(pairs)
 
-    pairs = {
-        "name": name,
-        "description": description,
-        "property_type": property,
-        "method_parameters": parameters,
-        "method_return_values": return_vals,
-        "example_usage": syntax
-    }
+    def parse_chunk(pages):
 
-    res = format_object_attr_embedding(pairs)
-    object_attrs_arr.append(res)
+        fetched = [html for (_, _, _, html) in pages if html is not None]
 
-start_object = ""
-start_object_found = True
+        try:
+            with metrics.timer("parse"):
+                results = parse_pool.submit(extract_chunk, extract, fetched).result() if fetched else []
+        except Exception:
+            results = [(None, traceback.format_exc(limit=3))] * len(fetched)
 
-def get_objects(content):
+        results = iter(results)
 
-    global start_object, start_object_found
+        items = []
 
-    if "children" in content:
+        for index, args, ln, html in pages:
 
-        ttl = content["ttl"]
-        ln = content["ln"]
+            if html is None:
+                items += ordered.skip(index)
+                continue
 
-        start_object_found = start_object_found or ttl == start_object
-        
-        if start_object_found and ttl != "Objects" and "🧪" not in ttl:
-            # get_object(ttl, ln)
-            print(f'"{ttl}",')
-            pass
+            record, error = next(results)
 
-        for child in content["children"]:
-            get_objects(child)
+            if error is not None:
+                parse_stage.fail(f"{ln}\n{error}")
+                items += ordered.skip(index)
+                continue
 
-    else:
+            items += ordered.put(index, (args, ln, record))
 
-        ln = content["ln"]
-        ttl = content["ttl"]
+        return items
 
-        if start_object_found and ln != "" and ttl not in ["classType", "isValid", "objectType"]:
-            # get_object_attr(ln)
-            pass
+    def describe(item):
 
-if __name__ == "__main__":
+        ln, pairs = item
+        res = format_embedding(pairs)
 
-    global samples_arr, objects_arr, object_attrs_arr
-    
-    samples_arr = []
+        if res is None:
+            checkpoint.complete([ln])
+            return
 
-    objects_arr = []
-    object_attrs_arr = []
+        # All vectors of a page travel together, so the page is only marked done
+        # once every one of them is upserted
+        return ln, res if isinstance(res, list) else [res]
+
+    def embed(batch):
+        return [ln for (ln, _) in batch], embed_batch([res for (_, items) in batch for res in items])
+
+    def upsert(item):
+
+        links, vectors = item
+        ids = upsert_vectors(vectors, namespace)
+
+        checkpoint.complete(links, ids)
+
+        return ids
+
+    fetch_stage = Stage("fetch", fetch, workers=CONCURRENCY)
+    parse_stage = Stage("parse", parse_chunk, workers=PARSE_WORKERS, batch_size=PARSE_CHUNK, flatten=True)
+
+    with ProcessPoolExecutor(max_workers=PARSE_PROCESSES) as parse_pool:
+
+        stats = run_pipeline(list(enumerate(pending)), [
+            fetch_stage,
+            parse_stage,
+            Stage("describe", describe, workers=DESCRIBE_WORKERS),
+            Stage("embed", embed, workers=EMBED_WORKERS, batch_size=batch_size, weigh=lambda item: sum(item_tokens(res) for res in item[1]), max_weight=EMBEDDING_BATCH_TOKENS),
+            Stage("upsert", upsert, workers=UPSERT_WORKERS),
+        ], queue_size=QUEUE_SIZE)
+
+    for name, counts in stats.items():
+
+        print(f"[PIPELINE] {namespace} {name}: {counts['processed']} processed, {counts['dropped']} dropped, {counts['errors']} errors")
+
+        for outcome in ["processed", "dropped", "errors"]:
+            metrics.count("items", counts[outcome], namespace=namespace, stage=name, outcome=outcome)
+
+    errors = sum(counts["errors"] for counts in stats.values())
+
+    # A finished crawl starts from scratch next time, even with --resume
+    if not errors:
+        checkpoint.clear()
+
+    checkpoint.close()
+
+    return errors
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Crawl the Fusion 360 API reference into the vector index.")
+    parser.add_argument("--resume", action="store_true", help="skip pages completed by the previous, interrupted run")
+    parser.add_argument("--metrics", default=METRICS_PATH, help="write run metrics to this file (.prom for Prometheus text, otherwise JSON)")
+    parser.add_argument("--describe", choices=["sync", "batch", "async"], default=DESCRIBE_MODE, help="how sample descriptions are generated")
+    args = parser.parse_args()
 
     try:
 
         # Hidden API 
 
-        url = "https://help.autodesk.com/view/fusion360/ENU/data/toctree.json"
+        url = f"{BASE_URL}/view/fusion360/ENU/data/toctree.json"
 
         # Returns sidebar elements and their nested children
         # Each (leaf) children has property ln which is a relative link to its docs
 
-        rsp = requests.get(url)
+        rsp = fetcher.get(url)
         json_content = rsp.json()
 
         # Samples
 
         # samples = json_content["books"][20]["children"][4]
         
-        # get_samples(samples)
-        # add_embeddings(samples_arr, "samples")
+        # sample_tasks = []
+        # get_samples(samples, sample_tasks)
+
+        # if args.describe != "sync":
+        #     prefetch_descriptions(sample_tasks, args.describe)
+
+        # if not stream(sample_tasks, "samples", resume=args.resume) and not args.resume:
+        #     prune_embeddings("samples")
 
         # Objects
 
         objects = json_content["books"][20]["children"][3]["children"][0]
         
-        get_objects(objects)
-        # add_embeddings(objects_arr, "objects")
-        add_embeddings(object_attrs_arr, "object_attrs")
+        object_tasks, attr_tasks = [], []
+        get_objects(objects, object_tasks, attr_tasks)
 
-    # except Exception as error:
+        # Vanished ids are only pruned after a full crawl with no failed pages,
+        # a resumed run never sees the pages finished before the interruption
 
-    #     print(error)
+        # if not stream(object_tasks, "objects", resume=args.resume) and not args.resume:
+        #     prune_embeddings("objects")
 
-    except:
+        if not stream(attr_tasks, "object_attrs", resume=args.resume) and not args.resume:
+            prune_embeddings("object_attrs")
 
-        # Samples
-        # add_embeddings(samples_arr, "samples")
+        # Re-partition the local index so new rows are searched through IVF too
 
-        # Objects
-        # add_embeddings(objects_arr, "objects")
-        add_embeddings(object_attrs_arr, "object_attrs")
+        if INDEX_BACKEND == "local":
+            index.build("object_attrs")
+
+    finally:
+
+        stats = fetcher.summary()
+        print(f"[FETCH] {stats['pages']} pages ({stats['cache_hits']} from cache), {stats['retries']} retries over {stats['retried_pages']} pages, mean {stats['mean_latency']:.3f}s, p95 {stats['p95_latency']:.3f}s")
+
+        metrics.count("retries", stats["retries"])
+        metrics.count("cache_hits", stats["cache_hits"], cache="page")
+
+        stats = llm_cache.stats()
+        print(f"[LLM CACHE] {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions, {stats['entries']} entries ({stats['bytes']} bytes)")
+
+        metrics.count("cache_hits", stats["hits"], cache="llm")
+        metrics.count("cache_misses", stats["misses"], cache="llm")
+
+        stats = embedding_cache.stats()
+        print(f"[EMBEDDING CACHE] {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries")
+
+        metrics.count("cache_hits", stats["hits"], cache="embedding")
+        metrics.count("cache_misses", stats["misses"], cache="embedding")
+
+        stats = deduper.stats()
+        print(f"[DEDUPE] {stats['exact']} exact and {stats['near']} near duplicates aliased, {stats['canonical']} distinct records")
+
+        metrics.count("duplicates", stats["exact"], match="exact")
+        metrics.count("duplicates", stats["near"], match="near")
+
+        print(f"[METRICS]\n{metrics.summary()}")
+
+        if args.metrics:
+            metrics.export(args.metrics)
+            print(f"[METRICS] written to {args.metrics}")
+
+        fetcher.close()
+        page_cache.close()
+        llm_cache.close()
+        embedding_cache.close()
+        lexical.close()
+        deduper.close()
 
+        if INDEX_BACKEND == "local":
+            index.close()
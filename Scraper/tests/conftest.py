@@ -0,0 +1,282 @@
+# Offline harness for the scraper: a local docs server with conditional GETs,
+# a stub OpenAI client, and a fixture pointing scraper.py's module-level stores
+# at a fresh cache directory for every test.
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import threading
+import tempfile
+import hashlib
+import random
+import time
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# scraper.py configures itself from the environment on import
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ["SCRAPER_INDEX"] = "local"
+os.environ["SCRAPER_CACHE_DIR"] = tempfile.mkdtemp(prefix="scraper-tests-")
+os.environ["SCRAPER_RATE_LIMIT"] = "0"
+
+PAGES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pages")
+
+def recorded(name):
+
+    with open(os.path.join(PAGES, name), "rb") as f:
+        return f.read()
+
+# Docs server
+
+# An attribute page of the Fusion API reference, ATTR_PAGE.format(cls=..., description=...)
+ATTR_PAGE = """<html><body>
+<h1 class="api">{cls}.deleteMe Method</h1>
+<h2 class="api">Description</h2>
+<p>{description}</p>
+<h2 class="api">Syntax</h2>
+<div id="Python">Python</div>
+<pre><span>returnValue</span> = {cls}_var.deleteMe()</pre>
+<h2 class="api">Return Value</h2>
+<table><tr><th>Type</th><th>Description</th></tr><tr><td>boolean</td><td>Returns true if the delete was successful.</td></tr></table>
+</body></html>"""
+
+SHARED = "Deletes this object."
+
+class DocsServer:
+
+    # Serves pages from a dict of path -> bytes with strong ETags, answering
+    # If-None-Match with 304. Every request is logged as (path, If-None-Match).
+    # failures maps a path to (status, headers) responses sent before its page.
+    # Arrival times and the peak number of requests in flight are kept too.
+
+    def __init__(self, max_delay=0.0):
+
+        self.pages = {}
+        self.failures = {}
+        self.requests = []
+        self.arrivals = []
+        self.active = 0
+        self.peak = 0
+        self.max_delay = max_delay
+        self.lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+
+                with server.lock:
+                    server.active += 1
+                    server.peak = max(server.peak, server.active)
+
+                try:
+                    self.respond()
+                finally:
+                    with server.lock:
+                        server.active -= 1
+
+            def respond(self):
+
+                etag = self.headers.get("If-None-Match")
+
+                with server.lock:
+                    server.requests.append((self.path, etag))
+                    server.arrivals.append(time.monotonic())
+                    body = server.pages.get(self.path)
+                    failures = server.failures.get(self.path)
+                    failure = failures.pop(0) if failures else None
+
+                # Jitter so concurrent fetches finish out of order
+                if server.max_delay:
+                    time.sleep(random.uniform(0, server.max_delay))
+
+                if failure is not None:
+
+                    status, headers = failure
+
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                if body is None:
+                    self.send_error(404)
+                    return
+
+                digest = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+
+                if etag == digest:
+                    self.send_response(304)
+                    self.send_header("ETag", digest)
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", digest)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def serve_classes(self, count, descriptions=None):
+
+        # Serves Cls0.deleteMe ... as attribute pages, SHARED unless described
+        # otherwise, and returns their object_attrs crawl tasks in toctree order
+
+        descriptions = descriptions or {}
+        tasks = []
+
+        for i in range(count):
+
+            cls = f"Cls{i}"
+            path = f"/attr/{cls}.deleteMe.htm"
+
+            self.pages[path] = ATTR_PAGE.format(cls=cls, description=descriptions.get(cls, SHARED)).encode("utf-8")
+            tasks.append((path,))
+
+        return tasks
+
+    def paths(self, etag=False):
+
+        with self.lock:
+            return [request if etag else request[0] for request in self.requests]
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def docs_server():
+
+    server = DocsServer()
+    yield server
+    server.close()
+
+# OpenAI stub
+
+class StubOpenAI:
+
+    # Deterministic stand-ins for chat.completions.create and embeddings.create,
+    # counting every call
+
+    def __init__(self, dim=8):
+
+        self.dim = dim
+        self.chat_calls = []
+        self.embedding_calls = []
+
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.complete))
+        self.embeddings = SimpleNamespace(create=self.embed)
+
+    def complete(self, model, messages, **kwargs):
+
+        self.chat_calls.append(messages)
+
+        content = f"described: {hashlib.sha256(messages[-1]['content'].encode('utf-8')).hexdigest()[:8]}"
+
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5),
+        )
+
+    def vector(self, text):
+
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+        rng = random.Random(seed)
+
+        return [rng.uniform(-1.0, 1.0) for _ in range(self.dim)]
+
+    def embed(self, model, input):
+
+        self.embedding_calls.append(list(input))
+
+        return SimpleNamespace(
+            data=[SimpleNamespace(embedding=self.vector(text)) for text in input],
+            usage=SimpleNamespace(prompt_tokens=len(input)),
+        )
+
+@pytest.fixture
+def stub_openai():
+    return StubOpenAI()
+
+# Scraper with fresh stores
+
+@pytest.fixture
+def scraper(tmp_path, monkeypatch, docs_server, stub_openai):
+
+    import scraper
+
+    from blob_store import BlobStore
+    from crawl import RateLimiter
+    from dedupe import Deduper
+    from embedding_cache import EmbeddingCache
+    from fetch import Fetcher
+    from lexical_index import LexicalIndex
+    from llm_cache import LLMCache
+    from manifest import Manifest
+    from page_cache import PageCache
+    from vector_index import open_index
+
+    cache_dir = str(tmp_path)
+    page_cache = PageCache(os.path.join(cache_dir, "pages"))
+
+    stores = {
+        "CACHE_DIR": cache_dir,
+        "BASE_URL": docs_server.url,
+        "openai": stub_openai,
+        "page_cache": page_cache,
+        "fetcher": Fetcher(pool_size=4, rate_limiter=RateLimiter(0), cache=page_cache),
+        "index": open_index("local", root=os.path.join(cache_dir, "index"), mode="flat"),
+        "lexical": LexicalIndex(os.path.join(cache_dir, "lexical.sqlite")),
+        "manifest": Manifest(os.path.join(cache_dir, "manifest.json")),
+        "deduper": Deduper(os.path.join(cache_dir, "dedupe.sqlite"), threshold=scraper.DEDUPE_THRESHOLD),
+        "llm_cache": LLMCache(os.path.join(cache_dir, "llm.sqlite")),
+        "embedding_cache": EmbeddingCache(os.path.join(cache_dir, "embeddings")),
+        "payload_store": BlobStore(os.path.join(cache_dir, "payloads")),
+        "CONCURRENCY": 4,
+        "PARSE_PROCESSES": 2,
+        "PARSE_WORKERS": 2,
+        "PARSE_CHUNK": 3,
+    }
+
+    for name, value in stores.items():
+        monkeypatch.setattr(scraper, name, value)
+
+    yield scraper
+
+    stores["fetcher"].close()
+
+    for name in ["page_cache", "lexical", "deduper", "llm_cache", "embedding_cache"]:
+        stores[name].close()
+
+@pytest.fixture
+def next_run(scraper, monkeypatch):
+
+    from dedupe import Deduper
+    from manifest import Manifest
+
+    def reload():
+
+        # A new process reloads the manifest and the signatures from disk
+        scraper.deduper.close()
+
+        monkeypatch.setattr(scraper, "manifest", Manifest(scraper.manifest.path))
+        monkeypatch.setattr(scraper, "deduper", Deduper(os.path.join(scraper.CACHE_DIR, "dedupe.sqlite"), threshold=scraper.DEDUPE_THRESHOLD))
+
+    return reload
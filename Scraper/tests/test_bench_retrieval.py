@@ -0,0 +1,123 @@
+import pytest
+
+from bench_retrieval import DEFAULT_QUESTIONS, compare, configurations, embed_questions, evaluate, label, load_questions
+from embedding_cache import EmbeddingCache
+from chunking import chunk_id
+from vector_index import open_index
+
+VECTORS = {
+    "A.a": [1.0, 0.0, 0.0, 0.0],
+    "B.b": [0.0, 1.0, 0.0, 0.0],
+    "C.c": [0.0, 0.0, 1.0, 0.0],
+    "D.d": [0.0, 0.0, 0.0, 1.0],
+}
+
+def question(text, *expected, namespace="object_attrs"):
+    return {"question": text, "namespace": namespace, "expected": list(expected)}
+
+# Found first, found second, and two expected ids at ranks 2 and 1
+EMBEDDED = [
+    (question("a", "A.a"), [1.0, 0.0, 0.0, 0.0]),
+    (question("b", "B.b"), [0.8, 0.6, 0.0, 0.0]),
+    (question("c or d", "C.c", "D.d"), [0.0, 0.0, 0.6, 0.8]),
+]
+
+@pytest.fixture(params=["flat", "ivf"])
+def index(tmp_path, request):
+
+    index = open_index("local", root=str(tmp_path / "index"), mode=request.param)
+    index.upsert([{"id": id, "values": values, "metadata": {}} for id, values in VECTORS.items()], namespace="object_attrs")
+
+    # A sample only found through one of its code chunks
+    index.upsert([
+        {"id": "Sample", "values": [0.0, 1.0, 0.0, 0.0], "metadata": {}},
+        {"id": chunk_id("Sample", 1), "values": [0.0, 0.0, 1.0, 0.0], "metadata": {}},
+        {"id": "Other", "values": [1.0, 0.0, 0.0, 0.0], "metadata": {}},
+    ], namespace="samples")
+
+    # Probing every list is exact
+    if request.param == "ivf":
+        index.build("object_attrs", nlist=2)
+        index.build("samples", nlist=2)
+        index.nprobe = 2
+
+    yield index
+    index.close()
+
+def test_recall_and_mrr(index):
+
+    result = evaluate(index, EMBEDDED, ks=[1, 2], repeat=2)
+
+    assert result["recall@1"] == pytest.approx((1 + 0 + 0.5) / 3)
+    assert result["recall@2"] == pytest.approx(1.0)
+    assert result["mrr"] == pytest.approx((1 + 0.5 + 1) / 3)
+    assert 0 <= result["p50_ms"] <= result["p99_ms"]
+
+def test_figures_per_namespace(index):
+
+    embedded = EMBEDDED + [(question("chunk", "Sample", namespace="samples"), [0.0, 0.0, 1.0, 0.0])]
+
+    result = evaluate(index, embedded, ks=[1, 2], repeat=1)
+
+    assert result["namespaces"]["object_attrs"] == {"questions": 3, "recall@1": pytest.approx(0.5), "recall@2": 1.0, "mrr": pytest.approx(2.5 / 3)}
+    assert result["namespaces"]["samples"] == {"questions": 1, "recall@1": 1.0, "recall@2": 1.0, "mrr": 1.0}
+    assert result["recall@1"] == pytest.approx((1.5 + 1) / 4)
+
+def test_every_namespace_has_questions():
+
+    questions = load_questions(DEFAULT_QUESTIONS)
+
+    assert {q["namespace"] for q in questions} == {"objects", "object_attrs", "samples"}
+    assert all(q["expected"] for q in questions)
+
+def test_uncached_questions_are_skipped(tmp_path):
+
+    cache = EmbeddingCache(str(tmp_path / "embeddings"))
+    cache.put_many("model", ["a"], [[1.0, 0.0]])
+
+    embedded, skipped = embed_questions([question("a", "A.a"), question("b", "B.b")], cache, "model", online=False)
+
+    assert [(q["question"], list(vector)) for q, vector in embedded] == [("a", [1.0, 0.0])]
+    assert skipped == ["b"]
+
+    cache.close()
+
+def test_configurations():
+
+    configs = list(configurations(["local", "pinecone"], ["flat", "ivf"], [1, 8], hybrid=True))
+
+    assert [label(config) for config in configs] == [
+        "local/flat",
+        "local/flat/hybrid",
+        "local/ivf/1",
+        "local/ivf/1/hybrid",
+        "local/ivf/8",
+        "local/ivf/8/hybrid",
+        "pinecone",
+    ]
+
+def test_compare_matches_runs_by_configuration(capsys):
+
+    baseline = {"runs": [{"config": {"backend": "local", "mode": "flat"}, "recall@1": 0.5, "mrr": 0.5}]}
+    results = {"runs": [
+        {"config": {"backend": "local", "mode": "flat"}, "recall@1": 0.75, "mrr": 0.5},
+        {"config": {"backend": "pinecone"}, "recall@1": 1.0, "mrr": 1.0},
+    ]}
+
+    compare(results, baseline)
+
+    assert capsys.readouterr().out == "[BASELINE] local/flat: recall@1 +0.250, mrr +0.000\n"
+
+def test_compare_per_namespace(capsys):
+
+    figures = {"questions": 2, "recall@1": 0.5, "mrr": 0.75}
+
+    baseline = {"runs": [{"config": {"backend": "local"}, "recall@1": 0.5, "namespaces": {"samples": figures}}]}
+    results = {"runs": [{"config": {"backend": "local"}, "recall@1": 0.5, "namespaces": {"samples": {**figures, "recall@1": 1.0}, "objects": figures}}]}
+
+    compare(results, baseline)
+
+    assert capsys.readouterr().out.splitlines() == [
+        "[BASELINE] local: recall@1 +0.000",
+        "[BASELINE] local samples: recall@1 +0.500, mrr +0.000",
+    ]
@@ -0,0 +1,51 @@
+import os
+
+from blob_store import BlobStore
+from conftest import recorded
+from retrieval import expand, metadata_of, search
+
+def blobs(root):
+    return sorted(name for _, _, names in os.walk(root) for name in names)
+
+def test_round_trip_and_dedup(tmp_path):
+
+    store = BlobStore(str(tmp_path / "payloads"))
+
+    payload = {"codeSample": "import adsk.core\n", "methods": ["add", "item"]}
+    digest = store.put(payload)
+
+    assert store.get(digest) == payload
+
+    # Same content under the same digest whatever the key order, stored once
+    assert store.put({"methods": ["add", "item"], "codeSample": "import adsk.core\n"}) == digest
+    assert store.put({**payload, "methods": ["add"]}) != digest
+    assert blobs(tmp_path / "payloads") == sorted([digest, store.put({**payload, "methods": ["add"]})])
+
+    assert store.get("0" * 64) is None
+
+def test_vectors_keep_the_payload_digest_only(scraper, docs_server):
+
+    docs_server.pages["/sample.htm"] = recorded("sample.htm")
+    tasks = [("Create Sketch Circles API Sample", "/sample.htm")] + docs_server.serve_classes(2, {"Cls0": "Deletes the first one.", "Cls1": "Removes the second."})
+
+    assert scraper.stream(tasks[:1], "samples") == 0
+    assert scraper.stream(tasks[1:], "object_attrs") == 0
+
+    code = scraper.extract_sample(recorded("sample.htm")).code
+
+    for namespace in ["samples", "object_attrs"]:
+
+        stored = dict(scraper.index.items(namespace))
+
+        assert stored and all("payload" in metadata for metadata in stored.values())
+        assert all(field not in metadata for metadata in stored.values() for field in scraper.PAYLOAD_FIELDS)
+
+    # Resolved from the store at query time, also for matches that come
+    # without metadata (keyword and exact-name hits)
+    [match] = search(scraper.index, scraper.openai.vector("Create Sketch Circles API Sample"), ["samples"], top_k=1)
+    metadata = expand(metadata_of(scraper.index, {"id": match["id"], "namespace": "samples"}), scraper.payload_store)
+
+    assert match["id"] == "Create Sketch Circles API Sample"
+    assert metadata["codeSample"] == code
+    assert metadata["sampleId"] == "Create Sketch Circles API Sample"
+
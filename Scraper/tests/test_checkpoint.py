@@ -0,0 +1,63 @@
+from checkpoint import Checkpoint
+
+def test_resume_reloads_completed_pages(tmp_path):
+
+    path = str(tmp_path / "ns.jsonl")
+
+    checkpoint = Checkpoint(path)
+    checkpoint.complete(["a.htm", "b.htm"], ["A", "B"])
+    checkpoint.close()
+
+    checkpoint = Checkpoint(path, resume=True)
+
+    assert checkpoint.done("a.htm") and checkpoint.done("b.htm")
+    assert checkpoint.ids == {"A", "B"}
+
+    checkpoint.close()
+
+    # Without resume the journal starts over
+    checkpoint = Checkpoint(path)
+
+    assert not checkpoint.done("a.htm")
+
+    checkpoint.close()
+
+def test_torn_last_line_is_ignored(tmp_path):
+
+    path = str(tmp_path / "ns.jsonl")
+
+    checkpoint = Checkpoint(path)
+    checkpoint.complete(["a.htm"])
+    checkpoint.close()
+
+    # A crash in the middle of a write
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"links": ["b.h')
+
+    checkpoint = Checkpoint(path, resume=True)
+    checkpoint.complete(["c.htm"])
+    checkpoint.close()
+
+    checkpoint = Checkpoint(path, resume=True)
+
+    assert [checkpoint.done(ln) for ln in ["a.htm", "b.htm", "c.htm"]] == [True, False, True]
+
+    checkpoint.close()
+
+def test_resumed_crawl_only_fetches_unfinished_pages(scraper, docs_server):
+
+    tasks = docs_server.serve_classes(4, {f"Cls{i}": f"Description number {i} " * (i + 1) for i in range(4)})
+    page = docs_server.pages.pop("/attr/Cls2.deleteMe.htm")
+
+    # The missing page is an error, so the journal is kept
+    assert scraper.stream(tasks, "object_attrs") == 1
+
+    docs_server.pages["/attr/Cls2.deleteMe.htm"] = page
+    docs_server.requests.clear()
+
+    assert scraper.stream(tasks, "object_attrs", resume=True) == 0
+    assert docs_server.paths() == ["/attr/Cls2.deleteMe.htm"]
+
+    # A finished crawl starts from scratch
+    assert scraper.stream(tasks, "object_attrs", resume=True) == 0
+    assert len(docs_server.paths()) == 5
@@ -0,0 +1,97 @@
+import ast
+
+import pytest
+
+from chunking import chunk_code, chunk_id, parent_id, units, windows
+
+def function(name, body_lines, decorators=()):
+    return [*decorators, f"def {name}():", *[f"    x{i} = {i}" for i in range(body_lines)], "    return x0"]
+
+SAMPLE = "\n".join([
+    "import adsk.core, adsk.fusion",
+    "",
+    "app = adsk.core.Application.get()",
+    "",
+    *function("short", 3),
+    "",
+    *function("cached", 3, decorators=["@functools.cache", "@staticmethod"]),
+    "",
+    *function("long", 40),
+    "",
+    "run()",
+])
+
+@pytest.mark.parametrize("length", [1, 10, 11, 12, 17, 18, 19, 40, 101])
+@pytest.mark.parametrize("max_lines, overlap", [(10, 2), (10, 0), (5, 4)])
+def test_windows_cover_the_range_within_max_lines(length, max_lines, overlap):
+
+    ranges = windows(3, 3 + length, max_lines, overlap)
+
+    assert ranges[0][0] == 3 and ranges[-1][1] == 3 + length
+    assert all(end - start <= max_lines for start, end, _ in ranges)
+
+    # Consecutive windows share at least `overlap` lines and never skip any
+    for (a_start, a_end, _), (b_start, b_end, _) in zip(ranges, ranges[1:]):
+        assert a_start < b_start <= a_end - overlap and b_end > a_end
+
+def test_short_tail_pulls_the_last_window_back():
+
+    assert windows(0, 12, 10, 2) == [(0, 10, False), (2, 12, False)]
+    assert windows(0, 10, 10, 2) == [(0, 10, False)]
+    assert windows(0, 20, 10, 2) == [(0, 10, False), (8, 18, False), (10, 20, False)]
+
+def test_units_keep_decorators_with_their_function():
+
+    lines = SAMPLE.splitlines()
+    spans = units(ast.parse(SAMPLE), len(lines))
+
+    # Contiguous and covering every line
+    assert spans[0][0] == 0 and spans[-1][1] == len(lines)
+    assert all(a[1] == b[0] for a, b in zip(spans, spans[1:]))
+
+    decorated = next(span for span in spans if lines[span[0]].startswith("@"))
+
+    assert lines[decorated[0]:decorated[1]][:3] == ["@functools.cache", "@staticmethod", "def cached():"]
+
+def test_chunks_respect_max_lines():
+
+    chunks = chunk_code(SAMPLE, max_lines=20, overlap=3)
+    lines = SAMPLE.splitlines()
+
+    assert all(end - start + 1 <= 20 for start, end, _ in chunks)
+    assert all(text == "\n".join(lines[start - 1:end]) for start, end, text in chunks)
+
+    # Every line but the blank separators is in some chunk
+    covered = set().union(*(range(start, end + 1) for start, end, _ in chunks))
+    assert covered >= {i + 1 for i, line in enumerate(lines) if line.strip()}
+
+def test_short_functions_merge_and_long_ones_split():
+
+    chunks = chunk_code(SAMPLE, max_lines=20, overlap=3)
+    texts = [text for _, _, text in chunks]
+
+    # The module header and both short functions fit one chunk, decorators included
+    assert "def short():" in texts[0] and "@functools.cache\n@staticmethod\ndef cached():" in texts[0]
+
+    # def long() spans lines 19 to 60, 42 lines in three windows, the last
+    # one pulled back to end with the function
+    assert [(start, end) for start, end, _ in chunks[1:4]] == [(19, 38), (36, 55), (41, 60)]
+    assert texts[-1].rstrip().endswith("run()")
+
+def test_unparseable_code_falls_back_to_windows():
+
+    code = "\n".join(["def broken(:"] + [f"line {i}" for i in range(24)])
+
+    chunks = chunk_code(code, max_lines=10, overlap=2)
+
+    assert [(start, end) for start, end, _ in chunks] == [(1, 10), (9, 18), (16, 25)]
+
+def test_blank_code_has_no_chunks():
+
+    assert chunk_code("") == []
+    assert chunk_code("\n\n   \n") == []
+
+def test_chunk_ids_round_trip():
+
+    assert parent_id(chunk_id("Create Sketch Circles", 2)) == "Create Sketch Circles"
+    assert parent_id("Create Sketch Circles") == "Create Sketch Circles"
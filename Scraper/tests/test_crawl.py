@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+import random
+import time
+
+import pytest
+
+from crawl import RateLimiter, crawl
+from fetch import Fetcher
+
+DESCRIPTIONS = {f"Cls{i}": f"Member {i} " + " ".join(random.Random(i).sample(["sketch", "body", "face", "edge", "joint", "plane", "axis", "point", "profile", "feature"], 6)) for i in range(12)}
+
+def test_results_keep_task_order():
+
+    def worker(i):
+        time.sleep(random.uniform(0, 0.02))
+        return i
+
+    assert list(crawl([(i,) for i in range(20)], worker, concurrency=8)) == list(range(20))
+
+def test_exception_surfaces_at_its_task():
+
+    def worker(i):
+
+        if i == 3:
+            raise ValueError(i)
+
+        return i
+
+    results = crawl([(i,) for i in range(6)], worker, concurrency=4)
+
+    assert [next(results) for _ in range(3)] == [0, 1, 2]
+
+    with pytest.raises(ValueError):
+        next(results)
+
+def test_collect_returns_toctree_order(scraper, docs_server):
+
+    # Jitter lets later pages finish first
+    docs_server.max_delay = 0.05
+    tasks = docs_server.serve_classes(12, DESCRIPTIONS)
+
+    results = []
+    scraper.collect(tasks, scraper.get_object_attr, results)
+
+    assert [id for id, _, _ in results] == [f"Cls{i}.deleteMe" for i in range(12)]
+    assert 1 < docs_server.peak <= scraper.CONCURRENCY
+
+def test_rate_limiter_spaces_requests_per_host(scraper, docs_server, monkeypatch):
+
+    rate = 20.0
+
+    monkeypatch.setattr(scraper, "fetcher", Fetcher(pool_size=4, rate_limiter=RateLimiter(rate), cache=scraper.page_cache))
+
+    tasks = docs_server.serve_classes(8, DESCRIPTIONS)
+
+    results = []
+    scraper.collect(tasks, scraper.get_object_attr, results)
+
+    scraper.fetcher.close()
+
+    # Four workers, but requests to the one host arrive 1 / rate apart
+    gaps = [b - a for a, b in zip(docs_server.arrivals, docs_server.arrivals[1:])]
+
+    assert len(results) == 8
+    assert min(gaps) >= 1.0 / rate - 0.01
+    assert docs_server.arrivals[-1] - docs_server.arrivals[0] >= 7 / rate - 0.01
+
+def test_rate_limiter_is_per_host(monkeypatch):
+
+    import crawl as module
+
+    sleeps = []
+    monkeypatch.setattr(module, "time", SimpleNamespace(monotonic=time.monotonic, sleep=sleeps.append))
+
+    limiter = RateLimiter(1.0)
+
+    for url in ["http://a/1", "http://b/1", "http://a/2"]:
+        limiter.wait(url)
+
+    # Only the second request to host a waits
+    assert len(sleeps) == 1 and sleeps[0] == pytest.approx(1.0, abs=0.05)
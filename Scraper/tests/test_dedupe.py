@@ -0,0 +1,52 @@
+from dedupe import Deduper, normalize
+
+def aliases(scraper):
+    return {id: entry.get("alias_of") for id, entry in scraper.manifest.entries["object_attrs"].items()}
+
+def test_canonical_reports_changed_text(tmp_path):
+
+    deduper = Deduper(str(tmp_path / "dedupe.sqlite"))
+
+    assert deduper.canonical("ns", "a", normalize("Deletes this object.")) == (None, False)
+    assert deduper.canonical("ns", "b", normalize("Deletes this object.")) == ("a", False)
+
+    # Same text again is not a change, new text is
+    assert deduper.canonical("ns", "a", normalize("Deletes this object.")) == (None, False)
+    assert deduper.canonical("ns", "a", normalize("Something else entirely, unrelated.")) == (None, True)
+
+    deduper.close()
+
+def test_first_page_in_toctree_order_is_canonical(scraper, docs_server):
+
+    docs_server.max_delay = 0.02
+    tasks = docs_server.serve_classes(10)
+
+    assert scraper.stream(tasks, "object_attrs") == 0
+
+    assert aliases(scraper) == {"Cls0.deleteMe": None, **{f"Cls{i}.deleteMe": "Cls0.deleteMe" for i in range(1, 10)}}
+
+def test_aliases_of_changed_canonical_are_rebuilt(scraper, docs_server, next_run):
+
+    tasks = docs_server.serve_classes(10)
+    scraper.stream(tasks, "object_attrs")
+
+    assert scraper.lexical.lookup("Cls4.deleteMe") == [("object_attrs", "Cls0.deleteMe")]
+
+    # Cls0 now describes something else, no vector holds the shared text
+    docs_server.serve_classes(10, {"Cls0": "Removes the sketch and every dimension constrained to it."})
+    next_run()
+
+    scraper.stream(tasks, "object_attrs")
+
+    # Cls0 comes first, so its old aliases are dropped before they are checked
+    # and the shared text gets a vector of its own again in the same run
+    rebuilt = {"Cls0.deleteMe": None, "Cls1.deleteMe": None, **{f"Cls{i}.deleteMe": "Cls1.deleteMe" for i in range(2, 10)}}
+
+    assert aliases(scraper) == rebuilt
+    assert scraper.lexical.lookup("Cls4.deleteMe") == [("object_attrs", "Cls1.deleteMe")]
+
+    # and stays that way
+    next_run()
+    scraper.stream(tasks, "object_attrs")
+
+    assert aliases(scraper) == rebuilt
@@ -0,0 +1,68 @@
+import os
+
+import numpy as np
+import pytest
+
+from embedding_cache import EmbeddingCache
+
+def test_only_missing_texts_are_requested(scraper, stub_openai):
+
+    first = scraper.get_embeddings(["a", "b"])
+
+    assert stub_openai.embedding_calls == [["a", "b"]]
+
+    second = scraper.get_embeddings(["b", "c", "a"])
+
+    assert stub_openai.embedding_calls == [["a", "b"], ["c"]]
+    assert np.allclose(second, [first[1], stub_openai.vector("c"), first[0]])
+
+def test_offline_run_needs_every_embedding_cached(scraper, stub_openai, monkeypatch):
+
+    from page_cache import CacheMiss
+
+    scraper.get_embeddings(["a"])
+    monkeypatch.setattr(scraper, "OFFLINE", True)
+
+    assert np.allclose(scraper.get_embeddings(["a"]), [stub_openai.vector("a")])
+
+    with pytest.raises(CacheMiss):
+        scraper.get_embeddings(["a", "b"])
+
+    assert len(stub_openai.embedding_calls) == 1
+
+def test_vectors_survive_reopen(tmp_path):
+
+    root = str(tmp_path / "embeddings")
+
+    cache = EmbeddingCache(root)
+    cache.put_many("model", ["a", "b"], [[1.0, 2.0], [3.0, 4.0]])
+    cache.close()
+
+    cache = EmbeddingCache(root)
+    a, b, c = cache.get_many("model", ["a", "b", "c"])
+
+    assert a.tolist() == [1.0, 2.0] and b.tolist() == [3.0, 4.0] and c is None
+    assert cache.get_many("other model", ["a"]) == [None]
+
+    with pytest.raises(ValueError):
+        cache.put_many("model", ["d"], [[1.0, 2.0, 3.0]])
+
+    cache.close()
+
+def test_torn_row_is_cut_back(tmp_path):
+
+    root = str(tmp_path / "embeddings")
+
+    cache = EmbeddingCache(root)
+    cache.put_many("model", ["a"], [[1.0, 2.0]])
+
+    # An interrupted run left half a row behind
+    with open(cache.vectors_path("model"), "ab") as f:
+        f.write(b"\0" * 4)
+
+    cache.put_many("model", ["b"], [[3.0, 4.0]])
+
+    assert os.path.getsize(cache.vectors_path("model")) == 2 * 2 * 4
+    assert [vector.tolist() for vector in cache.get_many("model", ["a", "b"])] == [[1.0, 2.0], [3.0, 4.0]]
+
+    cache.close()
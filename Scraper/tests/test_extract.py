@@ -0,0 +1,102 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from conftest import recorded
+from extract import ObjectAttrRecord, ObjectRecord, SampleRecord, extract_chunk, extract_object, extract_object_attr, extract_sample
+from parsing import BODY, available_backends, make_soup
+
+SAMPLE = SampleRecord(
+    description="Demonstrates creating sketch circles in various ways.",
+    code="""import adsk.core, adsk.fusion
+
+def run(context):
+    app = adsk.core.Application.get()
+    design = app.activeProduct
+    rootComp = design.rootComponent
+    sketch = rootComp.sketches.add(rootComp.xYConstructionPlane)
+    circles = sketch.sketchCurves.sketchCircles
+    circles.addByCenterRadius(adsk.core.Point3D.create(0, 0, 0), 2)""",
+)
+
+OBJECT = ObjectRecord(
+    description="Provides access to the sketch circles within a sketch. This collection also provides methods to create new circles.",
+    methods_table=[
+        "addByCenterRadius,Creates a sketch circle using the center point and radius.",
+        "item,Function that returns the specified sketch circle using an index into the collection.",
+    ],
+    properties_table=["count,Returns the number of circles in the sketch."],
+    samples_table=["Create Sketch Circles API Sample"],
+)
+
+METHOD = ObjectAttrRecord(
+    name="SketchCircles.addByCenterRadius",
+    description="Creates a sketch circle using the center point and radius.",
+    property_type="N/A",
+    method_parameters=["centerPoint,Base,The center point of the circle.", "radius,double,The radius of the circle in centimeters."],
+    method_return_values=["SketchCircle,Returns the newly created SketchCircle object or null if the creation failed."],
+    example_usage="# Uses no optional arguments.\nreturnValue = sketchCircles_var.addByCenterRadius(centerPoint, radius)\n",
+)
+
+PROPERTY = ObjectAttrRecord(
+    name="SketchCircles.count",
+    description="Returns the number of circles in the sketch.",
+    property_type="This is a read only property whose value is an integer.",
+    method_parameters=[],
+    method_return_values=[],
+    example_usage="# Get the value of the property.\npropertyValue = sketchCircles_var.count",
+)
+
+CASES = [
+    (extract_sample, "sample.htm", SAMPLE),
+    (extract_object, "object.htm", OBJECT),
+    (extract_object_attr, "method.htm", METHOD),
+    (extract_object_attr, "property.htm", PROPERTY),
+]
+
+# A table row without cells, which section_table can't read
+BROKEN = b'<html><body><h2 class="api">Methods</h2><table><tr><th>Name</th></tr><tr><th>item</th></tr></table></body></html>'
+
+@pytest.mark.parametrize("extract, page, expected", CASES)
+def test_recorded_pages(extract, page, expected):
+    assert extract(recorded(page)) == expected
+
+@pytest.mark.parametrize("backend", available_backends())
+@pytest.mark.parametrize("strainer", [None, BODY])
+@pytest.mark.parametrize("extract, page, expected", CASES)
+def test_backends_agree(extract, page, expected, backend, strainer):
+
+    html = recorded(page)
+
+    assert extract(html, make_soup(html, backend=backend, strainer=strainer)) == expected
+
+def test_missing_sections_fall_back():
+
+    record = extract_object_attr(b"<html><body><h1 class=\"api\">Sketch.name Property</h1></body></html>")
+
+    assert record == ObjectAttrRecord("Sketch.name", "", "N/A", [], [], "")
+    assert extract_sample(b"<html><body></body></html>").code is None
+
+def test_chunk_isolates_failing_pages():
+
+    pages = [recorded("object.htm"), BROKEN, recorded("object.htm")]
+
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        results = pool.submit(extract_chunk, extract_object, pages).result()
+
+    assert [record for record, _ in results] == [OBJECT, None, OBJECT]
+    assert results[0][1] is None and results[2][1] is None
+    assert "IndexError" in results[1][1]
+
+def test_stream_counts_failing_page_as_error(scraper, docs_server):
+
+    for name in ["method.htm", "property.htm"]:
+        docs_server.pages[f"/attr/{name}"] = recorded(name)
+
+    docs_server.pages["/attr/broken.htm"] = BROKEN.replace(b"Methods", b"Parameters")
+
+    # PARSE_CHUNK is 3, so all three pages share a chunk
+    tasks = [("/attr/method.htm",), ("/attr/broken.htm",), ("/attr/property.htm",)]
+
+    assert scraper.stream(tasks, "object_attrs") == 1
+    assert sorted(scraper.manifest.entries["object_attrs"]) == ["SketchCircles.addByCenterRadius", "SketchCircles.count"]
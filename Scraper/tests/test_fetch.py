@@ -0,0 +1,174 @@
+from types import SimpleNamespace
+
+import time
+import os
+
+import pytest
+import requests
+
+from crawl import RateLimiter
+from fetch import Fetcher
+from page_cache import CacheMiss, PageCache
+
+@pytest.fixture
+def page_cache(tmp_path):
+
+    cache = PageCache(str(tmp_path / "pages"))
+    yield cache
+    cache.close()
+
+@pytest.fixture
+def fetchers(page_cache):
+
+    opened = []
+
+    def open_fetcher(offline=False, max_retries=0):
+        fetcher = Fetcher(pool_size=2, max_retries=max_retries, rate_limiter=RateLimiter(0), cache=page_cache, offline=offline)
+        opened.append(fetcher)
+        return fetcher
+
+    yield open_fetcher
+
+    for fetcher in opened:
+        fetcher.close()
+
+@pytest.fixture
+def sleeps(monkeypatch):
+
+    # Backoff delays are recorded instead of slept
+    import fetch
+
+    delays = []
+    monkeypatch.setattr(fetch, "time", SimpleNamespace(perf_counter=time.perf_counter, sleep=delays.append))
+
+    return delays
+
+def blobs(cache):
+    return [name for _, _, names in os.walk(cache.blob_dir) for name in names]
+
+def test_unchanged_page_is_revalidated(docs_server, page_cache, fetchers):
+
+    docs_server.pages["/a.htm"] = b"<html>a</html>"
+    url = docs_server.url + "/a.htm"
+
+    fetcher = fetchers()
+
+    assert fetcher.get(url).content == b"<html>a</html>"
+    assert fetcher.stats[url]["cache"] == "miss"
+
+    etag = page_cache.get(url)["etag"]
+
+    # The second GET is conditional, the 304 is answered from the cache
+    rsp = fetcher.get(url)
+
+    assert rsp.status_code == 200
+    assert rsp.content == b"<html>a</html>"
+    assert (fetcher.stats[url]["status"], fetcher.stats[url]["cache"]) == (304, "revalidated")
+    assert docs_server.paths(etag=True) == [("/a.htm", None), ("/a.htm", etag)]
+
+def test_changed_page_replaces_cached_copy(docs_server, page_cache, fetchers):
+
+    docs_server.pages["/a.htm"] = b"<html>old</html>"
+    url = docs_server.url + "/a.htm"
+
+    fetcher = fetchers()
+    fetcher.get(url)
+
+    docs_server.pages["/a.htm"] = b"<html>new</html>"
+
+    assert fetcher.get(url).content == b"<html>new</html>"
+    assert fetcher.stats[url]["cache"] == "miss"
+    assert page_cache.get(url)["body"] == b"<html>new</html>"
+
+def test_identical_bodies_share_a_blob(docs_server, page_cache, fetchers):
+
+    docs_server.pages["/a.htm"] = docs_server.pages["/b.htm"] = b"<html>same</html>"
+
+    fetcher = fetchers()
+    fetcher.get(docs_server.url + "/a.htm")
+    fetcher.get(docs_server.url + "/b.htm")
+
+    assert len(blobs(page_cache)) == 1
+
+def test_offline_serves_cache_without_requests(docs_server, page_cache, fetchers):
+
+    docs_server.pages["/a.htm"] = b"<html>a</html>"
+    cached, uncached = docs_server.url + "/a.htm", docs_server.url + "/b.htm"
+
+    fetchers().get(cached)
+    requests = len(docs_server.requests)
+
+    offline = fetchers(offline=True)
+
+    assert offline.get(cached).content == b"<html>a</html>"
+    assert offline.stats[cached]["cache"] == "hit"
+
+    with pytest.raises(CacheMiss):
+        offline.get(uncached)
+
+    assert len(docs_server.requests) == requests
+
+def test_page_cache_survives_reopen(tmp_path):
+
+    cache = PageCache(str(tmp_path / "pages"))
+    cache.put("http://docs/a.htm", b"<html>a</html>", etag='"1"', encoding="utf-8")
+    cache.close()
+
+    cache = PageCache(str(tmp_path / "pages"))
+
+    entry = cache.get("http://docs/a.htm")
+
+    assert (entry["body"], entry["etag"], entry["encoding"]) == (b"<html>a</html>", '"1"', "utf-8")
+    assert cache.get("http://docs/b.htm") is None
+
+    cache.close()
+
+def test_server_errors_are_retried(docs_server, fetchers, sleeps):
+
+    docs_server.pages["/a.htm"] = b"<html>a</html>"
+    docs_server.failures["/a.htm"] = [(503, {}), (502, {})]
+    url = docs_server.url + "/a.htm"
+
+    fetcher = fetchers(max_retries=3)
+
+    assert fetcher.get(url).content == b"<html>a</html>"
+    assert fetcher.stats[url]["retries"] == 2
+    assert fetcher.summary()["retried_pages"] == 1
+
+    # Full jitter under backoff * 2^attempt
+    assert len(sleeps) == 2
+    assert 0 <= sleeps[0] <= fetcher.backoff and 0 <= sleeps[1] <= 2 * fetcher.backoff
+
+def test_retry_after_is_honoured(docs_server, fetchers, sleeps):
+
+    docs_server.pages["/a.htm"] = b"<html>a</html>"
+    docs_server.failures["/a.htm"] = [(429, {"Retry-After": "7"}), (429, {"Retry-After": "600"})]
+
+    fetcher = fetchers(max_retries=3)
+    fetcher.get(docs_server.url + "/a.htm")
+
+    # Seconds are taken as given, capped at max_backoff
+    assert sleeps == [7.0, fetcher.max_backoff]
+
+def test_gives_up_after_max_retries(docs_server, fetchers, sleeps):
+
+    docs_server.pages["/a.htm"] = b"<html>a</html>"
+    docs_server.failures["/a.htm"] = [(503, {})] * 5
+    url = docs_server.url + "/a.htm"
+
+    fetcher = fetchers(max_retries=2)
+
+    with pytest.raises(requests.HTTPError):
+        fetcher.get(url)
+
+    assert len(docs_server.paths()) == 3
+    assert len(sleeps) == 2
+    assert (fetcher.stats[url]["status"], fetcher.stats[url]["retries"]) == (503, 2)
+
+def test_not_found_is_not_retried(docs_server, fetchers, sleeps):
+
+    with pytest.raises(requests.HTTPError):
+        fetchers(max_retries=3).get(docs_server.url + "/missing.htm")
+
+    assert len(docs_server.paths()) == 1
+    assert sleeps == []
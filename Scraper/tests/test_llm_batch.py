@@ -0,0 +1,288 @@
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import threading
+import json
+import time
+
+import openai
+import pytest
+
+from conftest import recorded
+from llm_batch import run_async, run_batch
+
+class OpenAIServer:
+
+    # Local stand-in for the parts of the OpenAI API llm_batch uses: file
+    # uploads and contents, batches, and chat completions. A batch stays
+    # in_progress for `polls` retrievals, then completes with "done: <last
+    # message>" for every request except those whose custom_id is in failing.
+    # Chat completions take `delay` seconds and fail for contents in failing.
+
+    def __init__(self, polls=1, failing=(), delay=0.0):
+
+        self.polls = polls
+        self.failing = set(failing)
+        self.delay = delay
+
+        self.files = {}
+        self.batches = {}
+        self.chat_requests = []
+
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def send_json(self, document, status=200):
+
+                body = json.dumps(document).encode("utf-8")
+
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def read_body(self):
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def do_GET(self):
+
+                parts = self.path.strip("/").split("/")
+
+                if parts[:2] == ["v1", "batches"]:
+                    self.send_json(server.retrieve(parts[2]))
+                elif parts[:2] == ["v1", "files"] and parts[-1] == "content":
+
+                    body = server.files[parts[2]]
+
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/octet-stream")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                else:
+                    self.send_json({"error": {"message": "not found"}}, 404)
+
+            def do_POST(self):
+
+                body = self.read_body()
+
+                if self.path == "/v1/files":
+
+                    # The one multipart field holding a file
+                    message = BytesParser().parsebytes(b"Content-Type: " + self.headers["Content-Type"].encode("ascii") + b"\r\n\r\n" + body)
+                    upload = next(part for part in message.get_payload() if part.get_filename())
+
+                    self.send_json(server.upload(upload.get_payload(decode=True)))
+
+                elif self.path == "/v1/batches":
+                    self.send_json(server.create(json.loads(body)))
+
+                elif self.path == "/v1/chat/completions":
+
+                    status, document = server.complete(json.loads(body))
+                    self.send_json(document, status)
+
+                else:
+                    self.send_json({"error": {"message": "not found"}}, 404)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    # Files and batches
+
+    def upload(self, content):
+
+        with self.lock:
+            file_id = f"file-{len(self.files)}"
+            self.files[file_id] = content
+
+        return {"id": file_id, "object": "file", "bytes": len(content), "created_at": 0, "filename": "batch.jsonl", "purpose": "batch", "status": "processed"}
+
+    def uploaded(self, file_id):
+        return [json.loads(line) for line in self.files[file_id].decode("utf-8").splitlines()]
+
+    def batch(self, batch_id, status, output_file_id=None, error_file_id=None):
+
+        job = self.batches[batch_id]
+
+        return {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": job["endpoint"],
+            "input_file_id": job["input_file_id"],
+            "completion_window": "24h",
+            "status": status,
+            "created_at": 0,
+            "output_file_id": output_file_id,
+            "error_file_id": error_file_id,
+            "request_counts": {"total": len(self.uploaded(job["input_file_id"])), "completed": 0, "failed": 0},
+        }
+
+    def create(self, request):
+
+        with self.lock:
+            batch_id = f"batch-{len(self.batches)}"
+            self.batches[batch_id] = {**request, "polls": 0}
+
+        return self.batch(batch_id, "validating")
+
+    def retrieve(self, batch_id):
+
+        with self.lock:
+
+            job = self.batches[batch_id]
+            job["polls"] += 1
+
+            if job["polls"] <= self.polls:
+                return self.batch(batch_id, "in_progress")
+
+            output, errors = [], []
+
+            for line in self.uploaded(job["input_file_id"]):
+
+                if line["custom_id"] in self.failing:
+                    errors.append({"custom_id": line["custom_id"], "response": None, "error": {"code": "rate_limit_exceeded", "message": "rate limited"}})
+                    continue
+
+                content = f" done: {line['body']['messages'][-1]['content']} "
+                body = {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}]}
+                output.append({"custom_id": line["custom_id"], "response": {"status_code": 200, "body": body}, "error": None})
+
+            self.files[f"{batch_id}-out"] = "\n".join(json.dumps(record) for record in output).encode("utf-8")
+            self.files[f"{batch_id}-err"] = "\n".join(json.dumps(record) for record in errors).encode("utf-8")
+
+            return self.batch(batch_id, "completed", f"{batch_id}-out", f"{batch_id}-err" if errors else None)
+
+    # Chat completions
+
+    def complete(self, request):
+
+        content = request["messages"][-1]["content"]
+
+        with self.lock:
+            self.chat_requests.append(request)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+        try:
+            time.sleep(self.delay)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+        if content in self.failing:
+            return 500, {"error": {"message": "server error", "type": "server_error"}}
+
+        return 200, {
+            "id": "chatcmpl-0",
+            "object": "chat.completion",
+            "created": 0,
+            "model": request["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": f"done: {content}\n"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        }
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def openai_server():
+
+    server = OpenAIServer()
+    yield server
+    server.close()
+
+@pytest.fixture
+def client(openai_server):
+
+    client = openai.OpenAI(api_key="test", base_url=openai_server.url, max_retries=0)
+    yield client
+    client.close()
+
+def requests(*contents):
+    return [(f"id-{content}", {"model": "m", "messages": [{"role": "user", "content": content}]}) for content in contents]
+
+def test_batch_results_and_errors(openai_server, client, tmp_path):
+
+    openai_server.polls = 2
+    openai_server.failing = {"id-b"}
+
+    results = run_batch(client, requests("a", "b", "c"), str(tmp_path / "batch.jsonl"), poll_interval=0)
+
+    assert results == {"id-a": "done: a", "id-c": "done: c"}
+    assert [line["custom_id"] for line in openai_server.uploaded("file-0")] == ["id-a", "id-b", "id-c"]
+    assert not (tmp_path / "batch.jsonl.state.json").exists()
+
+def test_interrupted_batch_is_resumed(openai_server, client, tmp_path):
+
+    openai_server.polls = 10
+    path = str(tmp_path / "batch.jsonl")
+
+    with pytest.raises(TimeoutError):
+        run_batch(client, requests("a", "b"), path, poll_interval=0, timeout=0)
+
+    # Same requests pick the submitted job up again, different ones submit anew
+    openai_server.polls = 0
+
+    assert run_batch(client, requests("b", "a"), path, poll_interval=0) == {"id-a": "done: a", "id-b": "done: b"}
+    assert list(openai_server.batches) == ["batch-0"]
+
+    assert run_batch(client, requests("a", "b", "c"), path, poll_interval=0)["id-c"] == "done: c"
+    assert list(openai_server.batches) == ["batch-0", "batch-1"]
+
+def test_async_bounds_concurrency_and_drops_failures(openai_server):
+
+    openai_server.delay = 0.05
+    openai_server.failing = {"r3"}
+
+    client = openai.AsyncOpenAI(api_key="test", base_url=openai_server.url, max_retries=0)
+
+    results = run_async(requests(*[f"r{i}" for i in range(10)]), concurrency=3, client=client)
+
+    assert results == {f"id-r{i}": f"done: r{i}" for i in range(10) if i != 3}
+    assert openai_server.peak == 3
+
+def test_prefetched_descriptions_are_read_from_cache(scraper, docs_server, stub_openai, openai_server, client, monkeypatch):
+
+    sample = recorded("sample.htm")
+
+    # Two samples share a title, the one before them has the same code as the first
+    docs_server.pages["/a.htm"] = docs_server.pages["/copy.htm"] = sample
+    docs_server.pages["/b.htm"] = sample.replace(b"addByCenterRadius(adsk.core.Point3D.create(0, 0, 0), 2)", b"addByCenterRadius(adsk.core.Point3D.create(0, 0, 0), 3)")
+
+    openai_server.polls = 0
+    monkeypatch.setattr(scraper, "openai", client)
+
+    scraper.prefetch_descriptions([("Copy", "/copy.htm"), ("Circles", "/a.htm"), ("Circles", "/b.htm")], mode="batch")
+
+    # One request per distinct body, each under its own cache key
+    uploaded = openai_server.uploaded("file-0")
+
+    assert len(uploaded) == 2
+    assert len({line["custom_id"] for line in uploaded}) == 2
+
+    # Every description is then read back from the cache under its own key
+    monkeypatch.setattr(scraper, "openai", stub_openai)
+
+    for page in ["/a.htm", "/b.htm"]:
+
+        record = scraper.extract_sample(docs_server.pages[page])
+        key, body = scraper.description_request(record.description, record.code)
+
+        assert scraper.gen_description(record.description, record.code) == f"done: {body['messages'][-1]['content']}"
+
+    assert stub_openai.chat_calls == []
@@ -0,0 +1,51 @@
+import time
+
+from llm_cache import LLMCache
+
+def test_description_is_generated_once(scraper, stub_openai):
+
+    first = scraper.gen_description("Draws a circle.", "sketch.sketchCurves.sketchCircles.addByCenterRadius(center, 2)")
+    second = scraper.gen_description("Draws a circle.", "sketch.sketchCurves.sketchCircles.addByCenterRadius(center, 2)")
+
+    assert first == second
+    assert len(stub_openai.chat_calls) == 1
+    assert scraper.llm_cache.stats()["hits"] == 1
+
+    # Any input that reaches the prompt is part of the key
+    scraper.gen_description("Draws a circle.", "sketch.sketchCurves.sketchCircles.addByCenterRadius(center, 3)")
+
+    assert len(stub_openai.chat_calls) == 2
+
+def test_outputs_survive_reopen(tmp_path):
+
+    path = str(tmp_path / "llm.sqlite")
+
+    cache = LLMCache(path)
+    cache.put(LLMCache.key("model", "prompt"), "output")
+    cache.close()
+
+    cache = LLMCache(path)
+
+    assert cache.get(LLMCache.key("model", "prompt")) == "output"
+    assert cache.get(LLMCache.key("model", "other prompt")) is None
+
+    cache.close()
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+
+    cache = LLMCache(str(tmp_path / "llm.sqlite"), max_bytes=25)
+
+    # Apart enough for distinct last_used stamps on coarse clocks
+    for step in [lambda: cache.put("a", "x" * 10), lambda: cache.put("b", "x" * 10), lambda: cache.get("a")]:
+        step()
+        time.sleep(0.02)
+
+    # Reading a made b the oldest
+    cache.put("c", "x" * 10)
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+    cache.close()
@@ -0,0 +1,127 @@
+from manifest import Manifest, content_hash
+
+def test_entries_become_current_on_commit(tmp_path):
+
+    path = str(tmp_path / "manifest.json")
+    manifest = Manifest(path)
+
+    assert manifest.check("ns", "a", "h1", "m")
+    assert manifest.check("ns", "b", "h1", "m")
+
+    # Only upserted ids are committed, b is retried next run
+    manifest.commit("ns", ["a"])
+
+    manifest = Manifest(path)
+
+    assert not manifest.check("ns", "a", "h1", "m")
+    assert manifest.check("ns", "b", "h1", "m")
+
+    # A new hash or model means regenerating
+    assert manifest.check("ns", "a", "h2", "m")
+    assert manifest.check("ns", "a", "h1", "other")
+
+def test_unseen_ids_are_stale(tmp_path):
+
+    path = str(tmp_path / "manifest.json")
+    manifest = Manifest(path)
+
+    for id in ["a", "b", "c"]:
+        manifest.check("ns", id, "h", "m")
+
+    manifest.commit("ns", ["a", "b", "c"])
+
+    manifest = Manifest(path)
+    manifest.check("ns", "b", "h", "m")
+
+    assert manifest.stale_ids("ns") == ["a", "c"]
+
+    manifest.remove("ns", ["a", "c"])
+
+    assert list(Manifest(path).entries["ns"]) == ["b"]
+
+def test_alias_waits_for_its_canonical(tmp_path):
+
+    path = str(tmp_path / "manifest.json")
+    manifest = Manifest(path)
+
+    manifest.check("ns", "a", "h", "m")
+    manifest.check("ns", "b", "h", "m")
+
+    # a isn't indexed yet, b stays pending until a's vector is upserted
+    assert not manifest.alias("ns", "b", "a")
+    assert "b" not in manifest.entries.get("ns", {})
+
+    manifest.commit("ns", ["a"])
+
+    assert manifest.entries["ns"]["b"]["alias_of"] == "a"
+    assert manifest.aliases_of("ns", ["a"]) == ["b"]
+
+def test_alias_of_indexed_canonical_replaces_own_vector(tmp_path):
+
+    manifest = Manifest(str(tmp_path / "manifest.json"))
+
+    for id in ["a", "b"]:
+        manifest.check("ns", id, id, "m")
+
+    manifest.commit("ns", ["a", "b"])
+
+    # b now has a's text: its own vector is redundant and the alias is current at once
+    manifest.check("ns", "b", "a", "m")
+
+    assert manifest.alias("ns", "b", "a")
+    assert manifest.entries["ns"]["b"] == {"hash": "a", "model": "m", "alias_of": "a"}
+
+def test_children_no_longer_produced(tmp_path):
+
+    manifest = Manifest(str(tmp_path / "manifest.json"))
+
+    manifest.check("ns", "a", "h1", "m")
+    assert manifest.set_children("ns", "a", ["a#0", "a#1", "a#2"]) == []
+    manifest.commit("ns", ["a"])
+
+    manifest.check("ns", "a", "h2", "m")
+
+    assert manifest.set_children("ns", "a", ["a#0"]) == ["a#1", "a#2"]
+    assert manifest.children_of("ns", ["a"]) == ["a#0", "a#1", "a#2"]
+
+def test_content_hash_ignores_key_order():
+
+    assert content_hash({"a": 1, "b": [1, 2]}) == content_hash({"b": [1, 2], "a": 1})
+    assert content_hash({"a": 1}) != content_hash({"a": 2})
+
+def test_second_crawl_only_regenerates_changed_pages(scraper, docs_server, stub_openai, next_run, monkeypatch):
+
+    descriptions = {
+        "Cls0": "Deletes this object.",
+        "Cls1": "Returns the bounding box of the body in model space.",
+        "Cls2": "Suppresses the feature and every feature after it in the timeline.",
+        "Cls3": "Exports the active design to a STEP file at the given path.",
+    }
+
+    tasks = docs_server.serve_classes(4, descriptions)
+    scraper.stream(tasks, "object_attrs")
+
+    assert sum(len(call) for call in stub_openai.embedding_calls) == 4
+
+    # Cls1 changed and Cls3 is gone from the docs
+    descriptions["Cls1"] = "Removes the sketch and every dimension constrained to it."
+    docs_server.serve_classes(4, descriptions)
+    next_run()
+    stub_openai.embedding_calls.clear()
+
+    upserted = []
+    upsert_vectors = scraper.upsert_vectors
+
+    def spy(vectors, namespace):
+        upserted.extend(vector["id"] for vector in vectors)
+        return upsert_vectors(vectors, namespace)
+
+    monkeypatch.setattr(scraper, "upsert_vectors", spy)
+
+    scraper.stream(tasks[:3], "object_attrs")
+    scraper.prune_embeddings("object_attrs")
+
+    assert upserted == ["Cls1.deleteMe"]
+    assert [len(call) for call in stub_openai.embedding_calls] == [1]
+    assert sorted(scraper.manifest.entries["object_attrs"]) == ["Cls0.deleteMe", "Cls1.deleteMe", "Cls2.deleteMe"]
+    assert scraper.lexical.lookup("Cls3.deleteMe") == []
@@ -0,0 +1,82 @@
+import json
+import re
+
+from metrics import Metrics
+
+# One Prometheus text format sample: name, optional {key="value",...}, number
+SAMPLE = re.compile(r'^[a-z_]+(\{[a-z_]+="[^"]*"(,[a-z_]+="[^"]*")*\})? -?[0-9.e+-]+$')
+
+def samples(text):
+
+    lines = text.splitlines()
+
+    assert text.endswith("\n")
+    assert all(line.startswith("# TYPE ") or SAMPLE.match(line) for line in lines), lines
+
+    return {line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1]) for line in lines if not line.startswith("#")}
+
+def test_exposition_formats(tmp_path):
+
+    metrics = Metrics()
+
+    metrics.observe("fetch", 0.25)
+    metrics.observe("fetch", 0.5)
+    metrics.count("pages")
+    metrics.count("pages", 2)
+    metrics.count("tokens", 10, type="prompt", model="m")
+    metrics.count("tokens", 5, model="m", type="prompt")
+
+    text = metrics.prometheus()
+    values = samples(text)
+
+    assert values['scraper_stage_seconds_total{stage="fetch"}'] == 0.75
+    assert values['scraper_stage_calls_total{stage="fetch"}'] == 2
+    assert values['scraper_stage_max_seconds{stage="fetch"}'] == 0.5
+    assert values["scraper_pages_total"] == 3
+    assert values['scraper_tokens_total{model="m",type="prompt"}'] == 15
+
+    # One TYPE line per metric, before its samples
+    types = [line.split()[2] for line in text.splitlines() if line.startswith("# TYPE")]
+
+    assert len(types) == len(set(types))
+    assert "# TYPE scraper_tokens_total counter" in text.splitlines()
+
+    metrics.export(str(tmp_path / "run.prom"))
+    metrics.export(str(tmp_path / "run.json"))
+
+    assert samples((tmp_path / "run.prom").read_text(encoding="utf-8")).keys() == values.keys()
+
+    snapshot = json.loads((tmp_path / "run.json").read_text(encoding="utf-8"))
+
+    assert snapshot["stages"]["fetch"] == {"calls": 2, "seconds": 0.75, "max": 0.5}
+    assert {"name": "tokens", "labels": {"model": "m", "type": "prompt"}, "value": 15} in snapshot["counters"]
+
+def test_stream_counts(scraper, docs_server, monkeypatch, tmp_path):
+
+    monkeypatch.setattr(scraper, "metrics", Metrics())
+
+    tasks = docs_server.serve_classes(3, {
+        "Cls0": "Deletes the sketch and every curve drawn in it.",
+        "Cls1": "Removes this construction plane from the timeline.",
+        "Cls2": "Erases the custom graphics group along with its entities.",
+    })
+
+    assert scraper.stream(tasks, "object_attrs") == 0
+
+    scraper.metrics.export(str(tmp_path / "run.prom"))
+    values = samples((tmp_path / "run.prom").read_text(encoding="utf-8"))
+
+    assert values["scraper_pages_total"] == 3
+    assert values["scraper_bytes_total"] == sum(len(page) for page in docs_server.pages.values())
+    assert values['scraper_vectors_total{namespace="object_attrs"}'] == 3
+    # The stub reports one prompt token per embedded text
+    assert values['scraper_requests_total{kind="embed",model="text-embedding-3-small"}'] == len(scraper.openai.embedding_calls)
+    assert values['scraper_tokens_total{kind="embed",model="text-embedding-3-small",type="prompt"}'] == 3
+
+    for stage in ["fetch", "parse", "embed", "upsert"]:
+        assert values[f'scraper_stage_calls_total{{stage="{stage}"}}'] >= 1
+
+    for stage in ["fetch", "parse", "describe", "embed", "upsert"]:
+        assert values[f'scraper_items_total{{namespace="object_attrs",outcome="errors",stage="{stage}"}}'] == 0
+
+    assert values['scraper_items_total{namespace="object_attrs",outcome="processed",stage="fetch"}'] == 3
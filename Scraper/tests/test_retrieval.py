@@ -0,0 +1,103 @@
+import pytest
+
+from lexical_index import LexicalIndex, identifiers
+from retrieval import RRF_K, fuse, hybrid_search
+from vector_index import open_index
+
+ATTRS = {
+    "SketchCircles.addByCenterRadius": ([1.0, 0.0, 0.0, 0.0], {"className": "SketchCircles", "attributeName": "addByCenterRadius", "methodParams": "centerPoint, radius"}),
+    "SketchCircles.addByThreePoints": ([0.0, 1.0, 0.0, 0.0], {"className": "SketchCircles", "attributeName": "addByThreePoints", "methodParams": "pointOne, pointTwo, pointThree"}),
+    "SketchLines.addByTwoPoints": ([0.0, 0.0, 1.0, 0.0], {"className": "SketchLines", "attributeName": "addByTwoPoints", "methodParams": "startPoint, endPoint"}),
+    "Sketch.profiles": ([0.0, 0.0, 0.0, 1.0], {"className": "Sketch", "attributeName": "profiles"}),
+}
+
+@pytest.fixture
+def lexical(tmp_path):
+
+    lexical = LexicalIndex(str(tmp_path / "lexical.sqlite"))
+    lexical.add([{"id": id, "metadata": metadata} for id, (_, metadata) in ATTRS.items()], "object_attrs")
+    lexical.add([{"id": "SketchCircles", "metadata": {"className": "SketchCircles"}}], "objects")
+
+    yield lexical
+    lexical.close()
+
+@pytest.fixture
+def index(tmp_path):
+
+    index = open_index("local", root=str(tmp_path / "index"), mode="flat")
+    index.upsert([{"id": id, "values": values, "metadata": {"text": id}} for id, (values, _) in ATTRS.items()], namespace="object_attrs")
+
+    yield index
+    index.close()
+
+def unreachable(text):
+    raise AssertionError(f"{text!r} should not need an embedding")
+
+def test_identifiers_in_questions():
+
+    assert identifiers("Is adsk.fusion.SketchCircles.addByCenterRadius the right sketch call?") == [
+        "adsk.fusion.SketchCircles.addByCenterRadius",
+        "fusion.SketchCircles.addByCenterRadius",
+        "SketchCircles.addByCenterRadius",
+        "addByCenterRadius",
+    ]
+
+def test_exact_name_is_answered_first(index, lexical):
+
+    matches = hybrid_search(index, lexical, "How do I call SketchCircles.addByCenterRadius with a point?", unreachable, top_k=3)
+
+    assert (matches[0]["namespace"], matches[0]["id"], matches[0]["sources"]) == ("object_attrs", "SketchCircles.addByCenterRadius", ["exact"])
+
+    # Topped up with keyword matches, never repeating the exact one
+    assert len(matches) == 3
+    assert len({(match["namespace"], match["id"]) for match in matches}) == 3
+
+def test_alias_answers_with_its_target(lexical):
+
+    lexical.add_alias("SketchCircles.item", "SketchCircles.addByThreePoints", "object_attrs")
+
+    assert lexical.lookup("SketchCircles.item") == [("object_attrs", "SketchCircles.addByThreePoints")]
+    assert lexical.lookup("SketchCircles.item", namespaces=["objects"]) == []
+
+def test_bm25_ranks_matching_terms_first(lexical):
+
+    ids = [id for id, _ in lexical.search("circle through three points", "object_attrs")]
+
+    # Both add*Points methods share "points", only one has "three"
+    assert ids[:2] == ["SketchCircles.addByThreePoints", "SketchLines.addByTwoPoints"]
+    assert "SketchCircles.addByCenterRadius" not in ids and "Sketch.profiles" not in ids
+
+    # A changed document is picked up on the next search
+    lexical.remove(["SketchCircles.addByThreePoints"], "object_attrs")
+
+    assert [id for id, _ in lexical.search("circle through three points", "object_attrs")] == ["SketchLines.addByTwoPoints"]
+
+def test_fusion_merges_and_deduplicates():
+
+    vector = [{"id": "A", "namespace": "ns", "source": "vector"}, {"id": "B", "namespace": "ns", "source": "vector"}]
+    keyword = [{"id": "B", "namespace": "ns", "source": "bm25"}, {"id": "C", "namespace": "ns", "source": "bm25"}, {"id": "A", "namespace": "other", "source": "bm25"}]
+
+    fused = fuse([vector, keyword], top_k=10)
+
+    assert [(match["namespace"], match["id"]) for match in fused] == [("ns", "B"), ("ns", "A"), ("ns", "C"), ("other", "A")]
+    assert fused[0]["score"] == pytest.approx(1 / (RRF_K + 2) + 1 / (RRF_K + 1))
+    assert fused[0]["sources"] == ["vector", "bm25"]
+
+def test_hybrid_search_fuses_vector_and_keyword_rankings(index, lexical):
+
+    embedded = []
+
+    def embed(text):
+        embedded.append(text)
+        return [0.0, 0.9, 0.1, 0.0]
+
+    matches = hybrid_search(index, lexical, "circle through three points", embed, namespaces=["object_attrs"], top_k=4)
+    ids = [match["id"] for match in matches]
+
+    assert embedded == ["circle through three points"]
+    assert len(ids) == len(set(ids)) == 4
+
+    # First in both rankings
+    assert ids[0] == "SketchCircles.addByThreePoints"
+    assert matches[0]["sources"] == ["bm25", "vector"]
+    assert matches[0]["metadata"] == {"text": "SketchCircles.addByThreePoints"}
@@ -0,0 +1,74 @@
+import threading
+import sqlite3
+
+import numpy as np
+import pytest
+
+from vector_index import open_index
+
+@pytest.fixture(params=["flat", "ivf"])
+def index(tmp_path, request):
+
+    index = open_index("local", root=str(tmp_path / "index"), mode=request.param)
+    yield index
+    index.close()
+
+def vectors(count, dim=4, seed=0, prefix="v"):
+
+    values = np.random.default_rng(seed).normal(size=(count, dim))
+
+    return [{"id": f"{prefix}{i}", "values": values[i].tolist(), "metadata": {"i": i}} for i in range(count)]
+
+def test_upsert_more_ids_than_sqlite_variables(index):
+
+    # Builds differ in how many host parameters a statement takes, 999 is the
+    # lowest SQLite has shipped with
+    index.db.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+
+    batch = vectors(2000)
+
+    index.upsert(batch, namespace="ns")
+    index.upsert(batch, namespace="ns")
+
+    assert index.get_namespace("ns").alive.sum() == 2000
+    assert len(index.fetch([vector["id"] for vector in batch], namespace="ns")["vectors"]) == 2000
+
+def test_updated_and_deleted_ids_are_not_returned(index):
+
+    batch = vectors(64)
+
+    index.upsert(batch, namespace="ns")
+    index.build("ns", nlist=4)
+
+    # v0 moves to v1's direction, v1 is removed
+    index.upsert([{**batch[0], "values": batch[1]["values"]}], namespace="ns")
+    index.delete(["v1"], namespace="ns")
+
+    matches = index.query(batch[1]["values"], top_k=64, namespace="ns", include_metadata=True, nprobe=4)["matches"]
+    ids = [match["id"] for match in matches]
+
+    assert ids[0] == "v0"
+    assert "v1" not in ids and len(ids) == len(set(ids)) == 63
+    assert matches[0]["metadata"] == {"i": 0}
+
+def test_queries_during_deletes_see_whole_ids(index):
+
+    index.upsert(vectors(2000), namespace="ns")
+
+    errors = []
+
+    def query():
+        for vector in vectors(200, seed=1):
+            for match in index.query(vector["values"], top_k=20, namespace="ns")["matches"]:
+                if match["id"] is None:
+                    errors.append(match)
+
+    reader = threading.Thread(target=query)
+    reader.start()
+
+    for i in range(0, 2000, 20):
+        index.delete([f"v{j}" for j in range(i, i + 20)], namespace="ns")
+
+    reader.join()
+
+    assert errors == []
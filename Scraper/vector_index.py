@@ -0,0 +1,350 @@
+import numpy as np
+import threading
+import sqlite3
+import json
+import os
+
+# Index backends. Both expose the subset of the Pinecone Index API the scraper
+# uses: upsert(vectors=, namespace=), delete(ids=, namespace=) and
+# query(vector=, top_k=, namespace=, include_metadata=).
+
+def open_index(backend="pinecone", name="ie421-group10", root=None, mode="ivf"):
+
+    if backend == "local":
+        return LocalIndex(os.path.join(root, name), mode=mode)
+
+    from pinecone import Pinecone
+
+    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+
+    return pc.Index(name)
+
+def normalize(values):
+
+    values = np.asarray(values, dtype=np.float32)
+    norms = np.linalg.norm(values, axis=-1, keepdims=True)
+
+    return values / np.maximum(norms, 1e-12)
+
+def top_k_rows(scores, rows, top_k):
+
+    if len(rows) > top_k:
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        scores, rows = scores[best], rows[best]
+
+    order = np.argsort(-scores, kind="stable")
+
+    return scores[order], rows[order]
+
+class Namespace:
+
+    # Vectors of one namespace: an append-only float32 file mapped read-only,
+    # plus the row -> id table and, once built, the IVF partition of the rows
+
+    def __init__(self, root, dim):
+
+        self.path = os.path.join(root, "vectors.f32")
+        self.ivf_path = os.path.join(root, "ivf.npz")
+        self.dim = dim
+
+        self.map = None
+        self.ids = []
+        self.alive = np.zeros(0, dtype=bool)
+
+        self.centroids = None
+        self.assign = None
+        self.lists = None
+
+        if os.path.exists(self.ivf_path):
+            with np.load(self.ivf_path) as ivf:
+                self.set_ivf(ivf["centroids"], ivf["assign"])
+
+    def rows(self):
+        return os.path.getsize(self.path) // (self.dim * 4) if os.path.exists(self.path) else 0
+
+    def vectors(self):
+
+        rows = self.rows()
+
+        if self.map is None or self.map.shape[0] != rows:
+            self.map = np.memmap(self.path, dtype=np.float32, mode="r", shape=(rows, self.dim)) if rows else np.zeros((0, self.dim), dtype=np.float32)
+
+        return self.map
+
+    def set_ivf(self, centroids, assign):
+
+        # Rows grouped by list, so probing a list is one contiguous slice
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(len(centroids) + 1))
+
+        self.centroids = centroids
+        self.assign = assign
+        self.lists = (order, bounds)
+
+class LocalIndex:
+
+    # Local stand-in for the Pinecone index. Vectors are L2-normalised so scores
+    # are cosine similarities, as in the hosted index. mode="flat" scans every
+    # vector with NumPy (exact, the recall baseline), mode="ivf" only scans the
+    # nprobe closest k-means lists once build() has partitioned a namespace.
+    # Rows upserted after the last build() are always scanned exactly.
+
+    def __init__(self, root, mode="ivf", nprobe=8):
+
+        self.root = root
+        self.mode = mode
+        self.nprobe = nprobe
+
+        os.makedirs(root, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.namespaces = {}
+
+        self.db = sqlite3.connect(os.path.join(root, "metadata.sqlite"), check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS vectors (
+                namespace TEXT NOT NULL,
+                id TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                metadata TEXT,
+                PRIMARY KEY (namespace, id)
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS vectors_row ON vectors (namespace, row)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS namespaces (namespace TEXT PRIMARY KEY, dim INTEGER NOT NULL)")
+        self.db.commit()
+
+    def get_namespace(self, namespace, dim=None):
+
+        if namespace in self.namespaces:
+            return self.namespaces[namespace]
+
+        row = self.db.execute("SELECT dim FROM namespaces WHERE namespace = ?", (namespace,)).fetchone()
+
+        if row is None:
+
+            if dim is None:
+                return None
+
+            self.db.execute("INSERT INTO namespaces (namespace, dim) VALUES (?, ?)", (namespace, dim))
+            self.db.commit()
+
+        else:
+            dim = row[0]
+
+        ns = Namespace(os.path.join(self.root, namespace), dim)
+        os.makedirs(os.path.join(self.root, namespace), exist_ok=True)
+
+        rows = ns.rows()
+        ns.ids = [None] * rows
+        ns.alive = np.zeros(rows, dtype=bool)
+
+        for id, row in self.db.execute("SELECT id, row FROM vectors WHERE namespace = ?", (namespace,)):
+            if row < rows:
+                ns.ids[row] = id
+                ns.alive[row] = True
+
+        self.namespaces[namespace] = ns
+
+        return ns
+
+    def upsert(self, vectors, namespace=""):
+
+        # The same id twice in one call keeps its last vector
+        vectors = list({vector["id"]: vector for vector in vectors}.values())
+
+        if not vectors:
+            return
+
+        values = normalize([vector["values"] for vector in vectors])
+        ids = [vector["id"] for vector in vectors]
+
+        with self.lock:
+
+            ns = self.get_namespace(namespace, dim=values.shape[1])
+
+            if values.shape[1] != ns.dim:
+                raise ValueError(f"namespace {namespace!r} holds {ns.dim}-dim vectors, got {values.shape[1]}")
+
+            # Rows are append-only, an updated id gets a new row and its old one
+            # is retired, so an IVF partition never points at changed vectors
+            start = ns.rows()
+
+            with open(ns.path, "ab") as f:
+                f.write(values.tobytes())
+
+            retired = []
+
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i+500]
+                placeholders = ",".join("?" * len(chunk))
+                retired += [row for (row,) in self.db.execute(f"SELECT row FROM vectors WHERE namespace = ? AND id IN ({placeholders})", (namespace, *chunk))]
+
+            self.db.executemany(
+                "INSERT OR REPLACE INTO vectors (namespace, id, row, metadata) VALUES (?, ?, ?, ?)",
+                [(namespace, vector["id"], start + i, json.dumps(vector.get("metadata") or {}, ensure_ascii=False)) for i, vector in enumerate(vectors)],
+            )
+            self.db.commit()
+
+            alive = np.zeros(start + len(vectors), dtype=bool)
+            alive[:len(ns.alive)] = ns.alive
+            alive[start:] = True
+            alive[retired] = False
+
+            ns.ids = ns.ids + [None] * (start - len(ns.ids)) + ids
+
+            for row in retired:
+                ns.ids[row] = None
+
+            ns.alive = alive
+
+    def delete(self, ids, namespace=""):
+
+        with self.lock:
+
+            ns = self.get_namespace(namespace)
+
+            if ns is None:
+                return
+
+            for i in range(0, len(ids), 500):
+
+                chunk = ids[i:i+500]
+                placeholders = ",".join("?" * len(chunk))
+
+                for (row,) in self.db.execute(f"SELECT row FROM vectors WHERE namespace = ? AND id IN ({placeholders})", (namespace, *chunk)).fetchall():
+                    ns.alive[row] = False
+                    ns.ids[row] = None
+
+                self.db.execute(f"DELETE FROM vectors WHERE namespace = ? AND id IN ({placeholders})", (namespace, *chunk))
+
+            self.db.commit()
+
+    def build(self, namespace="", nlist=None, iterations=10, seed=0):
+
+        # Spherical k-means over the live rows, persisted next to the vectors
+
+        with self.lock:
+
+            ns = self.get_namespace(namespace)
+
+            if ns is None:
+                return
+
+            vectors = ns.vectors()
+            rows = np.flatnonzero(ns.alive)
+
+        if len(rows) == 0:
+            return
+
+        data = np.asarray(vectors[rows])
+        nlist = min(len(rows), nlist or max(1, int(np.sqrt(len(rows)))))
+
+        rng = np.random.default_rng(seed)
+        centroids = data[rng.choice(len(rows), nlist, replace=False)]
+
+        for _ in range(iterations):
+
+            labels = np.concatenate([np.argmax(data[i:i+4096] @ centroids.T, axis=1) for i in range(0, len(data), 4096)])
+
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, data)
+
+            counts = np.bincount(labels, minlength=nlist)
+            empty = counts == 0
+
+            # Reseed empty lists from random points
+            sums[empty] = data[rng.choice(len(rows), int(empty.sum()))]
+            centroids = normalize(sums)
+
+        labels = np.concatenate([np.argmax(data[i:i+4096] @ centroids.T, axis=1) for i in range(0, len(data), 4096)])
+
+        # Rows not in the partition (dead, or added later) are marked -1
+        assign = np.full(len(vectors), -1, dtype=np.int32)
+        assign[rows] = labels
+
+        tmp = f"{ns.ivf_path}.tmp.npz"
+        np.savez(tmp, centroids=centroids, assign=assign)
+        os.replace(tmp, ns.ivf_path)
+
+        with self.lock:
+            ns.set_ivf(centroids, assign)
+
+    def candidates(self, ns, query, nprobe):
+
+        if self.mode == "flat" or ns.centroids is None:
+            return np.flatnonzero(ns.alive)
+
+        order, bounds = ns.lists
+        probe = np.argsort(-(ns.centroids @ query))[:nprobe]
+
+        # Probed lists, plus everything upserted since the last build
+        probed = np.concatenate([order[bounds[i]:bounds[i + 1]] for i in probe] + [np.arange(len(ns.assign), len(ns.alive))])
+
+        return probed[ns.alive[probed]]
+
+    def query(self, vector, top_k=10, namespace="", include_metadata=False, nprobe=None):
+
+        with self.lock:
+
+            ns = self.get_namespace(namespace)
+
+            if ns is None:
+                return {"namespace": namespace, "matches": []}
+
+            vectors = ns.vectors()
+            query = normalize(vector)
+            rows = self.candidates(ns, query, nprobe or self.nprobe)
+
+            # delete() clears retired ids in place, so read them from a copy
+            ids = list(ns.ids)
+
+        if len(rows) == 0:
+            return {"namespace": namespace, "matches": []}
+
+        rows = np.sort(rows)
+        scores, rows = top_k_rows(vectors[rows] @ query, rows, top_k)
+
+        matches = [{"id": ids[row], "score": float(score)} for score, row in zip(scores, rows)]
+
+        if include_metadata:
+
+            with self.lock:
+
+                placeholders = ",".join("?" * len(matches))
+                metadata = dict(self.db.execute(
+                    f"SELECT id, metadata FROM vectors WHERE namespace = ? AND id IN ({placeholders})",
+                    (namespace, *[match["id"] for match in matches]),
+                ).fetchall())
+
+            for match in matches:
+                match["metadata"] = json.loads(metadata.get(match["id"]) or "{}")
+
+        return {"namespace": namespace, "matches": matches}
+
+    def fetch(self, ids, namespace=""):
+
+        rows = []
+
+        with self.lock:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i+500]
+                placeholders = ",".join("?" * len(chunk))
+                rows += self.db.execute(f"SELECT id, metadata FROM vectors WHERE namespace = ? AND id IN ({placeholders})", (namespace, *chunk)).fetchall()
+
+        return {"namespace": namespace, "vectors": {id: {"id": id, "metadata": json.loads(metadata or "{}")} for id, metadata in rows}}
+
+    def items(self, namespace=""):
+
+        # (id, metadata) of every live vector in a namespace
+
+        with self.lock:
+            rows = self.db.execute("SELECT id, metadata FROM vectors WHERE namespace = ? ORDER BY row", (namespace,)).fetchall()
+
+        return [(id, json.loads(metadata or "{}")) for id, metadata in rows]
+
+    def close(self):
+
+        with self.lock:
+            self.namespaces.clear()
+            self.db.close()